@@ -0,0 +1,50 @@
+# coding=utf-8
+"""
+Chunking throughput: streamed from the PDF, from a parsed document, and from the cache.
+
+    python -m benchmarks.bench_chunker [file.pdf]
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import make_paper_pdf, timeit, report, check_budget
+from pageleaf.commons.io.files import file_sha256
+from pageleaf.engine.chunker import CachedChunker, ChunkerConfig, TextChunker, stream_pages
+from pageleaf.storage.documents import ParsedDocumentStore
+
+# per-page budget of chunking a parsed document, and of reading chunks back from the cache.
+PAGE_BUDGET_MS = 1.0
+CACHED_PAGE_BUDGET_MS = 0.2
+
+
+def main(pdf_file: str | None = None) -> bool:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if pdf_file is None:
+            pdf_file = str(make_paper_pdf(Path(tmp_dir) / 'paper.pdf', n_pages=20))
+
+        store = ParsedDocumentStore(Path(tmp_dir) / 'parsed')
+        pdf_hash = file_sha256(pdf_file)
+        doc = store.load(pdf_file, pdf_hash)
+        n_pages = len(doc.pages)
+        chunker = TextChunker(ChunkerConfig())
+        chunks = list(chunker.iter_chunks(doc.pages, doc.outline))
+        n_tokens = sum(chunk.n_tokens for chunk in chunks)
+        print(f'{pdf_file}: {n_pages} pages, {len(chunks)} chunks, {n_tokens} tokens')
+
+        report('streamed from PDF', timeit(lambda: list(chunker.iter_chunks(stream_pages(pdf_file))), repeat=3),
+               n_pages, 'page')
+        parsed_ms = report('parsed document', timeit(lambda: list(chunker.iter_chunks(doc.pages, doc.outline)),
+                                                    repeat=10), n_pages, 'page')
+
+        cached = CachedChunker(store, ChunkerConfig())
+        list(cached.chunks(pdf_file, pdf_hash))
+        cached_ms = report('cache hit', timeit(lambda: list(cached.chunks(pdf_file, pdf_hash)), repeat=10),
+                           n_pages, 'page')
+        ok = check_budget('parsed document per page', parsed_ms, PAGE_BUDGET_MS)
+        return check_budget('cache hit per page', cached_ms, CACHED_PAGE_BUDGET_MS) and ok
+
+
+if __name__ == '__main__':
+    ok = main(sys.argv[1] if len(sys.argv) > 1 else None)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,45 @@
+# coding=utf-8
+"""
+Citation graph queries with tens of thousands of edges, most of them to papers outside the library.
+
+    python -m benchmarks.bench_citations [n_papers]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import timeit, report, check_budget
+from pageleaf.engine.citations import CitationGraphBuilder
+
+# per-query budget for neighbourhood, co-citation and coupling queries.
+QUERY_BUDGET_MS = 5.0
+
+
+def main(n_papers: int = 2000, n_external: int = 30000, refs_per_paper: int = 40) -> bool:
+    rng = random.Random(0)
+    builder = CitationGraphBuilder()
+    for paper in range(n_papers):
+        for _ in range(refs_per_paper):
+            # a third of the references point into the library.
+            cited = f'arxiv:lib-{rng.randrange(n_papers)}' if rng.random() < 0.3 else f'doi:ext-{rng.randrange(n_external)}'
+            builder.add_edge(f'arxiv:lib-{paper}', cited)
+
+    start = time.perf_counter()
+    graph = builder.build()
+    print(f'build: {graph.n_nodes} nodes, {graph.n_edges} edges in {(time.perf_counter() - start) * 1000:.1f} ms')
+
+    nodes = np.random.default_rng(0).integers(0, n_papers, size=100)
+    n = len(nodes)
+    results = [
+        report('neighborhood k=2', timeit(lambda: [graph.neighborhood(node, k=2) for node in nodes], 3), n, 'query'),
+        report('co_citation', timeit(lambda: [graph.co_citation(node) for node in nodes], 3), n, 'query'),
+        report('bibliographic_coupling', timeit(lambda: [graph.bibliographic_coupling(node) for node in nodes], 3), n, 'query'),
+    ]
+    return check_budget('slowest query', max(results), QUERY_BUDGET_MS)
+
+
+if __name__ == '__main__':
+    ok = main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
+    sys.exit(0 if ok else 1)
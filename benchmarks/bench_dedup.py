@@ -0,0 +1,53 @@
+# coding=utf-8
+"""
+Checking a new paper for near-duplicates should not compare it with every paper in the
+library: LSH lookups stay flat as the library grows, a linear scan of the signatures
+does not.
+
+    python -m benchmarks.bench_dedup [n_papers]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import check_budget, paragraph, report, sentence, timeit
+from pageleaf.engine.dedup import NearDuplicateIndex
+
+# one LSH lookup against 50,000 papers, the signature computed beforehand.
+QUERY_BUDGET_MS = 2.0
+
+
+def main(n_papers: int = 50_000) -> bool:
+    rng = random.Random(0)
+    index = NearDuplicateIndex()
+    papers = [(sentence(rng, 8), paragraph(rng, 6)) for _ in range(n_papers)]
+
+    start = time.perf_counter()
+    for i, (title, abstract) in enumerate(papers):
+        index.add(str(i), index.signature(title, abstract))
+    print(f'signatures of {n_papers} papers: {time.perf_counter() - start:.2f} s')
+
+    # camera-ready first pages of 100 library papers: authors added, a sentence reworded.
+    probes = []
+    for i in rng.sample(range(n_papers), 100):
+        title, abstract = papers[i]
+        first_page = f'{title}\n{sentence(rng, 6)}\nAbstract\n{abstract}\n1 Introduction\n{paragraph(rng, 3)}'
+        probes.append((str(i), first_page))
+
+    hits = sum(any(m.key == key for m in index.query(index.signature('', '', text))) for key, text in probes)
+    print(f'recall on reworded copies: {hits}/{len(probes)}')
+
+    signatures = [index.signature('', '', text) for _, text in probes]
+    lsh = report('lsh query', timeit(lambda: [index.query(s) for s in signatures], repeat=3), len(signatures),
+                 'paper')
+    matrix = np.stack(list(index.signatures.values()))
+    report('linear scan', timeit(lambda: [(matrix == s).mean(axis=1) for s in signatures], repeat=3),
+           len(signatures), 'paper')
+    return check_budget('lsh query', lsh, QUERY_BUDGET_MS) and hits >= 95
+
+
+if __name__ == '__main__':
+    ok = main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,71 @@
+# coding=utf-8
+"""
+Backing up the library should not cost one `model_dump_json` and one file per entry.
+
+    python -m benchmarks.bench_export [n_papers]
+"""
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from uuid import uuid4
+
+from benchmarks.common import paragraph, sentence
+from pageleaf.schemas.paper import Content, ExternalIdentifiers, Metadata, Paper, PaperAnalysis, PaperEntry
+from pageleaf.storage.export import export_library, import_library, ColumnarReader
+from pageleaf.storage.library import PaperLibrary
+
+# export + import of 5,000 entries, either format.
+ROUND_TRIP_BUDGET_S = 5.0
+
+
+def make_entry(rng: random.Random, i: int) -> PaperEntry:
+    ids = ExternalIdentifiers(arxiv=f'25{i // 100000:02d}.{i % 100000:05d}')
+    metadata = Metadata(title=sentence(rng, 8), abstract=paragraph(rng, 6), authors=[sentence(rng, 2)] * 5,
+                        venue='arxiv', paper_type='preprint', source='arxiv', categories=['cs.CL'],
+                        external_ids=ids)
+    paper = Paper(id=uuid4(), identifiers=ids, metadata=metadata,
+                  content=Content(abstract=metadata.abstract, outline=None), analysis=PaperAnalysis())
+    return PaperEntry(paper=paper)
+
+
+def main(n_papers: int = 5000) -> bool:
+    rng = random.Random(0)
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        library = PaperLibrary(tmp_dir / 'library')
+        for i in range(n_papers):
+            library.save(make_entry(rng, i))
+
+        start = time.perf_counter()
+        n = sum(1 for _ in library)
+        print(f'iterate {n} entries one by one: {time.perf_counter() - start:.2f} s')
+        start = time.perf_counter()
+        n = sum(len(batch) for batch in library.iter_batches())
+        print(f'iterate {n} entries in batches: {time.perf_counter() - start:.2f} s')
+
+        for fmt, target in [('jsonl', tmp_dir / 'library.jsonl'), ('columnar', tmp_dir / 'columnar')]:
+            start = time.perf_counter()
+            export_library(library, target, fmt)
+            exported = time.perf_counter() - start
+            start = time.perf_counter()
+            import_library(PaperLibrary(tmp_dir / f'restored-{fmt}'), target)
+            imported = time.perf_counter() - start
+            budget = ROUND_TRIP_BUDGET_S * n_papers / 5000
+            within = exported + imported <= budget
+            ok = ok and within
+            print(f'{fmt}: export {exported:.2f} s, import {imported:.2f} s, '
+                  f'budget {budget:.2f} s  [{"OK" if within else "OVER BUDGET"}]')
+
+        start = time.perf_counter()
+        with ColumnarReader(tmp_dir / 'columnar') as reader:
+            titles = reader.column('paper.metadata.title')
+        print(f'read {len(titles)} titles from the columnar export: {(time.perf_counter() - start) * 1000:.1f} ms')
+    return ok
+
+
+if __name__ == '__main__':
+    ok = main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,37 @@
+# coding=utf-8
+"""
+Layout analysis must be cheap enough to run on every page of every paper during ingest.
+
+    python -m benchmarks.bench_layout [file.pdf]
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import make_paper_pdf, timeit, report, check_budget
+from pageleaf.engine.layout import LayoutAnalyzer
+from pageleaf.schemas.io.pdf import PdfDocument
+
+# per-page budget of layout analysis, on top of `PdfDocument.load_file`.
+PAGE_BUDGET_MS = 2.0
+
+
+def main(pdf_file: str | None = None) -> bool:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if pdf_file is None:
+            pdf_file = str(make_paper_pdf(Path(tmp_dir) / 'paper.pdf', n_pages=20))
+
+        doc = PdfDocument.load_file(pdf_file)
+        n_pages = len(doc.pages)
+        print(f'{pdf_file}: {n_pages} pages')
+
+        report('load_file', timeit(lambda: PdfDocument.load_file(pdf_file), repeat=3), n_pages, 'page')
+        analyzer = LayoutAnalyzer()
+        layout_ms = report('layout analyze', timeit(lambda: analyzer.analyze(doc), repeat=10), n_pages, 'page')
+        report('layout reorder', timeit(lambda: analyzer.reorder(doc), repeat=10), n_pages, 'page')
+        return check_budget('layout per page', layout_ms, PAGE_BUDGET_MS)
+
+
+if __name__ == '__main__':
+    ok = main(sys.argv[1] if len(sys.argv) > 1 else None)
+    sys.exit(0 if ok else 1)
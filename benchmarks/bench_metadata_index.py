@@ -0,0 +1,89 @@
+# coding=utf-8
+"""
+Faceted queries over the library metadata should take milliseconds, not a pass over
+every `Metadata` object.
+
+    python -m benchmarks.bench_metadata_index [n_papers]
+"""
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from uuid import uuid4
+
+import numpy as np
+
+from benchmarks.common import sentence
+from pageleaf.engine.metadata_index import MetadataIndex
+from pageleaf.schemas.paper import Content, ExternalIdentifiers, Metadata, Paper, PaperAnalysis, PaperEntry
+
+# filter + sort + facet counts over 100,000 papers.
+QUERY_BUDGET_MS = 20.0
+CATEGORIES = ['cs.CL', 'cs.LG', 'cs.CV', 'cs.AI', 'cs.IR', 'stat.ML', 'cs.RO', 'cs.SE']
+
+
+def make_entry(rng: random.Random) -> PaperEntry:
+    ids = ExternalIdentifiers()
+    categories = rng.sample(CATEGORIES, rng.randint(1, 3))
+    metadata = Metadata(title=sentence(rng, 8), abstract='', venue='arxiv', paper_type='preprint', source='arxiv',
+                        publish_date=datetime(2022, 1, 1) + timedelta(days=rng.randint(0, 1400)),
+                        primary_category=categories[0], categories=categories, hf_upvotes=rng.randint(0, 200),
+                        github_stars=rng.choice([None, rng.randint(0, 5000)]), external_ids=ids)
+    paper = Paper(id=uuid4(), identifiers=ids, metadata=metadata,
+                  content=Content(abstract=None, outline=None), analysis=PaperAnalysis())
+    return PaperEntry(paper=paper)
+
+
+def query(index: MetadataIndex):
+    mask = index.where(categories=['cs.CL'], since='2025-01-01', until='2025-12-31', min_upvotes=50)
+    rows = index.sort(np.flatnonzero(mask), 'github_stars')[:20]
+    return rows, index.facets('categories', mask)
+
+
+def python_query(entries: list[PaperEntry]):
+    lo, hi = datetime(2025, 1, 1), datetime(2025, 12, 31)
+    hits = [e for e in entries if 'cs.CL' in e.paper.metadata.categories
+            and lo <= e.paper.metadata.publish_date <= hi and e.paper.metadata.hf_upvotes >= 50]
+    hits.sort(key=lambda e: -(e.paper.metadata.github_stars if e.paper.metadata.github_stars is not None else -1))
+    facets = {}
+    for e in hits:
+        for category in e.paper.metadata.categories:
+            facets[category] = facets.get(category, 0) + 1
+    return hits[:20], facets
+
+
+def main(n_papers: int = 100_000) -> bool:
+    rng = random.Random(0)
+    entries = [make_entry(rng) for _ in range(n_papers)]
+
+    start = time.perf_counter()
+    index = MetadataIndex.build(entries)
+    print(f'build index over {n_papers} papers: {time.perf_counter() - start:.2f} s')
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index.save(Path(tmp_dir) / 'index')
+        start = time.perf_counter()
+        loaded = MetadataIndex.load(Path(tmp_dir) / 'index')
+        print(f'open snapshot: {(time.perf_counter() - start) * 1000:.1f} ms')
+
+        query(loaded)
+        start = time.perf_counter()
+        rows, facets = query(loaded)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    python_query(entries)
+    print(f'python loop: {(time.perf_counter() - start) * 1000:.1f} ms')
+
+    budget = QUERY_BUDGET_MS * n_papers / 100_000
+    ok = elapsed_ms <= budget
+    print(f'indexed query ({len(rows)} rows, {len(facets)} facets): {elapsed_ms:.2f} ms, '
+          f'budget {budget:.1f} ms  [{"OK" if ok else "OVER BUDGET"}]')
+    return ok
+
+
+if __name__ == '__main__':
+    ok = main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
+    sys.exit(0 if ok else 1)
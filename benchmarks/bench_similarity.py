@@ -0,0 +1,50 @@
+# coding=utf-8
+"""
+Filling `PaperRelations.related` for the whole library should take seconds.
+
+    python -m benchmarks.bench_similarity [n_papers]
+"""
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import WORDS, paragraph, sentence
+from pageleaf.engine.similarity import SimilarityIndex
+
+# whole-library budget for `most_similar` over 5,000 papers.
+LIBRARY_BUDGET_S = 5.0
+
+
+def main(n_papers: int = 5000) -> bool:
+    rng = random.Random(0)
+    papers = [(f'paper-{i}', [(sentence(rng, 8), 2.0), (paragraph(rng, 8), 1.0),
+                              (' . '.join(rng.sample(WORDS, 5)), 2.0)])
+              for i in range(n_papers)]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = SimilarityIndex(Path(tmp_dir) / 'index')
+        start = time.perf_counter()
+        index.add(papers)
+        print(f'index {n_papers} papers: {time.perf_counter() - start:.2f} s')
+
+        start = time.perf_counter()
+        reopened = SimilarityIndex(Path(tmp_dir) / 'index')
+        _ = reopened.vectors
+        print(f'open index: {(time.perf_counter() - start) * 1000:.2f} ms')
+
+        start = time.perf_counter()
+        n = sum(1 for _ in reopened.most_similar(k=10))
+        elapsed = time.perf_counter() - start
+        print(f'top-10 for {n} papers: {elapsed:.2f} s')
+
+        budget = LIBRARY_BUDGET_S * n_papers / 5000
+        ok = elapsed <= budget
+        print(f'budget {budget:.2f} s  [{"OK" if ok else "OVER BUDGET"}]')
+        return ok
+
+
+if __name__ == '__main__':
+    ok = main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,137 @@
+# coding=utf-8
+"""
+Bytes on disk and full-scan cost of the fetcher JSON caches and the page text store,
+plain and with each storage codec.
+
+Files are allocated in whole filesystem blocks, and cached by the page cache the same
+way: an arXiv record under one block takes a block however well it compresses, a
+fetched record (arXiv and HF together) drops from two blocks to one.
+
+    python -m benchmarks.bench_storage [n_papers]
+"""
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import check_budget, paragraph, report, sentence, timeit
+from pageleaf.commons.io.codecs import available_codecs, FramedReader, StorageCodec, write_frames
+from pageleaf.commons.io.files import json_dump, json_load
+from pageleaf.config.paths import DataLayout
+
+# loading one cached metadata file of a full scan, dictionary-compressed.
+SCAN_BUDGET_MS = 0.2
+# one page read from a compressed 2 MB text store.
+PAGE_BUDGET_MS = 1.0
+
+
+def arxiv_record(rng: random.Random, arxiv_id: str) -> dict:
+    """Shaped like the `ArxivMetaFetcher` cache."""
+    return {
+        'id': f'http://arxiv.org/abs/{arxiv_id}v1', 'short_id': f'{arxiv_id}v1', 'title': sentence(rng, 9),
+        'summary': paragraph(rng, 7),
+        'published': f'2025-01-{rng.randint(1, 28):02d}T18:{rng.randint(0, 59):02d}:00+00:00',
+        'updated': f'2025-01-{rng.randint(1, 28):02d}T18:{rng.randint(0, 59):02d}:00+00:00',
+        'categories': rng.sample(['cs.CL', 'cs.LG', 'cs.AI', 'cs.CV', 'stat.ML'], 2), 'primary_category': 'cs.CL',
+        'authors': [sentence(rng, 2)[:-1] for _ in range(rng.randint(2, 12))],
+        'links': [{'href': f'http://arxiv.org/abs/{arxiv_id}v1', 'rel': 'alternate', 'content-type': None,
+                   'title': None},
+                  {'href': f'http://arxiv.org/pdf/{arxiv_id}v1', 'rel': 'related', 'content-type': None,
+                   'title': 'pdf'}],
+        'pdf_url': f'http://arxiv.org/pdf/{arxiv_id}v1', 'source_url': f'http://arxiv.org/src/{arxiv_id}v1',
+        'doi': None, 'comment': f'{rng.randint(8, 40)} pages, {rng.randint(1, 12)} figures', 'journal_ref': None,
+    }
+
+
+def fetched_record(rng: random.Random, arxiv_id: str, arxiv: dict) -> dict:
+    """Shaped like a `FetcherManager` result: the arXiv record, the HF paper page and the PDF path."""
+    hf = {'id': arxiv_id, 'title': arxiv['title'], 'summary': arxiv['summary'],
+          'authors': [{'_id': f'{rng.getrandbits(96):024x}', 'name': name, 'hidden': False}
+                      for name in arxiv['authors']],
+          'publishedAt': arxiv['published'], 'upvotes': rng.randint(0, 300),
+          'discussionId': f'{rng.getrandbits(96):024x}', 'ai_summary': paragraph(rng, 2),
+          'ai_keywords': [sentence(rng, 2)[:-1] for _ in range(8)], 'githubRepo': None, 'githubStars': None}
+    ids = {'arxiv': arxiv_id}
+    return {
+        'arxiv_api': {'source': 'arxiv_api', 'external_ids': ids,
+                      'payload': {'json_path': f'/data/arxiv/{arxiv_id}.json', 'data': arxiv}},
+        'huggingface': {'source': 'huggingface', 'external_ids': ids,
+                        'payload': {'json_path': f'/data/hf/{arxiv_id}.json', 'data': hf}},
+        'arxiv': {'source': 'arxiv', 'external_ids': ids, 'payload': {'pdf_path': f'/data/arxiv/{arxiv_id}.pdf'}},
+    }
+
+
+def disk_usage(paths: list[Path]) -> tuple[int, int]:
+    """Bytes written and bytes allocated."""
+    stats = [path.stat() for path in paths]
+    return sum(s.st_size for s in stats), sum(s.st_blocks * 512 for s in stats)
+
+
+def bench_json(tmp_dir: Path, n_papers: int, source: str) -> bool:
+    rng = random.Random(0)
+    records = {f'2501.{i:05d}': arxiv_record(rng, f'2501.{i:05d}') for i in range(1, n_papers + 1)}
+    if source == 'fetched':
+        records = {arxiv_id: fetched_record(rng, arxiv_id, record) for arxiv_id, record in records.items()}
+    print(f'\n{source}/: {n_papers} files')
+    samples = [json.dumps(r, ensure_ascii=False, indent=2).encode('utf-8') for r in list(records.values())[:2000]]
+    variants = [('plain', 'none', False)]
+    for name in available_codecs()[1:]:
+        variants += [(name, name, False), (f'{name} + dictionary', name, True)]
+
+    ok = True
+    for label, codec, trained in variants:
+        layout = DataLayout(tmp_dir / source / label.replace(' ', ''))
+        if trained:
+            layout.train_dictionary(samples, codec)
+        storage_codec = layout.codec(codec)
+        paths = [layout.path(source, f'{arxiv_id}.json') for arxiv_id in records]
+        start = time.perf_counter()
+        for path, record in zip(paths, records.values()):
+            json_dump(record, path, indent=2, codec=storage_codec)
+        written = time.perf_counter() - start
+        size, allocated = disk_usage(paths)
+        print(f'{label:<24} {size / 1e6:7.2f} MB written, {allocated / 1e6:7.2f} MB allocated, '
+              f'write {written / n_papers * 1000:.3f} ms/file')
+        scan = report(f'  full scan ({label})', timeit(lambda: [json_load(p) for p in paths], repeat=3), n_papers,
+                      'file')
+        if label == 'zlib + dictionary' and source == 'arxiv':
+            ok = check_budget('  full scan', scan, SCAN_BUDGET_MS)
+    return ok
+
+
+def bench_text(tmp_dir: Path) -> bool:
+    rng = random.Random(1)
+    text = '\n\n'.join(paragraph(rng, 8) for _ in range(2500)).encode('utf-8')
+    pages = [(start, min(start + 4000, len(text))) for start in range(0, len(text), 4000)]
+    plain = tmp_dir / 'text.utf8'
+    plain.write_bytes(text)
+    print(f'\nparsed/ text store {len(text) / 1e6:.2f} MB, {len(pages)} pages')
+
+    ok = True
+    for name in available_codecs()[1:]:
+        path = tmp_dir / f'text.{name}'
+        size = write_frames(path, text, StorageCodec(name))
+        probes = [pages[rng.randrange(len(pages))] for _ in range(500)]
+        with FramedReader(path, cache_frames=1) as reader:
+            scan = report(f'  full read ({name} frames)', timeit(lambda: reader.read(0, len(reader)), repeat=3))
+            page = report(f'  random page ({name} frames)', timeit(lambda: [reader.read(s, e) for s, e in probes],
+                                                                  repeat=3), len(probes), 'page')
+        print(f'  {name}: {size / 1e6:.2f} MB on disk ({len(text) / size:.1f}x), full read {scan:.1f} ms')
+        if name == 'zlib':
+            ok = check_budget('  random page', page, PAGE_BUDGET_MS)
+    return ok
+
+
+def main(n_papers: int = 10_000) -> bool:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        ok = bench_json(tmp_dir, n_papers, 'arxiv')
+        ok = bench_json(tmp_dir, n_papers, 'fetched') and ok
+        return bench_text(tmp_dir) and ok
+
+
+if __name__ == '__main__':
+    ok = main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,76 @@
+# coding=utf-8
+"""
+Cost of table extraction on top of parsing the text: the per-page pre-check and the
+detection on the pages that pass it, in total against `load_file`, and against the
+naive way, PyMuPDF's `find_tables` run on every page. The detection is also run on
+every page once, not timed, to check the pre-check loses no table.
+
+    python -m benchmarks.bench_tables [file.pdf]
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+import fitz
+
+from benchmarks.common import check_budget, make_paper_pdf, report, timeit
+from pageleaf.engine.tables import TableExtractor
+from pageleaf.schemas.io.pdf import PdfDocument
+
+# the pre-check on every page, as a share of parsing the text (`get_cdrawings` is most of it,
+# only run on pages whose text hints at a table).
+GATE_BUDGET = 0.15
+# the detection on one page that passed the pre-check.
+DETECT_BUDGET_MS = 50.0
+# all of it, pre-check and detection, as a share of parsing the text. Tables are extracted
+# on demand and cached, so this is paid once per paper, when its tables are first asked for.
+TABLES_BUDGET = 0.25
+# `find_tables` on every page, as a multiple of the gated extraction.
+MIN_SPEEDUP = 10.0
+
+
+def run(pdf_file: str, parsed: dict, gated: bool) -> TableExtractor:
+    extractor = TableExtractor()
+    with fitz.open(pdf_file) as doc:
+        extractor.extract(doc, parsed, gated=gated)
+    return extractor
+
+
+def find_tables(pdf_file: str) -> int:
+    with fitz.open(pdf_file) as doc:
+        return sum(len(page.find_tables().tables) for page in doc)
+
+
+def main(pdf_file: str | None = None) -> bool:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if pdf_file is None:
+            pdf_file = str(make_paper_pdf(Path(tmp_dir) / 'paper.pdf', n_pages=20))
+
+        doc = PdfDocument.load_file(pdf_file)
+        parsed = {page.page_number: page for page in doc.pages}
+        with fitz.open(pdf_file) as pdf:
+            n_pages = pdf.page_count
+        print(f'{pdf_file}: {n_pages} pages')
+
+        parse_ms = report('load_file', timeit(lambda: PdfDocument.load_file(pdf_file), repeat=3), n_pages, 'page')
+        tables_ms = report('tables, gated', timeit(lambda: run(pdf_file, parsed, True), repeat=3), n_pages, 'page')
+        naive_ms = report('find_tables, every page', timeit(lambda: find_tables(pdf_file), repeat=1),
+                          n_pages, 'page')
+
+        gated, full = run(pdf_file, parsed, True), run(pdf_file, parsed, False)
+        gate_ms = gated.stats.check_seconds / n_pages * 1000
+        detect_ms = gated.stats.detect_seconds / max(gated.stats.candidates, 1) * 1000
+        print(f'{gated.stats.candidates}/{n_pages} pages pass the pre-check, {gated.stats.tables} tables found, '
+              f'{full.stats.tables} with the detection on every page; tables add {tables_ms / parse_ms:.0%} to '
+              f'parsing, {naive_ms / tables_ms:.0f}x less than find_tables on every page')
+
+        ok = check_budget('pre-check per page', gate_ms, parse_ms * GATE_BUDGET)
+        ok = check_budget('detection per candidate page', detect_ms, DETECT_BUDGET_MS) and ok
+        ok = check_budget('tables per page, total', tables_ms, parse_ms * TABLES_BUDGET) and ok
+        ok = check_budget('tables per page, vs find_tables', tables_ms, naive_ms / MIN_SPEEDUP) and ok
+        return ok and gated.stats.tables == full.stats.tables
+
+
+if __name__ == '__main__':
+    ok = main(sys.argv[1] if len(sys.argv) > 1 else None)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,76 @@
+# coding=utf-8
+"""
+A weekly version check of a large library against the local stub server: API requests,
+papers re-fetched and wall time. The stub answers every request after `API_LATENCY_MS`,
+like a large `id_list` query to arXiv (PDF downloads wait as long); arXiv also asks for a
+pause of `arxiv_delay_seconds` between API requests, added to the projection.
+
+    python -m benchmarks.bench_versions [n_papers]
+"""
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from uuid import uuid4
+
+from pageleaf.config.fetchers import FetcherConfig
+from pageleaf.fetchers.manager import FetcherManager
+from pageleaf.fetchers.stub import StubFaults, StubServer, stub_config, stub_paper
+from pageleaf.pipelines.versions import watch_versions
+from pageleaf.schemas.paper import (Content, ExternalIdentifiers, Metadata, Paper, PaperAnalysis, PaperEntry,
+                                    PaperVersion)
+from pageleaf.storage.documents import ParsedDocumentStore
+from pageleaf.storage.library import PaperLibrary
+
+API_LATENCY_MS = 2000.0
+REVISED = 0.01  # share of the papers with a new version
+# the whole check with arXiv's pause between requests, in seconds.
+BUDGET_SECONDS = 300.0
+
+
+def make_library(root: Path, arxiv_ids: list[str]) -> PaperLibrary:
+    library = PaperLibrary(root)
+    for arxiv_id in arxiv_ids:
+        paper = stub_paper(arxiv_id)
+        ids = ExternalIdentifiers(arxiv=arxiv_id)
+        metadata = Metadata(title=paper['title'], abstract=paper['summary'], venue='arxiv', paper_type='preprint',
+                            source='arxiv', publish_date=paper['published'], update_date=paper['published'],
+                            external_ids=ids)
+        entry = PaperEntry(paper=Paper(id=uuid4(), identifiers=ids, metadata=metadata,
+                                       content=Content(abstract=paper['summary'], outline=None),
+                                       analysis=PaperAnalysis()),
+                           versions=[PaperVersion(version=1, updated=paper['published'])])
+        library.save(entry)
+    return library
+
+
+def main(n_papers: int = 5000) -> bool:
+    rng = random.Random(0)
+    arxiv_ids = [f'25{rng.randint(1, 12):02d}.{i:05d}' for i in range(1, n_papers + 1)]
+    with tempfile.TemporaryDirectory() as tmp_dir, StubServer(faults=StubFaults(latency_ms=API_LATENCY_MS)) as stub:
+        tmp_dir = Path(tmp_dir)
+        start = time.perf_counter()
+        library = make_library(tmp_dir / 'library', arxiv_ids)
+        print(f'library of {n_papers} papers built in {time.perf_counter() - start:.1f} s')
+        for arxiv_id in rng.sample(arxiv_ids, int(n_papers * REVISED)):
+            stub.revise(arxiv_id)
+
+        config = stub_config(stub.url, tmp_dir / 'data', show_progress=False, arxiv_delay_seconds=0)
+        report = watch_versions(library, FetcherManager(config), ParsedDocumentStore(tmp_dir / 'parsed'))
+        pause = FetcherConfig().arxiv_delay_seconds * (report.requests - 1)
+        print(report.render().splitlines()[0])
+        print(f'arxiv requests {stub.stats["arxiv_api"]}, PDFs {stub.stats["arxiv_pdf"]}; '
+              f'with a {FetcherConfig().arxiv_delay_seconds:g} s pause between requests: '
+              f'{report.seconds + pause:.0f} s')
+
+        ok = len(report.updated) == int(n_papers * REVISED) and not report.failed and not report.missing
+        ok = stub.stats['arxiv_api'] == report.requests and ok
+        status = 'OK' if report.seconds + pause <= BUDGET_SECONDS and ok else 'OVER BUDGET'
+        print(f'{"version check":<36} {report.seconds + pause:8.1f} s <= {BUDGET_SECONDS:.0f} s  [{status}]')
+        return status == 'OK'
+
+
+if __name__ == '__main__':
+    ok = main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,194 @@
+# coding=utf-8
+"""
+Shared helpers for the benchmark suite.
+
+Benchmarks run against a synthetic two-column "paper" generated with PyMuPDF, so they
+are reproducible offline. Pass a real PDF path on the command line to benchmark it instead.
+
+Run a benchmark from the repo root, e.g.:
+    python -m benchmarks.bench_layout [file.pdf]
+"""
+import math
+import random
+import statistics
+import time
+from pathlib import Path
+from typing import Callable
+
+import fitz
+
+WORDS = (
+    'model language training data attention layer token reasoning benchmark evaluation '
+    'transformer policy reward agent retrieval context inference latency throughput sparse '
+    'dense vision encoder decoder alignment preference dataset scaling parameter optimization '
+    'gradient loss objective representation embedding memory tool planning search'
+).split()
+
+SECTIONS = [
+    ('Introduction', ['Background', 'Contributions']),
+    ('Related Work', []),
+    ('Method', ['Architecture', 'Training Objective', 'Inference']),
+    ('Experiments', ['Setup', 'Main Results', 'Ablations']),
+    ('Conclusion', []),
+]
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+COLUMNS = [(72, 300), (312, 540)]
+TOP, BOTTOM = 60, 740
+
+
+def sentence(rng: random.Random, n_words: int) -> str:
+    words = [rng.choice(WORDS) for _ in range(n_words)]
+    return ' '.join(words).capitalize() + '.'
+
+
+def paragraph(rng: random.Random, n_sentences: int = 5) -> str:
+    return ' '.join(sentence(rng, rng.randint(8, 16)) for _ in range(n_sentences))
+
+
+class _Flow:
+    """Pour text into two columns, page after page."""
+
+    def __init__(self, doc: fitz.Document):
+        self.doc = doc
+        self.page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        self.col = 0
+        self.top = TOP
+        self.y = TOP
+
+    def _advance(self):
+        if self.col == 0:
+            self.col = 1
+        else:
+            self.page = self.doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+            self.col = 0
+            self.top = TOP
+        self.y = self.top
+
+    def text(self, text: str, fontsize: float = 9.5, fontname: str = 'tiro', gap: float = 6.0):
+        x0, x1 = COLUMNS[self.col]
+        n_lines = math.ceil(fitz.get_text_length(text, fontname=fontname, fontsize=fontsize) / (x1 - x0) * 1.15)
+        height = (n_lines + 1) * fontsize * 1.3
+        if self.y + height > BOTTOM:
+            self._advance()
+            x0, x1 = COLUMNS[self.col]
+        while True:
+            # `insert_textbox` writes nothing and returns a negative value when the text does not fit.
+            unused = self.page.insert_textbox(fitz.Rect(x0, self.y, x1, self.y + height), text,
+                                              fontsize=fontsize, fontname=fontname)
+            if unused >= 0:
+                break
+            height += fontsize * 1.3
+        self.y += height - unused + gap
+
+    def table(self, caption: str, n_rows: int = 5, n_cols: int = 4):
+        x0, x1 = COLUMNS[self.col]
+        row_h = 14
+        height = n_rows * row_h + 30
+        if self.y + height > BOTTOM:
+            self._advance()
+            x0, x1 = COLUMNS[self.col]
+        self.text(caption, fontsize=9, fontname='tiro', gap=2)
+        top = self.y
+        col_w = (x1 - x0) / n_cols
+        for r in range(n_rows + 1):
+            y = top + r * row_h
+            width = 1.0 if r in (0, 1, n_rows) else 0.4
+            self.page.draw_line((x0, y), (x1, y), width=width)
+        for r in range(n_rows):
+            for c in range(n_cols):
+                cell = 'Model' if r == 0 and c == 0 else (f'M{r}' if c == 0 else f'{(r * 7 + c * 3) % 50 + 40}.{r}')
+                self.page.insert_text((x0 + c * col_w + 3, top + r * row_h + 10), cell, fontsize=8, fontname='tiro')
+        self.y = top + n_rows * row_h + 12
+
+
+def make_paper_pdf(path: str | Path,
+                   n_pages: int = 8,
+                   seed: int = 0,
+                   arxiv_id: str = '2501.01234',
+                   title: str = 'Sparse Attention for Efficient Long-Context Reasoning',
+                   n_references: int = 30) -> Path:
+    """
+    Write a synthetic arXiv-like paper: title, two columns, running heads, page numbers, an arXiv
+    stamp in the margin, section headings, ruled tables and a reference list.
+
+    `n_pages` sizes the body text, the references add a page or two on top of it.
+    """
+    rng = random.Random(seed)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    doc = fitz.open()
+    flow = _Flow(doc)
+    first = flow.page
+    first.insert_textbox(fitz.Rect(72, 60, 540, 110), title, fontsize=17, fontname='hebo', align=fitz.TEXT_ALIGN_CENTER)
+    first.insert_textbox(fitz.Rect(72, 112, 540, 130), 'Ada Lovelace, Alan Turing, Grace Hopper',
+                         fontsize=10, fontname='helv', align=fitz.TEXT_ALIGN_CENTER)
+    first.insert_text((18, 560), f'arXiv:{arxiv_id}v1  [cs.CL]  1 Jan 2025', fontsize=14, fontname='tiro', rotate=90)
+    flow.top = flow.y = 145
+
+    flow.text('Abstract', fontsize=11, fontname='hebo', gap=2)
+    flow.text(paragraph(rng, 6), fontsize=9)
+
+    paragraphs_per_page = 7
+    budget = max(1, (n_pages - 1) * paragraphs_per_page)
+    n_subsections = sum(max(1, len(subs)) for _, subs in SECTIONS)
+    per_subsection = max(1, budget // n_subsections)
+    n_tables = 0
+    for i, (section, subsections) in enumerate(SECTIONS, start=1):
+        flow.text(f'{i} {section}', fontsize=12, fontname='hebo', gap=3)
+        for j, subsection in enumerate(subsections or [None], start=1):
+            if subsection:
+                flow.text(f'{i}.{j} {subsection}', fontsize=10.5, fontname='hebo', gap=2)
+            for k in range(per_subsection):
+                flow.text(paragraph(rng))
+                if section == 'Experiments' and k == 0:
+                    n_tables += 1
+                    flow.table(f'Table {n_tables}: Results of {subsection.lower()} on long-context benchmarks.')
+
+    flow.text('References', fontsize=12, fontname='hebo', gap=3)
+    for r in range(n_references):
+        year = 2019 + r % 6
+        if r % 3 == 0:
+            ref_id = f'arXiv:{year % 100:02d}{(r % 12) + 1:02d}.{10000 + r * 37:05d}'
+        elif r % 3 == 1:
+            ref_id = f'doi:10.{18653 + r}/v1/{year}.acl-long.{r}'
+        else:
+            ref_id = f'In Proceedings of NeurIPS {year}'
+        flow.text(f'[{r + 1}] {sentence(rng, 3)[:-1]}. {sentence(rng, 9)} {ref_id}.', fontsize=8.5, gap=3)
+
+    short_title = title if len(title) < 60 else title[:57] + '...'
+    for page in doc:
+        number = page.number + 1
+        if number > 1:
+            page.insert_text((72, 40), short_title, fontsize=8, fontname='helv')
+        page.insert_text((PAGE_WIDTH / 2 - 4, 770), str(number), fontsize=9, fontname='tiro')
+
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def timeit(fn: Callable, repeat: int = 5) -> list[float]:
+    """Run `fn` `repeat` times and return the wall times in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def report(name: str, times: list[float], unit_count: int = 1, unit: str = 'op') -> float:
+    """Print a one-line summary and return the median time per unit in milliseconds."""
+    per_unit = [t / unit_count * 1000 for t in times]
+    median = statistics.median(per_unit)
+    print(f'{name:<36} median {median:8.3f} ms/{unit}   min {min(per_unit):8.3f}   max {max(per_unit):8.3f}')
+    return median
+
+
+def check_budget(name: str, value_ms: float, budget_ms: float) -> bool:
+    ok = value_ms <= budget_ms
+    status = 'OK' if ok else 'OVER BUDGET'
+    print(f'{name:<36} {value_ms:8.3f} ms <= {budget_ms:.3f} ms  [{status}]')
+    return ok
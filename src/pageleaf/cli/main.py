@@ -1,3 +1,311 @@
 # coding=utf-8
-def app():
-    print('1')
+import logging
+from pathlib import Path
+
+import typer
+
+app = typer.Typer(help='PageLeaf, a personal paper-reading assistant.', no_args_is_help=True)
+
+
+@app.callback()
+def main(verbose: bool = typer.Option(False, '--verbose', '-v', help='Log at debug level.')):
+    logging.basicConfig(level=logging.DEBUG if verbose else logging.INFO,
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+
+@app.command('import')
+def import_pdfs(directory: Path = typer.Argument(..., exists=True, file_okay=False, help='Folder of PDF files.'),
+                pattern: str = typer.Option('*.pdf', help='Glob pattern of the files to import.'),
+                workers: int | None = typer.Option(None, help='Worker processes, 0 to run in this process.'),
+                library_dir: Path | None = typer.Option(None, help='Library root.'),
+                documents_dir: Path | None = typer.Option(None, help='Parsed document store root.'),
+                local: bool = typer.Option(False, help='Run here even if `pageleaf serve` is running.')):
+    """Import a folder of local PDFs into the library, skipping files imported before."""
+    client = None if local or library_dir or documents_dir else _daemon(timeout=24 * 3600)
+    if client is not None:
+        report = client.import_dir(directory, pattern, workers)
+    else:
+        from pageleaf.ingest.local_ingesters import LocalPdfImporter
+        from pageleaf.storage.documents import ParsedDocumentStore
+        from pageleaf.storage.library import PaperLibrary
+
+        importer = LocalPdfImporter(PaperLibrary(library_dir), ParsedDocumentStore(documents_dir),
+                                    max_workers=workers)
+        report = importer.run(directory, pattern).model_dump()
+    typer.echo(', '.join(f'{name}: {count}' for name, count in report.items()))
+
+
+@app.command('export')
+def export_library(target: Path = typer.Argument(..., help='JSONL file, or directory for the columnar format.'),
+                   fmt: str = typer.Option('jsonl', '--format', help='jsonl or columnar.'),
+                   library_dir: Path | None = typer.Option(None, help='Library root.')):
+    """Export the whole library to one JSONL file or a columnar directory."""
+    from pageleaf.storage.export import export_library as export
+    from pageleaf.storage.library import PaperLibrary
+
+    n = export(PaperLibrary(library_dir), target, fmt)
+    typer.echo(f'exported: {n}')
+
+
+@app.command('restore')
+def restore_library(source: Path = typer.Argument(..., exists=True, help='A JSONL or columnar export.'),
+                    overwrite: bool = typer.Option(False, help='Replace entries already in the library.'),
+                    library_dir: Path | None = typer.Option(None, help='Library root.')):
+    """Load a library export, as written by `export`."""
+    from pageleaf.storage.export import import_library
+    from pageleaf.storage.library import PaperLibrary
+
+    n = import_library(PaperLibrary(library_dir), source, overwrite=overwrite)
+    typer.echo(f'imported: {n}')
+
+
+@app.command('query')
+def query_library(category: list[str] = typer.Option([], help='arXiv category, repeat for any of several.'),
+                  label: list[str] = typer.Option([], help='Engagement label, repeat to require all.'),
+                  since: str | None = typer.Option(None, help='Published on or after, YYYY-MM-DD.'),
+                  until: str | None = typer.Option(None, help='Published on or before, YYYY-MM-DD.'),
+                  min_upvotes: int | None = typer.Option(None, help='Minimum HF upvotes.'),
+                  min_stars: int | None = typer.Option(None, help='Minimum GitHub stars.'),
+                  tier: list[str] = typer.Option([], help='p0, p1 or p2, repeat for any of several.'),
+                  sort: str | None = typer.Option(None, help='publish_date, hf_upvotes, github_stars or rating.'),
+                  ascending: bool = typer.Option(False, help='Sort ascending.'),
+                  limit: int = typer.Option(20, help='Papers to list.'),
+                  facet: list[str] = typer.Option([], help='Also count matches by categories, labels, year, tier.'),
+                  library_dir: Path | None = typer.Option(None, help='Library root.'),
+                  index_dir: Path | None = typer.Option(None, help='Metadata index root.'),
+                  local: bool = typer.Option(False, help='Run here even if `pageleaf serve` is running.')):
+    """Filter, sort and facet the library metadata."""
+    params = dict(categories=category, labels=label, since=since, until=until, min_upvotes=min_upvotes,
+                  min_stars=min_stars, tiers=tier, sort_by=sort, descending=not ascending, limit=limit,
+                  facets=facet)
+    client = None if local or library_dir or index_dir else _daemon()
+    if client is not None:
+        result = client.query(**params)
+    else:
+        from pageleaf.engine.metadata_index import MetadataIndex, query_rows
+        from pageleaf.storage.library import PaperLibrary
+
+        result = query_rows(MetadataIndex.open(PaperLibrary(library_dir), index_dir), **params)
+
+    typer.echo(f'{result["total"]} papers')
+    for paper in result['papers']:
+        stars = paper['github_stars'] if paper['github_stars'] is not None else '-'
+        typer.echo(f'{paper["id"]}  {paper["publish_date"] or "----------"}  '
+                   f'{paper["hf_upvotes"]:>5}  {stars:>6}  {paper["title"]}')
+    for field, counts in result['facets'].items():
+        typer.echo(f'\n{field}:')
+        for value, count in counts.items():
+            typer.echo(f'  {value}: {count}')
+
+
+@app.command('dedup')
+def dedup(threshold: float = typer.Option(0.5, help='Estimated Jaccard similarity of near-duplicates.'),
+          link: bool = typer.Option(False, help='Record the pairs in `paper_relations.duplicates`.'),
+          library_dir: Path | None = typer.Option(None, help='Library root.'),
+          documents_dir: Path | None = typer.Option(None, help='Parsed document store root.')):
+    """List near-duplicate papers in the library: the same work under different identities."""
+    from pageleaf.pipelines.relations import find_duplicates, update_duplicates
+    from pageleaf.storage.documents import ParsedDocumentStore
+    from pageleaf.storage.library import PaperLibrary
+
+    library, documents = PaperLibrary(library_dir), ParsedDocumentStore(documents_dir)
+    for a, b, similarity in find_duplicates(library, documents, threshold):
+        typer.echo(f'{similarity:.2f}  {a}  {library.get(a).paper.metadata.title}')
+        typer.echo(f'      {b}  {library.get(b).paper.metadata.title}')
+    if link:
+        typer.echo(f'linked: {update_duplicates(library, documents, threshold)}')
+
+
+@app.command('hf-daily')
+def hf_daily(since: str = typer.Argument(..., help='First day, YYYY-MM-DD.'),
+             until: str | None = typer.Argument(None, help='Last day, YYYY-MM-DD, `since` if omitted.'),
+             min_upvotes: int = typer.Option(50, help='Upvotes for a paper to become a P1 candidate.'),
+             refresh: bool = typer.Option(False, help='Fetch days already in the cache again.'),
+             mark: bool = typer.Option(False, help='Set tier P1 on candidates already in the library.'),
+             library_dir: Path | None = typer.Option(None, help='Library root.')):
+    """Track Hugging Face daily papers over a date range."""
+    from datetime import date
+
+    from pageleaf.fetchers.hf_daily import HuggingFaceDailyFetcher, mark_candidates
+    from pageleaf.storage.library import PaperLibrary
+
+    start = date.fromisoformat(since)
+    end = date.fromisoformat(until) if until else start
+    result = HuggingFaceDailyFetcher(min_upvotes=min_upvotes).fetch_range(start, end, refresh=refresh)
+    typer.echo(f'{result.days} days, {result.papers} papers, {result.requests} requests')
+    for candidate in result.candidates:
+        typer.echo(f'{candidate.arxiv_id}  {candidate.upvotes:>5}  {candidate.title}')
+    if mark:
+        typer.echo(f'marked: {mark_candidates(PaperLibrary(library_dir), result.candidates)}')
+
+
+@app.command('watch-versions')
+def watch_versions(batch_size: int | None = typer.Option(None, help='Papers per arXiv API request.'),
+                   dry_run: bool = typer.Option(False, help='Only list the papers with a new version.'),
+                   library_dir: Path | None = typer.Option(None, help='Library root.')):
+    """Check every arXiv paper of the library for a new version, fetch and re-parse those that have one."""
+    from pageleaf.pipelines.versions import watch_versions as watch
+    from pageleaf.storage.library import PaperLibrary
+
+    typer.echo(watch(PaperLibrary(library_dir), batch_size=batch_size, dry_run=dry_run).render())
+
+
+@app.command('serve')
+def serve(port: int = typer.Option(8765, help='Loopback port, 0 for any free port.'),
+          inbox: Path | None = typer.Option(None, help='Inbox folder, {data root}/inbox by default.'),
+          watch: bool = typer.Option(True, help='Ingest files dropped into the inbox.'),
+          interval: float = typer.Option(2.0, help='Seconds between inbox polls.'),
+          workers: int | None = typer.Option(None, help='Worker processes for PDF imports.')):
+    """Run the daemon: warm caches, a loopback JSON API and the inbox watcher."""
+    import signal
+
+    from pageleaf.server.http import ApiServer
+    from pageleaf.server.inbox import InboxWatcher
+    from pageleaf.server.service import PageleafService
+
+    service = PageleafService(import_workers=workers)
+    _ = service.index  # warm up before the first request.
+    server = ApiServer(service, port=port)
+    watcher = InboxWatcher(service, inbox, interval) if watch else None
+    server.write_state()
+    if watcher is not None:
+        watcher.start()
+    typer.echo(f'serving on {server.url}')
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        server.remove_state()
+        server.server_close()
+        service.close()
+
+
+@app.command('profile')
+def profile(target: str = typer.Argument(..., help='A PDF file, or the arXiv id or library id of a paper.'),
+            folded: Path | None = typer.Option(None, help='Write folded stacks here, for flamegraph.pl or speedscope.'),
+            pstats_file: Path | None = typer.Option(None, '--pstats', help='Write the cProfile stats here.'),
+            memory: bool = typer.Option(True, help='Also measure the peak memory of each stage.'),
+            top: int = typer.Option(20, help='Functions to list by cumulative time.'),
+            library_dir: Path | None = typer.Option(None, help='Library root.')):
+    """Profile parsing and storing one PDF: time and peak memory per stage."""
+    from pageleaf.pipelines.profiling import profile_pdf, resolve_pdf
+    from pageleaf.storage.library import PaperLibrary
+
+    pdf_file = resolve_pdf(target, PaperLibrary(library_dir))
+    report = profile_pdf(pdf_file, memory=memory, top=top, pstats_file=pstats_file)
+    typer.echo(report.render())
+    if folded:
+        folded.write_text(report.folded, encoding='utf-8')
+        typer.echo(f'\nfolded stacks: {folded}')
+
+
+@app.command('stub')
+def stub(port: int = typer.Option(8766, help='Loopback port, 0 for any free port.'),
+         latency_ms: float = typer.Option(0.0, help='Delay added to every response.'),
+         jitter_ms: float = typer.Option(0.0, help='Mean of an exponential extra delay.'),
+         rate_limit: float = typer.Option(0.0, help='Requests per second before answering 429, 0 for none.'),
+         error_rate: float = typer.Option(0.0, help='Share of requests answered 429 at random.'),
+         truncate_rate: float = typer.Option(0.0, help='Share of response bodies cut short.')):
+    """Run the local arXiv/Hugging Face stand-in, for benchmarks and load tests."""
+    import time
+
+    from pageleaf.config.fetchers import FetcherConfig
+    from pageleaf.fetchers.stub import StubFaults, StubServer, stub_config
+
+    faults = StubFaults(latency_ms=latency_ms, jitter_ms=jitter_ms, rate_limit=rate_limit, error_rate=error_rate,
+                        truncate_rate=truncate_rate)
+    with StubServer(port, faults) as server:
+        typer.echo(f'stub on {server.url}, point the fetchers at it with:')
+        for name, value in stub_config(server.url, FetcherConfig().data_dir).env().items():
+            typer.echo(f'  export {name}={value}')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+@app.command('loadtest')
+def loadtest(papers: int = typer.Option(100, help='Papers to fetch.'),
+             concurrency: int = typer.Option(8, help='Fetching threads.'),
+             latency_ms: float = typer.Option(30.0, help='Delay the stub adds to every response.'),
+             jitter_ms: float = typer.Option(30.0, help='Mean of an exponential extra delay.'),
+             rate_limit: float = typer.Option(0.0, help='Stub requests per second before 429s, 0 for none.'),
+             error_rate: float = typer.Option(0.02, help='Share of requests the stub answers 429.'),
+             truncate_rate: float = typer.Option(0.02, help='Share of bodies the stub cuts short.'),
+             retry_after: float = typer.Option(0.2, help='Retry-After seconds sent with 429s.'),
+             base_url: str | None = typer.Option(None, help='Use a running `pageleaf stub` instead.')):
+    """Fetch made-up papers from the stub server, report throughput and tail latency."""
+    from pageleaf.fetchers.stub import StubFaults
+    from pageleaf.pipelines.loadtest import run_load_test
+
+    # every failure is logged, the report counts them.
+    logging.getLogger('pageleaf.fetchers').setLevel(logging.CRITICAL)
+    logging.getLogger('arxiv').setLevel(logging.WARNING)
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    faults = StubFaults(latency_ms=latency_ms, jitter_ms=jitter_ms, rate_limit=rate_limit, error_rate=error_rate,
+                        truncate_rate=truncate_rate, retry_after=retry_after)
+    report = run_load_test(papers, concurrency, faults, base_url=base_url)
+    typer.echo(report.render())
+
+
+@app.command('migrate-data')
+def migrate_data(root: Path | None = typer.Option(None, help='Data root, PAGELEAF_DATA_ROOT or ~/data/papers.'),
+                 dry_run: bool = typer.Option(False, help='Count the files to move, move nothing.')):
+    """Move fetched files from flat source directories into their YYMM shards, safe while fetching."""
+    from pageleaf.config.paths import DataLayout
+
+    layout = DataLayout(root)
+    typer.echo(f'data root: {layout.root}')
+    typer.echo(layout.migrate(dry_run=dry_run).render())
+
+
+@app.command('compress')
+def compress(codec: str | None = typer.Option(None, help='zlib, zstd or none, PAGELEAF_CODEC by default.'),
+             train: bool = typer.Option(True, help='Train a new dictionary for the JSON caches.'),
+             samples: int = typer.Option(2000, help='JSON files to train the dictionary on.'),
+             root: Path | None = typer.Option(None, help='Data root, PAGELEAF_DATA_ROOT or ~/data/papers.')):
+    """Compress the JSON caches and parsed documents of the data root in place, safe while in use."""
+    from pageleaf.pipelines.compress import compress_data
+
+    typer.echo(compress_data(root, codec, train=train, n_samples=samples).render())
+
+
+@app.command('tables')
+def tables(target: str = typer.Argument(..., help='A PDF file, or the arXiv id or library id of a paper.'),
+           page: list[int] = typer.Option([], help='Page number, repeat for several; all pages by default.'),
+           refresh: bool = typer.Option(False, help='Detect again instead of reading the cache.'),
+           library_dir: Path | None = typer.Option(None, help='Library root.')):
+    """Print the tables of a PDF as markdown, detected on demand and cached with the parsed document."""
+    from pageleaf.pipelines.profiling import resolve_pdf
+    from pageleaf.storage.documents import ParsedDocumentStore
+    from pageleaf.storage.library import PaperLibrary
+
+    store = ParsedDocumentStore()
+    pages = store.load_tables(resolve_pdf(target, PaperLibrary(library_dir)), pages=page or None, refresh=refresh)
+    for page_tables in pages.values():
+        for table in page_tables.tables:
+            typer.echo(f'page {table.page_number}: {table.caption or "(no caption)"}')
+            typer.echo(table.to_markdown() + '\n')
+    stats = store.tables.stats
+    typer.echo(f'{sum(len(p.tables) for p in pages.values())} tables on {len(pages)} pages; '
+               f'{stats.pages} pages checked in {stats.check_seconds * 1000:.0f} ms, {stats.candidates} detected '
+               f'in {stats.detect_seconds * 1000:.0f} ms')
+
+
+def _daemon(timeout: float = 30.0):
+    from pageleaf.server.client import PageleafClient
+
+    return PageleafClient.discover(timeout=timeout)
+
+
+if __name__ == '__main__':
+    app()
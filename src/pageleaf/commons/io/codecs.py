@@ -0,0 +1,306 @@
+# coding=utf-8
+"""
+Storage codecs: compressed files that read back through the same calls as plain ones.
+
+A compressed file keeps its name and starts with an 8-byte header
+    b'PLZ', codec (1 byte), dictionary id (uint32, 0 for none)
+followed by the compressed data. JSON never starts with 'P', so `decode` tells the two
+apart and `json_load` reads either; gzip files are read as well.
+
+Codecs:
+    zlib    stdlib, always available
+    zstd    faster at a better ratio, when the optional `zstandard` package is installed
+            (`pip install pageleaf[zstd]`)
+
+Most bytes of a small JSON file (fetched metadata, a few KB each) are keys and
+boilerplate repeated in every other file, which a compressor cannot exploit one file at
+a time. A dictionary trained on a sample of them primes the compressor with that shared
+text. It is saved as `.codecs/{id}.dict` at the data root, and `decode` finds it by
+walking up from the file it reads.
+
+Large texts are written as seekable frames: independent blocks of `frame_size`
+uncompressed bytes behind an offset table, so reading a range only inflates the frames
+it touches. `decode` inflates all of them.
+"""
+import gzip
+import logging
+import os
+import struct
+import threading
+import zlib
+from collections import Counter, OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'PLZ'
+FRAMES_MAGIC = b'PLZF'
+DICT_DIR = '.codecs'
+HEADER = struct.Struct('>3scI')
+# magic, codec, dictionary id, frame size, uncompressed size, number of frames.
+FRAMES_HEADER = struct.Struct('>4scIIQI')
+
+_CODEC_IDS = {'zlib': b'z', 'zstd': b's'}
+_CODEC_NAMES = {v: k for k, v in _CODEC_IDS.items()}
+_GZIP_MAGIC = b'\x1f\x8b'
+_ZLIB_WINDOW = 32 * 1024  # a zlib dictionary beyond this is never referenced
+_dictionaries: dict[int, bytes] = {}
+
+
+def available_codecs() -> list[str]:
+    return ['none', 'zlib'] + (['zstd'] if zstandard is not None else [])
+
+
+def dictionary_id(dictionary: bytes) -> int:
+    return zlib.crc32(dictionary) or 1
+
+
+def save_dictionary(root: str | Path, dictionary: bytes) -> int:
+    """Save `dictionary` under `{root}/.codecs/`, return its id."""
+    dict_id = dictionary_id(dictionary)
+    path = Path(root) / DICT_DIR / f'{dict_id:08x}.dict'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if not path.exists():
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_bytes(dictionary)
+        os.replace(tmp_path, path)
+    _dictionaries[dict_id] = dictionary
+    return dict_id
+
+
+def load_dictionary(dict_id: int, near: str | Path | None = None) -> bytes:
+    """The dictionary `dict_id`, looked up in `.codecs/` of the ancestors of `near`."""
+    if dict_id in _dictionaries:
+        return _dictionaries[dict_id]
+    name = f'{dict_id:08x}.dict'
+    for directory in Path(near).resolve().parents if near else ():
+        path = directory / DICT_DIR / name
+        if path.exists():
+            _dictionaries[dict_id] = path.read_bytes()
+            return _dictionaries[dict_id]
+    raise FileNotFoundError(f'Compression dictionary {name} not found for {near}')
+
+
+def train_dictionary(samples: list[bytes], size: int = _ZLIB_WINDOW, codec: str = 'zlib') -> bytes:
+    """
+    A dictionary of the text shared by `samples`.
+
+    zstd trains its own (COVER). For zlib, which takes any bytes as a preset dictionary,
+    the lines found in more than one sample are kept by the bytes they would save,
+    the most valuable last where the compressor finds them at the shortest distance.
+    """
+    if codec == 'zstd' and zstandard is not None:
+        try:
+            return zstandard.train_dictionary(size, samples).as_bytes()
+        except zstandard.ZstdError as e:
+            logger.warning(f'zstd dictionary training failed ({e}), using shared lines')
+    size = min(size, _ZLIB_WINDOW) if codec == 'zlib' else size
+    counts = Counter()
+    for sample in samples:
+        counts.update({line for line in sample.splitlines() if len(line.strip()) > 3})
+    chosen, total = [], 0
+    for line, n in sorted(counts.items(), key=lambda item: (-item[1] * len(item[0]), item[0])):
+        if n < 2 or total + len(line) + 1 > size:
+            continue
+        chosen.append(line)
+        total += len(line) + 1
+    return b'\n'.join(reversed(chosen))
+
+
+class StorageCodec:
+    """
+    Usage:
+        codec = StorageCodec('zlib', dictionary)
+        path.write_bytes(codec.encode(data))
+        decode(path.read_bytes(), path) == data
+    """
+
+    def __init__(self, name: str = 'zlib', dictionary: bytes | None = None, level: int | None = None):
+        if name not in available_codecs():
+            raise ValueError(f'Codec {name!r} is not available, choose from {available_codecs()}')
+        self.name = name
+        self.dictionary = dictionary or None
+        self.dict_id = dictionary_id(dictionary) if dictionary else 0
+        if self.dictionary:
+            _dictionaries[self.dict_id] = self.dictionary
+        self.level = level
+        self._zlib = None
+        # zstd compressors must not be shared between threads, each thread primes its own.
+        self._zstd = threading.local()
+
+    def __repr__(self):
+        return f'StorageCodec({self.name!r}, dict_id={self.dict_id:08x})'
+
+    def __getstate__(self):
+        # compressors are not picklable, a codec sent to a worker process primes its own.
+        return {name: value for name, value in self.__dict__.items() if name not in ('_zlib', '_zstd')}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, _zlib=None, _zstd=threading.local())
+        if self.dictionary:
+            _dictionaries[self.dict_id] = self.dictionary
+
+    def compress(self, data: bytes) -> bytes:
+        """The compressed data alone, without a header."""
+        if self.name == 'zlib':
+            if self._zlib is None:
+                # priming a compressor with the dictionary costs more than copying a primed one.
+                level = 6 if self.level is None else self.level
+                self._zlib = (zlib.compressobj(level, zdict=self.dictionary) if self.dictionary
+                              else zlib.compressobj(level))
+            compressor = self._zlib.copy()
+            return compressor.compress(data) + compressor.flush()
+        if self.name == 'zstd':
+            compressor = getattr(self._zstd, 'compressor', None)
+            if compressor is None:
+                dict_data = zstandard.ZstdCompressionDict(self.dictionary) if self.dictionary else None
+                compressor = self._zstd.compressor = zstandard.ZstdCompressor(
+                    level=3 if self.level is None else self.level, dict_data=dict_data)
+            return compressor.compress(data)
+        return bytes(data)
+
+    def encode(self, data: bytes) -> bytes:
+        if self.name == 'none':
+            return data
+        return HEADER.pack(MAGIC, _CODEC_IDS[self.name], self.dict_id) + self.compress(data)
+
+
+def _decompress(codec: bytes, data, dictionary: bytes | None) -> bytes:
+    if codec == b'z':
+        decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+        return decompressor.decompress(data) + decompressor.flush()
+    if codec == b's':
+        if zstandard is None:
+            raise RuntimeError('The file is zstd-compressed, install the `zstandard` package to read it')
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(data)
+    raise ValueError(f'Unknown codec {codec!r}')
+
+
+def is_encoded(data: bytes) -> bool:
+    return data[:3] == MAGIC or data[:2] == _GZIP_MAGIC
+
+
+def _decode_frames(data: bytes, path: str | Path | None = None) -> bytes:
+    """The whole content of a file of `write_frames`."""
+    _, codec, dict_id, _, size, n_frames = FRAMES_HEADER.unpack_from(data)
+    dictionary = load_dictionary(dict_id, path) if dict_id else None
+    offsets = np.frombuffer(data, dtype='>u8', count=n_frames + 1, offset=FRAMES_HEADER.size).astype(np.int64)
+    frames = memoryview(data)[FRAMES_HEADER.size + 8 * (n_frames + 1):]
+    content = b''.join(_decompress(codec, frames[offsets[i]:offsets[i + 1]], dictionary) for i in range(n_frames))
+    if len(content) != size:
+        raise ValueError(f'Framed data is truncated: {len(content)} of {size} bytes{f" in {path}" if path else ""}')
+    return content
+
+
+def decode(data: bytes, path: str | Path | None = None) -> bytes:
+    """The content of a file read as `data`, plain, compressed or framed; `path` locates its dictionary."""
+    if data[:4] == FRAMES_MAGIC:
+        return _decode_frames(data, path)
+    if data[:3] == MAGIC:
+        _, codec, dict_id = HEADER.unpack_from(data)
+        dictionary = load_dictionary(dict_id, path) if dict_id else None
+        return _decompress(codec, memoryview(data)[HEADER.size:], dictionary)
+    if data[:2] == _GZIP_MAGIC:
+        return gzip.decompress(data)
+    return data
+
+
+def read_bytes(path: str | Path) -> bytes:
+    path = Path(path)
+    return decode(path.read_bytes(), path)
+
+
+def codec_of(path: str | Path) -> str:
+    """Name of the codec `path` was written with."""
+    with open(path, 'rb') as fin:
+        head = fin.read(FRAMES_HEADER.size)
+    if head[:3] == MAGIC:
+        return _CODEC_NAMES.get(head[4:5] if head[:4] == FRAMES_MAGIC else head[3:4], 'unknown')
+    return 'gzip' if head[:2] == _GZIP_MAGIC else 'none'
+
+
+def write_frames(path: str | Path, data: bytes, codec: StorageCodec, frame_size: int = 1 << 16) -> int:
+    """Write `data` as independently compressed frames of `frame_size` bytes, return the file size."""
+    data = memoryview(data)
+    frames = [codec.compress(data[start:start + frame_size]) for start in range(0, len(data), frame_size)]
+    offsets = np.zeros(len(frames) + 1, dtype='>u8')
+    np.cumsum([len(frame) for frame in frames], out=offsets[1:])
+    with open(path, 'wb') as fout:
+        fout.write(FRAMES_HEADER.pack(FRAMES_MAGIC, _CODEC_IDS[codec.name], codec.dict_id, frame_size, len(data),
+                                      len(frames)))
+        fout.write(offsets.tobytes())
+        for frame in frames:
+            fout.write(frame)
+        return fout.tell()
+
+
+class FramedReader:
+    """
+    Random access to a file of `write_frames`, with the last `cache_frames` frames kept inflated.
+
+    Usage:
+        with FramedReader(path) as reader:
+            reader.read(start, end)
+    """
+
+    def __init__(self, path: str | Path, cache_frames: int = 8):
+        path = Path(path)
+        self._file = open(path, 'rb')
+        header = self._file.read(FRAMES_HEADER.size)
+        magic, self._codec, dict_id, self.frame_size, self.size, n_frames = FRAMES_HEADER.unpack(header)
+        if magic != FRAMES_MAGIC:
+            self._file.close()
+            raise ValueError(f'Not a framed file: {path}')
+        self._dictionary = load_dictionary(dict_id, path) if dict_id else None
+        self._offsets = np.frombuffer(self._file.read(8 * (n_frames + 1)), dtype='>u8').astype(np.int64)
+        self._base = FRAMES_HEADER.size + 8 * (n_frames + 1)
+        self._cache: OrderedDict[int, bytes] = OrderedDict()
+        self._cache_frames = cache_frames
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.size
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def frame(self, i: int) -> bytes:
+        with self._lock:
+            data = self._cache.get(i)
+            if data is not None:
+                self._cache.move_to_end(i)
+                return data
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        data = _decompress(self._codec, os.pread(self._file.fileno(), end - start, self._base + start),
+                           self._dictionary)
+        with self._lock:
+            self._cache[i] = data
+            if len(self._cache) > self._cache_frames:
+                self._cache.popitem(last=False)
+        return data
+
+    def read(self, start: int, end: int) -> bytes:
+        """Uncompressed bytes `start:end`."""
+        end = min(end, self.size)
+        if start >= end:
+            return b''
+        first, last = start // self.frame_size, (end - 1) // self.frame_size
+        offset = start - first * self.frame_size
+        if first == last:
+            return self.frame(first)[offset:offset + end - start]
+        data = b''.join(self.frame(i) for i in range(first, last + 1))
+        return data[offset:offset + end - start]
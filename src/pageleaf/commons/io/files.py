@@ -1,8 +1,11 @@
 # coding=utf-8
+import hashlib
 import json
 from pathlib import Path
 from typing import Callable, Optional, Iterator
 
+from pageleaf.commons.io.codecs import decode, StorageCodec
+
 
 def list_files(
         directory: str | Path,
@@ -37,11 +40,24 @@ def list_files(
 
 
 def json_load(file):
+    """Load a JSON file, plain or written with a `StorageCodec`."""
     file = Path(file)
-    with file.open('r', encoding='utf-8') as fin:
-        return json.load(fin)
+    return json.loads(decode(file.read_bytes(), file))
+
+
+def json_dump(obj, file, ensure_ascii=False, indent=None, codec: StorageCodec | None = None):
+    if codec is None or codec.name == 'none':
+        with open(file, 'w', encoding='utf-8') as fout:
+            json.dump(obj, fout, ensure_ascii=ensure_ascii, indent=indent)
+        return
+    data = json.dumps(obj, ensure_ascii=ensure_ascii, indent=indent).encode('utf-8')
+    Path(file).write_bytes(codec.encode(data))
 
 
-def json_dump(obj, file, ensure_ascii=False, indent=None):
-    with open(file, 'w', encoding='utf-8') as fout:
-        json.dump(obj, fout, ensure_ascii=ensure_ascii, indent=indent)
+def file_sha256(file, chunk_size: int = 1 << 20) -> str:
+    """Hex SHA-256 digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file, 'rb') as fin:
+        while chunk := fin.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
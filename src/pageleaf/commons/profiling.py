@@ -0,0 +1,154 @@
+# coding=utf-8
+"""
+Stage attribution for profiling.
+
+`StageProfiler` temporarily wraps chosen functions, methods and properties so that the
+time (exclusive of nested stages) and the peak traced memory spent in each are
+recorded under a stage name. `StackSampler` samples the stack of a thread and writes
+folded stacks, the input format of flamegraph.pl and speedscope.
+"""
+import inspect
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+
+@dataclass
+class StageStats:
+    calls: int = 0
+    seconds: float = 0.0
+    peak_bytes: int = 0
+
+
+@dataclass
+class _Frame:
+    stage: str
+    start: float
+    mem_start: int
+    child_seconds: float = 0.0
+    peak: int = 0
+
+
+@dataclass
+class StageProfiler:
+    """
+    Usage:
+        profiler = StageProfiler()
+        profiler.add(fitz.Page, 'get_text', 'get_text')
+        with profiler.active(memory=True):
+            run()
+        profiler.stats
+    """
+    targets: list[tuple[object, str, str]] = field(default_factory=list)
+    stats: dict[str, StageStats] = field(default_factory=dict)
+
+    def add(self, owner: object, attr: str, stage: str):
+        """Attribute calls of `owner.attr` (a function, method, classmethod or property) to `stage`."""
+        self.targets.append((owner, attr, stage))
+
+    def _wrap(self, fn: Callable, stage: str, memory: bool) -> Callable:
+        stack: list[_Frame] = self._stack
+
+        def wrapper(*args, **kwargs):
+            mem_start = 0
+            if memory:
+                mem_start, peak = tracemalloc.get_traced_memory()
+                # the peak counter is shared, hand what was seen so far to the enclosing frames.
+                for frame in stack:
+                    frame.peak = max(frame.peak, peak)
+                tracemalloc.reset_peak()
+            frame = _Frame(stage, time.perf_counter(), mem_start)
+            stack.append(frame)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stack.pop()
+                elapsed = time.perf_counter() - frame.start
+                stats = self.stats.setdefault(stage, StageStats())
+                stats.calls += 1
+                stats.seconds += elapsed - frame.child_seconds
+                if stack:
+                    stack[-1].child_seconds += elapsed
+                if memory:
+                    peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+                    stats.peak_bytes = max(stats.peak_bytes, peak - frame.mem_start)
+                    for outer in stack:
+                        outer.peak = max(outer.peak, peak)
+
+        return wrapper
+
+    @contextmanager
+    def active(self, memory: bool = False):
+        self._stack = []
+        originals = []
+        for owner, attr, stage in self.targets:
+            if isinstance(owner, type):
+                # inherited attributes are patched on `owner` and deleted again afterwards.
+                original = owner.__dict__.get(attr)
+                raw = inspect.getattr_static(owner, attr)
+            else:
+                original = raw = getattr(owner, attr)
+            originals.append((owner, attr, original))
+
+            if isinstance(raw, property):
+                patched = property(self._wrap(raw.fget, stage, memory))
+            elif isinstance(raw, classmethod):
+                patched = classmethod(self._wrap(raw.__func__, stage, memory))
+            else:
+                patched = self._wrap(raw, stage, memory)
+            setattr(owner, attr, patched)
+
+        started = memory and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        try:
+            yield self
+        finally:
+            if started:
+                tracemalloc.stop()
+            for owner, attr, original in reversed(originals):
+                if original is None:
+                    delattr(owner, attr)
+                else:
+                    setattr(owner, attr, original)
+
+
+class StackSampler:
+    """Sample the stack of one thread every `interval` seconds, count identical stacks."""
+
+    def __init__(self, interval: float = 0.001, thread_id: int | None = None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.counts: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f'{Path(code.co_filename).stem}:{code.co_name}')
+                frame = frame.f_back
+            if names:
+                self.counts[';'.join(reversed(names))] += 1
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        """One `frame;frame;frame count` line per distinct stack."""
+        return '\n'.join(f'{stack} {count}' for stack, count in self.counts.most_common()) + '\n'
@@ -0,0 +1,51 @@
+# coding=utf-8
+"""
+Where the fetchers send their requests and keep what they download.
+
+Every source has a base URL so the fetchers can be pointed at a local stub server
+(`pageleaf stub`) for tests, benchmarks and load tests. The defaults can be overridden
+with environment variables:
+    PAGELEAF_ARXIV_API_URL, PAGELEAF_ARXIV_PDF_URL, PAGELEAF_HF_API_URL
+Downloads go under `data_dir`, the data root of `pageleaf.config.paths` by default, and
+are placed by its `DataLayout`; JSON is written with `codec` (PAGELEAF_CODEC).
+"""
+import os
+from pathlib import Path
+
+from pydantic import BaseModel, Field
+
+from pageleaf.config.paths import data_root, DataLayout, default_codec
+
+ENV_URLS = {
+    'arxiv_api_url': 'PAGELEAF_ARXIV_API_URL',
+    'arxiv_pdf_url': 'PAGELEAF_ARXIV_PDF_URL',
+    'hf_api_url': 'PAGELEAF_HF_API_URL',
+}
+
+
+class FetcherConfig(BaseModel):
+    arxiv_api_url: str = 'https://export.arxiv.org/api/query'
+    arxiv_pdf_url: str = 'https://arxiv.org/pdf'
+    hf_api_url: str = 'https://huggingface.co/api'
+    data_dir: Path = Field(default_factory=data_root)
+    codec: str = Field(default_factory=default_codec)  # of the JSON caches, 'none' for plain JSON
+
+    timeout: float = 30.0
+    max_retries: int = 3
+    retry_cap: float = 30.0  # longest wait for a throttled request, in seconds
+    arxiv_delay_seconds: float = 3.0  # between retries of an arXiv API request
+    arxiv_batch_size: int = 200  # papers per arXiv API request of a bulk metadata query
+    show_progress: bool = True  # download progress on a terminal
+
+    @classmethod
+    def from_env(cls, **kwargs) -> 'FetcherConfig':
+        urls = {field: os.environ[name] for field, name in ENV_URLS.items() if os.environ.get(name)}
+        return cls(**{**urls, **kwargs})
+
+    @property
+    def layout(self) -> DataLayout:
+        return DataLayout(self.data_dir)
+
+    def env(self) -> dict[str, str]:
+        """The environment variables that point other processes at the same URLs."""
+        return {name: getattr(self, field) for field, name in ENV_URLS.items()}
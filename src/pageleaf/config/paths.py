@@ -0,0 +1,204 @@
+# coding=utf-8
+"""
+Where pageleaf keeps its data.
+
+Everything lives under one data root, `~/data/papers` unless PAGELEAF_DATA_ROOT is set,
+so the whole tree can be moved to a faster local disk:
+    {root}/arxiv/{YYMM}/     arXiv metadata `{arxiv id}.json` and PDFs `{arxiv id} - {title}.pdf`
+    {root}/hf/{YYMM}/        Hugging Face paper pages, `{arxiv id}.json`
+    {root}/fetched/{YYMM}/   `FetcherManager` results, `{arxiv id}.json`
+    {root}/library, parsed, index, cache, imports, inbox    the stores
+
+The per-paper files of a source are sharded by the YYMM prefix of their arXiv id, a few
+thousand files per directory at today's submission rates, instead of a single directory
+that every listing and `exists()` check has to search. Files without an arXiv id stay at
+the top of their source directory.
+
+JSON caches are written with the `StorageCodec` of PAGELEAF_CODEC (zlib unless set,
+`none` writes plain JSON) and the dictionary trained for the root, see
+`commons.io.codecs`; `json_load` reads them either way.
+
+Trees written before sharding are moved with `DataLayout.migrate` (`pageleaf
+migrate-data`). It moves one file at a time with an atomic rename and can run while
+fetchers are working: `DataLayout.locate` looks in the shard first and then in the flat
+directory, so a file is found wherever it is at that moment.
+"""
+import filecmp
+import logging
+import os
+import re
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from pageleaf.commons.io.codecs import DICT_DIR, load_dictionary, save_dictionary, StorageCodec, train_dictionary
+from pageleaf.commons.io.files import json_dump, json_load
+
+logger = logging.getLogger(__name__)
+
+ENV_DATA_ROOT = 'PAGELEAF_DATA_ROOT'
+ENV_CODEC = 'PAGELEAF_CODEC'
+SHARDED_SOURCES = ('arxiv', 'hf', 'fetched')
+
+_SHARD = re.compile(r'^(\d{4})\.\d{4,5}')
+# payload keys of fetched results that hold a path under the data root.
+_PATH_KEYS = ('pdf_path', 'json_path')
+
+
+def data_root() -> Path:
+    root = os.environ.get(ENV_DATA_ROOT)
+    return Path(root).expanduser() if root else Path.home() / 'data/papers'
+
+
+def data_path(*parts: str) -> Path:
+    """A path under the data root, e.g. `data_path('index', 'similarity')`."""
+    return data_root().joinpath(*parts)
+
+
+def default_codec() -> str:
+    return os.environ.get(ENV_CODEC) or 'zlib'
+
+
+def shard_of(name: str) -> str | None:
+    """The YYMM shard of a file named after an arXiv id, None for other files."""
+    match = _SHARD.match(name)
+    return match.group(1) if match else None
+
+
+def sharded(directory: Path, name: str) -> Path:
+    shard = shard_of(name)
+    return directory / shard / name if shard else directory / name
+
+
+def locate(directory: Path, name: str) -> Path | None:
+    """The file `name` of `directory`, in its shard or still in the flat directory."""
+    path = sharded(directory, name)
+    if path.exists():
+        return path
+    flat = directory / name
+    if flat != path and flat.exists():
+        return flat
+    return None
+
+
+class MigrationReport(BaseModel):
+    moved: int = 0
+    duplicates: int = 0  # flat copies of a file already in its shard, removed
+    conflicts: list[str] = []  # flat files that differ from the one in their shard, left in place
+    rewritten: int = 0  # fetched results and library entries pointing at a moved file
+
+    def render(self) -> str:
+        lines = [f'moved: {self.moved}, duplicates removed: {self.duplicates}, paths rewritten: {self.rewritten}']
+        lines.extend(f'conflict: {path}' for path in self.conflicts)
+        return '\n'.join(lines)
+
+
+class DataLayout:
+    """
+    Usage:
+        layout = DataLayout()  # PAGELEAF_DATA_ROOT or ~/data/papers
+        path = layout.resolve('arxiv', '2501.00042.json')  # where it is, or where to write it
+        layout.migrate()
+    """
+
+    def __init__(self, root: str | Path | None = None):
+        self.root = Path(root).expanduser() if root else data_root()
+
+    def dir(self, *parts: str) -> Path:
+        return self.root.joinpath(*parts)
+
+    def path(self, source: str, name: str) -> Path:
+        """Where the file `name` of `source` belongs, its shard is created if missing."""
+        path = sharded(self.root / source, name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def locate(self, source: str, name: str) -> Path | None:
+        return locate(self.root / source, name)
+
+    def resolve(self, source: str, name: str) -> Path:
+        """The existing file, else where to write it."""
+        return self.locate(source, name) or self.path(source, name)
+
+    def codec(self, name: str | None = None) -> StorageCodec:
+        """Codec `name` for the JSON caches under the root, with their trained dictionary if there is one."""
+        name = name or default_codec()
+        current = self.root / DICT_DIR / 'current'
+        dictionary = None
+        if name != 'none' and current.exists():
+            dictionary = load_dictionary(int(current.read_text().strip(), 16), current)
+        return StorageCodec(name, dictionary)
+
+    def train_dictionary(self, samples: list[bytes], codec: str | None = None) -> int:
+        """Train a dictionary on `samples` and make it the one new files are written with."""
+        dict_id = save_dictionary(self.root, train_dictionary(samples, codec=codec or default_codec()))
+        (self.root / DICT_DIR / 'current').write_text(f'{dict_id:08x}\n')
+        return dict_id
+
+    def migrate(self, sources: tuple[str, ...] = SHARDED_SOURCES, dry_run: bool = False) -> MigrationReport:
+        """Move the flat files of `sources` into their shards, then update the paths recorded to them."""
+        report = MigrationReport()
+        moves: dict[str, str] = {}
+        for source in sources:
+            directory = self.root / source
+            if not directory.is_dir():
+                continue
+            for path in sorted(directory.iterdir()):
+                # skip downloads and writes in flight, they are renamed into place when done.
+                if not path.is_file() or path.suffix in {'.part', '.tmp'}:
+                    continue
+                target = sharded(directory, path.name)
+                if target == path:
+                    continue
+                if target.exists():
+                    if filecmp.cmp(path, target, shallow=False):
+                        if not dry_run:
+                            path.unlink()
+                        moves[str(path)] = str(target)
+                        report.duplicates += 1
+                    else:
+                        report.conflicts.append(str(path))
+                    continue
+                if not dry_run:
+                    target.parent.mkdir(exist_ok=True)
+                    os.replace(path, target)
+                moves[str(path)] = str(target)
+                report.moved += 1
+        if moves and not dry_run:
+            report.rewritten = self._rewrite_paths(moves)
+        logger.info(f'Migrated {self.root}: {report.moved} moved, {report.duplicates} duplicates, '
+                    f'{len(report.conflicts)} conflicts')
+        return report
+
+    def _rewrite_paths(self, moves: dict[str, str]) -> int:
+        # imported here, the stores take their default roots from this module.
+        from pageleaf.storage.library import PaperLibrary
+
+        n, codec = 0, self.codec()
+        fetched = self.root / 'fetched'
+        for path in sorted(fetched.rglob('*.json')) if fetched.is_dir() else []:
+            results = json_load(path)
+            changed = False
+            for raw in results.values():
+                payload = raw.get('payload') or {}
+                for key in _PATH_KEYS:
+                    if payload.get(key) in moves:
+                        payload[key] = moves[payload[key]]
+                        changed = True
+            if changed:
+                json_dump(results, path, indent=2, codec=codec)
+                n += 1
+
+        if (self.root / 'library').is_dir():
+            library = PaperLibrary(self.root / 'library')
+            for entry in library:
+                if entry.pdf_path in moves:
+                    library.save(entry.model_copy(update={'pdf_path': moves[entry.pdf_path]}))
+                    n += 1
+        return n
+
+
+if __name__ == '__main__':
+    layout = DataLayout()
+    print(layout.root)
+    print(layout.migrate(dry_run=True).render())
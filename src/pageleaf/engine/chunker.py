@@ -0,0 +1,235 @@
+# coding=utf-8
+"""
+Token-budgeted text chunks for building LLM context.
+
+Pages are consumed one at a time and blocks are packed into chunks of at most
+`max_tokens`, never across a section boundary; a block larger than the budget is split
+at sentence ends. Every chunk keeps the page number, block index and bbox of the
+blocks it came from.
+
+Chunks are cached per (PDF hash, chunker config, source) next to the parsed document:
+    {parsed root}/{pdf_hash}/chunks/{config key}-{source}.jsonl
+The source is `stream` for chunks of the PDF streamed page by page (headings guessed
+from the text), or `parsed-` and a digest of the size and mtime of the stored document,
+whose outline gives the headings; storing the document again, e.g. re-parsed or with a
+rebuilt outline, changes the key.
+"""
+import hashlib
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import fitz
+from pydantic import BaseModel
+
+from pageleaf.commons.io.files import file_sha256
+from pageleaf.engine.layout import LayoutAnalyzer, flow_text
+from pageleaf.engine.outline import looks_like_heading
+from pageleaf.schemas.io.pdf import DocumentOutline, PdfDocument, PdfPage
+from pageleaf.storage.documents import ParsedDocumentStore
+
+logger = logging.getLogger(__name__)
+
+# words and single punctuation marks, close to BPE token counts of English prose.
+_TOKEN = re.compile(r'\w+|[^\w\s]')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9(\[])')
+# part of the cache key, bump when the chunks a config produces change.
+CHUNKER_VERSION = 1
+
+
+def count_tokens(text: str) -> int:
+    return sum(1 for _ in _TOKEN.finditer(text))
+
+
+class ChunkerConfig(BaseModel):
+    max_tokens: int = 512
+    respect_sections: bool = True
+
+    @property
+    def key(self) -> str:
+        data = f'{CHUNKER_VERSION}:{self.model_dump_json()}'
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()[:12]
+
+
+class ChunkSource(BaseModel):
+    page_number: int
+    block_index: int
+    bbox: tuple[float, float, float, float]
+
+
+class Chunk(BaseModel):
+    index: int
+    text: str
+    n_tokens: int
+    section: list[str] = []  # titles from the top-level section down
+    sources: list[ChunkSource]
+
+    @property
+    def pages(self) -> list[int]:
+        return sorted({source.page_number for source in self.sources})
+
+
+def _cut(word: str, max_tokens: int) -> list[str]:
+    """A run without spaces cut between tokens, `max_tokens` per part."""
+    starts = [match.start() for match in _TOKEN.finditer(word)][::max_tokens] + [len(word)]
+    return [word[a:b] for a, b in zip(starts, starts[1:])]
+
+
+def _split(text: str, max_tokens: int) -> list[str]:
+    """Pieces of an oversized text, at sentence ends where possible."""
+    pieces, current, n_current = [], [], 0
+    for sentence in _SENTENCE_END.split(text):
+        if count_tokens(sentence) > max_tokens:
+            # one huge "sentence" (tables, formulas), cut between words, inside a word only
+            # when the word alone is over the budget.
+            parts = [part for word in sentence.split()
+                     for part in (_cut(word, max_tokens) if count_tokens(word) > max_tokens else [word])]
+        else:
+            parts = [sentence]
+        for part in parts:
+            n = count_tokens(part)
+            if current and n_current + n > max_tokens:
+                pieces.append(' '.join(current))
+                current, n_current = [], 0
+            current.append(part)
+            n_current += n
+    if current:
+        pieces.append(' '.join(current))
+    return pieces
+
+
+class TextChunker:
+    def __init__(self, config: ChunkerConfig | None = None):
+        self.config = config or ChunkerConfig()
+
+    def iter_chunks(self, pages: Iterable[PdfPage], outline: DocumentOutline | None = None) -> Iterator[Chunk]:
+        """
+        Chunk pages whose blocks are in reading order. Section boundaries come from `outline`
+        when given, otherwise from one-line blocks that look like headings.
+        """
+        max_tokens = self.config.max_tokens
+        starts = {(s.page_number, s.block_index): s for s in outline.flatten()} if outline is not None else None
+        path: list[tuple[int, str]] = []  # (level, title) of the current section and its parents
+        texts, sources, n_tokens = [], [], 0
+        has_body = False  # headings alone are not flushed, they open the next chunk
+        index = 0
+
+        def flush():
+            nonlocal texts, sources, n_tokens, has_body, index
+            if texts:
+                yield Chunk(index=index, text='\n\n'.join(texts), n_tokens=n_tokens,
+                            section=[title for _, title in path], sources=sources)
+                index += 1
+            texts, sources, n_tokens, has_body = [], [], 0, False
+
+        for page in pages:
+            for block_index, block in enumerate(page.blocks):
+                if not block.is_text():
+                    continue
+                text = flow_text(block).strip()
+                if not text:
+                    continue
+
+                if starts is not None:
+                    section = starts.get((page.page_number, block_index))
+                    heading = (section.level, section.title) if section else None
+                else:
+                    heading = (1, text) if len(block.lines) == 1 and looks_like_heading(text) else None
+                if heading is not None:
+                    if self.config.respect_sections and has_body:
+                        yield from flush()
+                    path = [item for item in path if item[0] < heading[0]] + [heading]
+
+                source = ChunkSource(page_number=page.page_number, block_index=block_index, bbox=block.bbox)
+                n = count_tokens(text)
+                if n > max_tokens:
+                    for piece in _split(text, max_tokens):
+                        n_piece = count_tokens(piece)
+                        # a pending heading stays with the first piece when it fits.
+                        if has_body or n_tokens + n_piece > max_tokens:
+                            yield from flush()
+                        texts.append(piece)
+                        sources.append(source)
+                        n_tokens += n_piece
+                        has_body = True
+                    continue
+                if n_tokens + n > max_tokens:
+                    yield from flush()
+                texts.append(text)
+                sources.append(source)
+                n_tokens += n
+                has_body = has_body or heading is None
+        yield from flush()
+
+
+def stream_pages(pdf_file: str | Path, analyzer: LayoutAnalyzer | None = None) -> Iterator[PdfPage]:
+    """Text-only pages of a PDF in reading order, parsed one at a time; running heads are dropped."""
+    analyzer = analyzer or LayoutAnalyzer()
+    for page in PdfDocument.iter_file(str(pdf_file), flags=fitz.TEXTFLAGS_TEXT):
+        layout = analyzer.analyze_page(page)
+        running = set(layout.header) | set(layout.footer)
+        yield page.model_copy(update={'blocks': [page.blocks[i] for i in layout.order if i not in running]})
+
+
+class CachedChunker:
+    def __init__(self, documents: ParsedDocumentStore | None = None, config: ChunkerConfig | None = None):
+        self.documents = documents if documents is not None else ParsedDocumentStore()
+        self.chunker = TextChunker(config)
+
+    @property
+    def config(self) -> ChunkerConfig:
+        return self.chunker.config
+
+    def source_key(self, pdf_hash: str) -> str:
+        """What the chunks of `pdf_hash` are made from, see the module doc."""
+        try:
+            stat = self.documents.document_path(pdf_hash).stat()
+        except FileNotFoundError:
+            return 'stream'
+        # a stamp, not a digest of the content: looked up on every cache hit. `put` replaces
+        # the file, so a document stored again gets a new mtime.
+        stamp = f'{stat.st_size}:{stat.st_mtime_ns}'
+        return f'parsed-{hashlib.sha1(stamp.encode("ascii")).hexdigest()[:12]}'
+
+    def cache_path(self, pdf_hash: str, source: str | None = None) -> Path:
+        source = source or self.source_key(pdf_hash)
+        return self.documents.doc_dir(pdf_hash) / 'chunks' / f'{self.config.key}-{source}.jsonl'
+
+    def chunks(self, pdf_file: str | Path, pdf_hash: str | None = None) -> Iterator[Chunk]:
+        """
+        Chunks of a PDF, from the cache when possible. Otherwise the parsed document is used
+        if it is in the store, else the PDF is streamed page by page; the cache is written
+        as chunks are consumed and only kept once the last one has been produced.
+        """
+        pdf_hash = pdf_hash or file_sha256(pdf_file)
+        source = self.source_key(pdf_hash)
+        path = self.cache_path(pdf_hash, source)
+        if path.exists():
+            logger.debug(f'chunks found: {path}')
+            with open(path, 'rb') as fin:
+                for line in fin:
+                    yield Chunk.model_validate_json(line)
+            return
+
+        doc = self.documents.get(pdf_hash) if source != 'stream' else None
+        if doc is not None:
+            chunks = self.chunker.iter_chunks(doc.pages, doc.outline)
+        else:
+            chunks = self.chunker.iter_chunks(stream_pages(pdf_file, self.documents.analyzer))
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        complete = False
+        try:
+            with open(tmp_path, 'wb') as fout:
+                for chunk in chunks:
+                    fout.write(chunk.model_dump_json().encode('utf-8') + b'\n')
+                    yield chunk
+            complete = True
+        finally:
+            if complete:
+                os.replace(tmp_path, path)
+            else:
+                tmp_path.unlink(missing_ok=True)
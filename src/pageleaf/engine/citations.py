@@ -0,0 +1,253 @@
+# coding=utf-8
+"""
+Reference extraction and the citation graph.
+
+References are read from the "References" section of a parsed `PdfDocument`, arXiv IDs
+and DOIs found in them become graph nodes. Nodes are small integers and edges
+(citing -> cited) are kept as CSR arrays, with the transposed CSR for incoming edges,
+so neighbourhood, co-citation and coupling queries are a few vectorized gathers.
+"""
+import logging
+import re
+from pathlib import Path
+
+import numpy as np
+from pydantic import BaseModel
+
+from pageleaf.engine.layout import flow_text
+from pageleaf.fetchers.base import is_valid_arxiv_id
+from pageleaf.schemas.io.pdf import PdfDocument
+
+logger = logging.getLogger(__name__)
+
+_REFERENCES_HEADING = re.compile(r'^(\d+\.?\s+)?(references|bibliography|literature cited)\s*$', re.IGNORECASE)
+_REFERENCE_START = re.compile(r'^\s*(\[\d{1,3}\]|\d{1,3}\.\s)')
+# archives of the identifiers used before April 2007, such as hep-th/9901001 or cs.CL/0501001.
+_OLD_ARCHIVES = ('acc-phys', 'adap-org', 'alg-geom', 'ao-sci', 'astro-ph', 'atom-ph', 'bayes-an', 'chao-dyn',
+                 'chem-ph', 'cmp-lg', 'comp-gas', 'cond-mat', 'cs', 'dg-ga', 'funct-an', 'gr-qc', 'hep-ex',
+                 'hep-lat', 'hep-ph', 'hep-th', 'math', 'math-ph', 'mtrl-th', 'nlin', 'nucl-ex', 'nucl-th',
+                 'patt-sol', 'physics', 'plasm-ph', 'q-alg', 'q-bio', 'quant-ph', 'solv-int', 'supr-con')
+# new-style IDs need the arXiv prefix, old-style ones are distinctive enough without it.
+ARXIV_REF = re.compile(r'(?:arxiv(?:\s+preprint)?\s*:?\s*(?:abs/)?|arxiv\.org/(?:abs|pdf)/)'
+                       r'(\d{4}\.\d{4,5})(?:v\d+)?'
+                       r'|(?:arxiv\.org/(?:abs|pdf)/|(?<![\w./-]))'
+                       rf'((?:{"|".join(_OLD_ARCHIVES)})(?:\.[a-z]{{2}})?/\d{{7}})(?:v\d+)?(?!\d)', re.IGNORECASE)
+DOI_REF = re.compile(r'\b(10\.\d{4,9}/[^\s"<>]+)', re.IGNORECASE)
+
+
+class Reference(BaseModel):
+    text: str
+    arxiv: str | None = None
+    doi: str | None = None
+
+    @property
+    def key(self) -> str | None:
+        """Graph node key, the arXiv ID wins over the DOI."""
+        if self.arxiv:
+            return f'arxiv:{self.arxiv}'
+        if self.doi:
+            return f'doi:{self.doi.lower()}'
+        return None
+
+
+def _arxiv_id(match: re.Match | None) -> str | None:
+    if match is None:
+        return None
+    if match.group(1):
+        return match.group(1)
+    # case as arXiv writes it: hep-th/9901001, cs.CL/0501001.
+    archive, number = match.group(2).split('/')
+    name, dot, subject = archive.partition('.')
+    arxiv_id = f'{name.lower()}{dot}{subject.upper()}/{number}'
+    return arxiv_id if is_valid_arxiv_id(arxiv_id) else None
+
+
+def parse_reference(text: str) -> Reference:
+    doi = DOI_REF.search(text)
+    return Reference(text=text,
+                     arxiv=_arxiv_id(ARXIV_REF.search(text)),
+                     doi=doi.group(1).rstrip('.,;)]') if doi else None)
+
+
+def reference_texts(doc: PdfDocument) -> list[str]:
+    """Texts of the blocks in the References section, in document order."""
+    start, end = None, None
+    if doc.outline is not None:
+        for section, section_start, section_end in doc.outline.spans():
+            if _REFERENCES_HEADING.match(section.title):
+                start, end = section_start, section_end
+    if start is None:
+        # no outline or no heading found in it: the last block that is just "References".
+        for page in doc.pages:
+            for block_index, block in enumerate(page.blocks):
+                if block.is_text() and _REFERENCES_HEADING.match(block.lines[-1].text.strip()):
+                    start = (page.page_number, block_index, len(block.lines))
+    if start is None:
+        return []
+
+    texts = []
+    for page in doc.pages:
+        for block_index, block in enumerate(page.blocks):
+            anchor = (page.page_number, block_index)
+            if not block.is_text() or anchor < start[:2] or (end is not None and anchor >= end[:2]):
+                continue
+            lines = block.lines
+            if anchor == start[:2]:
+                # the heading may share its block with the first references.
+                lines = lines[start[2] + 1:] if start[2] < len(lines) and _REFERENCES_HEADING.match(
+                    lines[start[2]].text.strip()) else lines[start[2]:]
+            if lines:
+                texts.append(flow_text(block.model_copy(update={'lines': lines})))
+    return texts
+
+
+def split_references(texts: list[str]) -> list[str]:
+    """Split reference blocks into single references on [n] / n. markers, one block per reference otherwise."""
+    references = []
+    for text in texts:
+        parts = re.split(r'\s(?=\[\d{1,3}\]\s)', text)
+        for part in parts:
+            part = part.strip()
+            if not part:
+                continue
+            if references and not _REFERENCE_START.match(part) and _REFERENCE_START.match(references[-1]):
+                # continuation of a reference broken across blocks, columns or pages.
+                references[-1] += ' ' + part
+            else:
+                references.append(part)
+    return references
+
+
+def extract_references(doc: PdfDocument) -> list[Reference]:
+    return [parse_reference(text) for text in split_references(reference_texts(doc))]
+
+
+def _gather(indptr: np.ndarray, indices: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """Concatenated neighbour lists of `nodes`, without a Python loop."""
+    starts, ends = indptr[nodes], indptr[nodes + 1]
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=indices.dtype)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return indices[offsets + np.arange(total)]
+
+
+def _csr(n_nodes: int, src: np.ndarray, dst: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    order = np.lexsort((dst, src))
+    indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n_nodes), out=indptr[1:])
+    return indptr, dst[order].astype(np.int32)
+
+
+class CitationGraph:
+    """Directed graph, an edge goes from the citing paper to the cited one."""
+
+    def __init__(self, keys: list[str], src: np.ndarray, dst: np.ndarray):
+        self.keys = list(keys)
+        self._nodes = {key: node for node, key in enumerate(self.keys)}
+        n = len(self.keys)
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        # drop duplicate edges and self-citations.
+        edges = np.unique(src * n + dst) if n else np.empty(0, dtype=np.int64)
+        src, dst = edges // max(n, 1), edges % max(n, 1)
+        keep = src != dst
+        src, dst = src[keep], dst[keep]
+
+        self.out_indptr, self.out_indices = _csr(n, src, dst)
+        self.in_indptr, self.in_indices = _csr(n, dst, src)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.keys)
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.out_indices)
+
+    def node(self, key: str) -> int | None:
+        return self._nodes.get(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._nodes
+
+    def cites(self, node: int) -> np.ndarray:
+        return self.out_indices[self.out_indptr[node]:self.out_indptr[node + 1]]
+
+    def cited_by(self, node: int) -> np.ndarray:
+        return self.in_indices[self.in_indptr[node]:self.in_indptr[node + 1]]
+
+    def neighborhood(self, node: int, k: int = 2, direction: str = 'both') -> np.ndarray:
+        """Nodes within `k` hops of `node` (itself excluded), following 'out', 'in' or 'both' edges."""
+        if direction not in {'out', 'in', 'both'}:
+            raise ValueError(f'Unknown direction: {direction}')
+        seen = np.zeros(self.n_nodes, dtype=bool)
+        seen[node] = True
+        frontier = np.array([node], dtype=np.int64)
+        for _ in range(k):
+            parts = []
+            if direction in {'out', 'both'}:
+                parts.append(_gather(self.out_indptr, self.out_indices, frontier))
+            if direction in {'in', 'both'}:
+                parts.append(_gather(self.in_indptr, self.in_indices, frontier))
+            reached = np.unique(np.concatenate(parts))
+            frontier = reached[~seen[reached]].astype(np.int64)
+            if len(frontier) == 0:
+                break
+            seen[frontier] = True
+        seen[node] = False
+        return np.flatnonzero(seen)
+
+    def _top(self, counts: np.ndarray, node: int, top: int) -> list[tuple[int, int]]:
+        counts[node] = 0
+        candidates = np.flatnonzero(counts)
+        if len(candidates) == 0:
+            return []
+        order = np.lexsort((candidates, -counts[candidates]))[:top]
+        return [(int(candidates[i]), int(counts[candidates[i]])) for i in order]
+
+    def co_citation(self, node: int, top: int = 10) -> list[tuple[int, int]]:
+        """Papers most often cited together with `node`, as (node, number of papers citing both)."""
+        citing = self.cited_by(node).astype(np.int64)
+        co_cited = _gather(self.out_indptr, self.out_indices, citing)
+        return self._top(np.bincount(co_cited, minlength=self.n_nodes), node, top)
+
+    def bibliographic_coupling(self, node: int, top: int = 10) -> list[tuple[int, int]]:
+        """Papers sharing the most references with `node`, as (node, number of shared references)."""
+        references = self.cites(node).astype(np.int64)
+        coupled = _gather(self.in_indptr, self.in_indices, references)
+        return self._top(np.bincount(coupled, minlength=self.n_nodes), node, top)
+
+    def save(self, file: str | Path):
+        file = Path(file)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        src = np.repeat(np.arange(self.n_nodes, dtype=np.int32), np.diff(self.out_indptr))
+        np.savez(file, keys=np.array(self.keys, dtype=str), src=src, dst=self.out_indices)
+
+    @classmethod
+    def load(cls, file: str | Path) -> 'CitationGraph':
+        with np.load(file) as data:
+            return cls(data['keys'].tolist(), data['src'], data['dst'])
+
+
+class CitationGraphBuilder:
+    def __init__(self):
+        self.keys: list[str] = []
+        self._nodes: dict[str, int] = {}
+        self.src: list[int] = []
+        self.dst: list[int] = []
+
+    def add_node(self, key: str) -> int:
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._nodes[key] = len(self.keys)
+            self.keys.append(key)
+        return node
+
+    def add_edge(self, citing: str, cited: str):
+        self.src.append(self.add_node(citing))
+        self.dst.append(self.add_node(cited))
+
+    def build(self) -> CitationGraph:
+        return CitationGraph(self.keys, np.array(self.src, dtype=np.int64), np.array(self.dst, dtype=np.int64))
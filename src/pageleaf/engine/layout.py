@@ -0,0 +1,206 @@
+# coding=utf-8
+"""
+Layout analysis and reading-order reconstruction.
+
+PyMuPDF returns blocks in content-stream order, which interleaves the columns of a
+two-column paper. The analyzer works on NumPy arrays of all block and line bboxes of a
+page: it finds the column gutter from the x-coverage profile of the lines, separates
+header/footer/margin blocks, drops running heads and page numbers repeated across pages,
+and sorts the remaining blocks into reading order.
+"""
+import logging
+import math
+import re
+from collections import Counter
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from pageleaf.schemas.io.pdf import PdfDocument, PdfPage, TextBlock
+
+logger = logging.getLogger(__name__)
+
+_DIGITS = re.compile(r'\d+')
+_SPACES = re.compile(r'\s+')
+# page numbers after `_normalize`: '#', '- # -', 'page #', 'page # of #', '# / #'
+_PAGE_NUMBER = re.compile(r'^(page )?[-\u2013]? ?# ?[-\u2013]?( ?(/|of) ?#)?$')
+
+
+class PageLayout(BaseModel):
+    """Layout of one page, all block references are indices into `PdfPage.blocks`."""
+    page_number: int
+
+    n_columns: int = 1
+    gutter: tuple[float, float] | None = Field(None, description='x-range of the gap between two columns')
+
+    order: list[int] = Field(default_factory=list, description='blocks in reading order, without repeated ones')
+    header: list[int] = Field(default_factory=list)
+    footer: list[int] = Field(default_factory=list)
+    margin: list[int] = Field(default_factory=list, description='rotated text, e.g. the arXiv stamp')
+    repeated: list[int] = Field(default_factory=list, description='running heads and page numbers')
+
+
+class PageArrays:
+    """Block and line bboxes of one page as NumPy arrays."""
+
+    __slots__ = ('blocks', 'is_text', 'n_lines', 'lines', 'line_block', 'line_horizontal')
+
+    def __init__(self, page: PdfPage):
+        blocks = page.blocks
+        self.blocks = np.array([block.bbox for block in blocks], dtype=np.float64).reshape(-1, 4)
+        self.is_text = np.array([block.is_text() for block in blocks], dtype=bool)
+        self.n_lines = np.array([len(block.lines) for block in blocks], dtype=np.int32)
+
+        lines = [line for block in blocks for line in block.lines]
+        self.lines = np.array([line.bbox for line in lines], dtype=np.float64).reshape(-1, 4)
+        self.line_block = np.repeat(np.arange(len(blocks), dtype=np.int32), self.n_lines)
+        # `dir` is the writing direction, (1, 0) for normal horizontal text.
+        self.line_horizontal = np.array([not line.dir or abs(line.dir[0]) > 0.5 for line in lines], dtype=bool)
+
+
+def flow_text(block: TextBlock) -> str:
+    """Join the lines of a block into running text, removing end-of-line hyphenation."""
+    parts = []
+    for line in block.lines:
+        text = line.text.strip()
+        if not text:
+            continue
+        if parts and parts[-1].endswith('-') and text[:1].islower():
+            parts[-1] = parts[-1][:-1] + text
+        else:
+            parts.append(text)
+    return ' '.join(parts)
+
+
+def _normalize(text: str) -> str:
+    return _SPACES.sub(' ', _DIGITS.sub('#', text.lower())).strip()
+
+
+class LayoutAnalyzer:
+    def __init__(self,
+                 header_ratio: float = 0.07,
+                 footer_ratio: float = 0.93,
+                 min_gutter: float = 4.0,
+                 span_ratio: float = 0.6,
+                 repeat_ratio: float = 0.3):
+        """
+        Args:
+            header_ratio: blocks ending above `header_ratio * page height` are header candidates.
+            footer_ratio: blocks starting below `footer_ratio * page height` are footer candidates.
+            min_gutter: minimal width (in points) of an empty vertical strip between two columns.
+            span_ratio: lines wider than `span_ratio * page width` span both columns.
+            repeat_ratio: header/footer text found on at least this share of pages is a running head.
+        """
+        self.header_ratio = header_ratio
+        self.footer_ratio = footer_ratio
+        self.min_gutter = min_gutter
+        self.span_ratio = span_ratio
+        self.repeat_ratio = repeat_ratio
+
+    def detect_gutter(self, arrays: PageArrays, width: float) -> tuple[float, float] | None:
+        """Find the widest (nearly) empty vertical strip in the middle of the page, using line coverage."""
+        lines = arrays.lines[arrays.line_horizontal]
+        if len(lines) < 4 or width <= 0:
+            return None
+        lines = lines[(lines[:, 2] - lines[:, 0]) < self.span_ratio * width]
+        if len(lines) < 4:
+            return None
+
+        n_bins = int(math.ceil(width))
+        starts = np.clip(np.floor(lines[:, 0]).astype(np.int64), 0, n_bins)
+        ends = np.clip(np.ceil(lines[:, 2]).astype(np.int64), 0, n_bins)
+        diff = np.zeros(n_bins + 1, dtype=np.int64)
+        np.add.at(diff, starts, 1)
+        np.add.at(diff, ends, -1)
+        coverage = np.cumsum(diff[:-1])
+
+        # tolerate a few lines crossing the gutter, e.g. a centered author line on the first page.
+        tolerance = max(1, int(0.05 * len(lines)))
+        lo, hi = int(width * 0.3), int(width * 0.7)
+        empty = np.concatenate(([False], coverage[lo:hi] <= tolerance, [False]))
+        edges = np.flatnonzero(np.diff(empty.astype(np.int8)))
+        if len(edges) == 0:
+            return None
+        run_starts, run_ends = edges[0::2], edges[1::2]
+        best = int(np.argmax(run_ends - run_starts))
+        x0, x1 = float(lo + run_starts[best]), float(lo + run_ends[best])
+        if x1 - x0 < self.min_gutter:
+            return None
+
+        # both sides should hold a real column, not a few stray lines.
+        n_left = int(np.count_nonzero(lines[:, 2] <= x0))
+        n_right = int(np.count_nonzero(lines[:, 0] >= x1))
+        if min(n_left, n_right) < max(2, 0.15 * len(lines)):
+            return None
+        return x0, x1
+
+    def analyze_page(self, page: PdfPage, arrays: PageArrays | None = None) -> PageLayout:
+        arrays = arrays if arrays is not None else PageArrays(page)
+        layout = PageLayout(page_number=page.page_number)
+        boxes = arrays.blocks
+        if len(boxes) == 0:
+            return layout
+
+        # a text block is marginal when none of its lines runs horizontally.
+        n_horizontal = np.bincount(arrays.line_block[arrays.line_horizontal], minlength=len(boxes))
+        margin = arrays.is_text & (n_horizontal == 0)
+        short = arrays.is_text & (arrays.n_lines <= 2) & ~margin
+        header = short & (boxes[:, 3] <= self.header_ratio * page.height)
+        footer = short & (boxes[:, 1] >= self.footer_ratio * page.height)
+        body = ~(margin | header | footer)
+
+        layout.margin = np.flatnonzero(margin).tolist()
+        layout.header = np.flatnonzero(header).tolist()
+        layout.footer = np.flatnonzero(footer).tolist()
+
+        gutter = self.detect_gutter(arrays, page.width)
+        x0, y0, x1 = boxes[:, 0], boxes[:, 1], boxes[:, 2]
+        if gutter is None:
+            # rounding y0 keeps blocks on the same visual row ordered left to right.
+            keys = (x0, np.round(y0 / 2.0))
+            column = np.zeros(len(boxes), dtype=np.int8)
+            band = np.zeros(len(boxes), dtype=np.int64)
+        else:
+            layout.n_columns = 2
+            layout.gutter = gutter
+            g0, g1 = gutter
+            spanning = (x0 < g0 - 1.0) & (x1 > g1 + 1.0)
+            column = np.where(spanning, 0, np.where((x0 + x1) / 2 < (g0 + g1) / 2, 1, 2)).astype(np.int8)
+            # spanning blocks (titles, wide figures) cut the page into bands read one after another.
+            cuts = np.sort(y0[spanning & body])
+            band = np.searchsorted(cuts, y0, side='right')
+            keys = (x0, y0)
+
+        order = np.lexsort(keys + (column, band))
+        top = np.flatnonzero(header)
+        bottom = np.flatnonzero(footer)
+        layout.order = (top[np.argsort(boxes[top, 1], kind='stable')].tolist()
+                        + [int(i) for i in order if body[i]]
+                        + bottom[np.argsort(boxes[bottom, 1], kind='stable')].tolist())
+        return layout
+
+    def analyze(self, doc: PdfDocument) -> list[PageLayout]:
+        """Analyze all pages, then drop header/footer text repeated across pages from the reading order."""
+        layouts = [self.analyze_page(page) for page in doc.pages]
+
+        page_keys = []
+        n_pages_by_key = Counter()
+        for page, layout in zip(doc.pages, layouts):
+            keys = {i: _normalize(page.blocks[i].text or '') for i in layout.header + layout.footer}
+            page_keys.append(keys)
+            n_pages_by_key.update(set(keys.values()))
+
+        min_pages = max(2, math.ceil(self.repeat_ratio * len(doc.pages)))
+        for layout, keys in zip(layouts, page_keys):
+            repeated = {i for i, key in keys.items() if n_pages_by_key[key] >= min_pages or _PAGE_NUMBER.match(key)}
+            if repeated:
+                layout.repeated = sorted(repeated)
+                layout.order = [i for i in layout.order if i not in repeated]
+        return layouts
+
+    def reorder(self, doc: PdfDocument) -> PdfDocument:
+        """Return a copy of `doc` with blocks in reading order and running heads removed."""
+        pages = []
+        for page, layout in zip(doc.pages, self.analyze(doc)):
+            pages.append(page.model_copy(update={'blocks': [page.blocks[i] for i in layout.order]}))
+        return doc.model_copy(update={'pages': pages})
@@ -0,0 +1,326 @@
+# coding=utf-8
+"""
+Columnar metadata index for faceted queries over the library.
+
+The filterable fields of every entry are kept as NumPy columns, one row per paper;
+categories and labels are bitmap indexes (one packed bit row per value), so filters,
+sorts and facet counts are vectorized instead of loops over `Metadata` objects.
+
+Snapshot files under the index root, memory-mapped on open:
+    {column}.npy      one array per column, see `NUMERIC_COLUMNS`
+    ids.npy           paper ids, ASCII
+    categories.npy    (n_categories, ceil(n / 8)) packed bitmap, row i marks papers in vocab category i
+    labels.npy        (n_labels, ceil(n / 8)) packed bitmap of engagement labels
+    titles.utf8       titles back to back, `title_offsets.npy` holds the n + 1 boundaries
+    meta.json         category and label vocabularies, library mtime at build
+
+The snapshot is current while the library root mtime, which saves and deletes bump, is
+not past the one read before the build. A save in the same timestamp tick as that read
+would leave the mtime unchanged, so an mtime too close to the build is recorded as one
+nanosecond early and the next open rebuilds once it is old enough to be trusted.
+"""
+import json
+import logging
+import os
+import shutil
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+
+from pageleaf.config.paths import data_path
+from pageleaf.schemas.paper import Tier
+from pageleaf.storage.library import PaperLibrary
+
+logger = logging.getLogger(__name__)
+
+TIERS = [tier.value for tier in Tier]
+
+# column -> dtype, missing values are -1 (NaT for dates, 0 for ratings).
+NUMERIC_COLUMNS = {
+    'publish_date': 'datetime64[D]',
+    'hf_upvotes': np.int32,
+    'github_stars': np.int32,
+    'primary_category': np.int32,  # code into the category vocabulary
+    'tier': np.int8,  # index into TIERS
+    'rating': np.int8,
+    'starred': np.bool_,
+}
+SORTABLE = ('publish_date', 'hf_upvotes', 'github_stars', 'rating')
+# coarser than the mtime resolution of any common file system (FAT: 2 s).
+MTIME_SLACK_NS = 2_000_000_000
+
+
+def library_mtime(library: PaperLibrary) -> int:
+    """The library root mtime in ns, one ns early if a save may share its tick unseen."""
+    mtime = library.root.stat().st_mtime_ns
+    return mtime - 1 if time.time_ns() - mtime < MTIME_SLACK_NS else mtime
+
+
+def _to_day(value: str | date | datetime | None) -> np.datetime64:
+    if value is None:
+        return np.datetime64('NaT', 'D')
+    if isinstance(value, datetime):
+        value = value.date()
+    return np.datetime64(value, 'D')
+
+
+def _bitmap(rows: list[list[int]], n_values: int, n_rows: int) -> np.ndarray:
+    bits = np.zeros((n_values, n_rows), dtype=np.bool_)
+    row_index = np.repeat(np.arange(n_rows), [len(codes) for codes in rows])
+    codes = np.fromiter((code for codes in rows for code in codes), dtype=np.int64, count=len(row_index))
+    bits[codes, row_index] = True
+    return np.packbits(bits, axis=1)
+
+
+class MetadataIndex:
+    def __init__(self,
+                 ids: np.ndarray,
+                 titles: tuple[bytes, np.ndarray],
+                 columns: dict[str, np.ndarray],
+                 categories: list[str],
+                 category_bits: np.ndarray,
+                 labels: list[str],
+                 label_bits: np.ndarray,
+                 built_at: int = 0):
+        self.ids = ids
+        self._title_data, self._title_offsets = titles
+        self.columns = columns
+        self.categories = categories
+        self.category_bits = category_bits
+        self.labels = labels
+        self.label_bits = label_bits
+        self.built_at = built_at
+        self._category_codes = {name: i for i, name in enumerate(categories)}
+        self._label_codes = {name: i for i, name in enumerate(labels)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def is_current(self, library: PaperLibrary) -> bool:
+        """False once the library changed after the build, see the module doc."""
+        return self.built_at >= library.root.stat().st_mtime_ns
+
+    def paper_id(self, row: int) -> str:
+        return self.ids[row].decode('ascii')
+
+    def title(self, row: int) -> str:
+        start, end = self._title_offsets[row], self._title_offsets[row + 1]
+        return self._title_data[start:end].decode('utf-8')
+
+    @classmethod
+    def build(cls, entries, built_at: int = 0) -> 'MetadataIndex':
+        ids, titles = [], []
+        values = {name: [] for name in NUMERIC_COLUMNS}
+        category_rows, label_rows = [], []
+        categories: dict[str, int] = {}
+        labels: dict[str, int] = {}
+
+        for entry in entries:
+            metadata, engagement = entry.paper.metadata, entry.engagement
+            ids.append(str(entry.paper.id))
+            titles.append(metadata.title)
+            values['publish_date'].append(_to_day(metadata.publish_date))
+            values['hf_upvotes'].append(metadata.hf_upvotes)
+            values['github_stars'].append(-1 if metadata.github_stars is None else metadata.github_stars)
+            codes = [categories.setdefault(c, len(categories)) for c in dict.fromkeys(metadata.categories)]
+            if metadata.primary_category:
+                primary = categories.setdefault(metadata.primary_category, len(categories))
+                values['primary_category'].append(primary)
+                if primary not in codes:
+                    codes.append(primary)
+            else:
+                values['primary_category'].append(-1)
+            category_rows.append(codes)
+
+            values['tier'].append(TIERS.index(engagement.tier.value) if engagement else -1)
+            values['rating'].append((engagement.rating or 0) if engagement else 0)
+            values['starred'].append(engagement.starred if engagement else False)
+            label_rows.append([labels.setdefault(label, len(labels))
+                               for label in dict.fromkeys(engagement.labels)] if engagement else [])
+
+        columns = {name: np.array(column, dtype=NUMERIC_COLUMNS[name]) for name, column in values.items()}
+        encoded = [title.encode('utf-8') for title in titles]
+        offsets = np.cumsum([0] + [len(title) for title in encoded], dtype=np.int64)
+        return cls(np.array(ids, dtype='S36'), (b''.join(encoded), offsets), columns,
+                   list(categories), _bitmap(category_rows, len(categories), len(ids)),
+                   list(labels), _bitmap(label_rows, len(labels), len(ids)),
+                   built_at)
+
+    @classmethod
+    def build_library(cls, library: PaperLibrary) -> 'MetadataIndex':
+        # read before the entries, a save during the build makes the index stale.
+        built_at = library_mtime(library)
+        entries = (entry for batch in library.iter_batches() for entry in batch)
+        return cls.build(entries, built_at)
+
+    # -- snapshot
+
+    def save(self, root: str | Path):
+        root = Path(root)
+        tmp_root = root.with_name(root.name + '.tmp')
+        shutil.rmtree(tmp_root, ignore_errors=True)
+        tmp_root.mkdir(parents=True)
+
+        for name, column in self.columns.items():
+            np.save(tmp_root / f'{name}.npy', column)
+        np.save(tmp_root / 'categories.npy', self.category_bits)
+        np.save(tmp_root / 'labels.npy', self.label_bits)
+        np.save(tmp_root / 'ids.npy', self.ids)
+        (tmp_root / 'titles.utf8').write_bytes(self._title_data)
+        np.save(tmp_root / 'title_offsets.npy', self._title_offsets)
+        meta = {'categories': self.categories, 'labels': self.labels, 'built_at': self.built_at}
+        (tmp_root / 'meta.json').write_text(json.dumps(meta), encoding='utf-8')
+
+        shutil.rmtree(root, ignore_errors=True)
+        os.replace(tmp_root, root)
+
+    @classmethod
+    def load(cls, root: str | Path) -> 'MetadataIndex':
+        root = Path(root)
+        meta = json.loads((root / 'meta.json').read_text(encoding='utf-8'))
+        columns = {name: np.load(root / f'{name}.npy', mmap_mode='r') for name in NUMERIC_COLUMNS}
+        titles = ((root / 'titles.utf8').read_bytes(), np.load(root / 'title_offsets.npy', mmap_mode='r'))
+        return cls(np.load(root / 'ids.npy', mmap_mode='r'), titles, columns,
+                   meta['categories'], np.load(root / 'categories.npy', mmap_mode='r'),
+                   meta['labels'], np.load(root / 'labels.npy', mmap_mode='r'),
+                   meta['built_at'])
+
+    @classmethod
+    def open(cls, library: PaperLibrary, root: str | Path | None = None) -> 'MetadataIndex':
+        """Load the snapshot, rebuilding it first if the library changed since it was taken."""
+        root = Path(root) if root else data_path('index', 'metadata')
+        if (root / 'meta.json').exists():
+            index = cls.load(root)
+            # snapshots from before mtimes were kept in ns hold seconds, and are rebuilt.
+            if index.is_current(library):
+                return index
+        index = cls.build_library(library)
+        index.save(root)
+        logger.info(f'metadata index rebuilt: {len(index)} papers')
+        return index
+
+    # -- queries
+
+    def _bits(self, bits: np.ndarray, codes: dict[str, int], values: list[str], match_all: bool) -> np.ndarray:
+        packed_rows = [bits[codes[value]] for value in values if value in codes]
+        if match_all and len(packed_rows) < len(values):
+            return np.zeros(len(self), dtype=np.bool_)
+        if not packed_rows:
+            return np.zeros(len(self), dtype=np.bool_)
+        reduce = np.bitwise_and if match_all else np.bitwise_or
+        packed = reduce.reduce(np.stack(packed_rows), axis=0)
+        return np.unpackbits(packed, count=len(self)).astype(np.bool_)
+
+    def where(self,
+              categories: list[str] | None = None,
+              all_categories: bool = False,
+              primary_category: str | None = None,
+              labels: list[str] | None = None,
+              since: str | date | None = None,
+              until: str | date | None = None,
+              min_upvotes: int | None = None,
+              min_stars: int | None = None,
+              tiers: list[str] | None = None,
+              min_rating: int | None = None,
+              starred: bool | None = None) -> np.ndarray:
+        """Boolean row mask of the papers matching every given filter."""
+        mask = np.ones(len(self), dtype=np.bool_)
+        if categories:
+            mask &= self._bits(self.category_bits, self._category_codes, categories, all_categories)
+        if primary_category is not None:
+            mask &= self['primary_category'] == self._category_codes.get(primary_category, -2)
+        if labels:
+            mask &= self._bits(self.label_bits, self._label_codes, labels, True)
+        if since is not None:
+            mask &= self['publish_date'] >= _to_day(since)
+        if until is not None:
+            mask &= self['publish_date'] <= _to_day(until)
+        if min_upvotes is not None:
+            mask &= self['hf_upvotes'] >= min_upvotes
+        if min_stars is not None:
+            mask &= self['github_stars'] >= min_stars
+        if tiers:
+            mask &= np.isin(self['tier'], [TIERS.index(Tier(tier).value) for tier in tiers])
+        if min_rating is not None:
+            mask &= self['rating'] >= min_rating
+        if starred is not None:
+            mask &= self['starred'] == starred
+        return mask
+
+    def sort(self, rows: np.ndarray, by: str, descending: bool = True) -> np.ndarray:
+        """Order row indices by a column, missing values last."""
+        if by not in SORTABLE:
+            raise ValueError(f'Cannot sort by {by}, one of: {", ".join(SORTABLE)}')
+        column = self[by][rows]
+        if by == 'publish_date':
+            missing = np.isnat(column)
+            keys = column.astype(np.int64)
+        else:
+            missing = column <= (0 if by == 'rating' else -1)
+            keys = column.astype(np.int64)
+        if descending:
+            keys = -keys
+        # lexsort sorts by the last key first.
+        return rows[np.lexsort((keys, missing))]
+
+    def query(self, sort_by: str | None = None, descending: bool = True, limit: int | None = None,
+              **filters) -> np.ndarray:
+        rows = np.flatnonzero(self.where(**filters))
+        if sort_by:
+            rows = self.sort(rows, sort_by, descending)
+        return rows[:limit] if limit is not None else rows
+
+    def facets(self, field: str, mask: np.ndarray | None = None) -> dict[str, int]:
+        """Counts of papers per value of `field` among the rows in `mask`, most frequent first."""
+        mask = np.ones(len(self), dtype=np.bool_) if mask is None else mask
+        if field in ('categories', 'labels'):
+            bits, names = (self.category_bits, self.categories) if field == 'categories' else \
+                (self.label_bits, self.labels)
+            counts = np.bitwise_count(bits & np.packbits(mask)).sum(axis=1) if len(names) else np.zeros(0, np.int64)
+        elif field == 'primary_category':
+            codes = self['primary_category'][mask]
+            counts = np.bincount(codes[codes >= 0], minlength=len(self.categories))
+            names = self.categories
+        elif field == 'tier':
+            codes = self['tier'][mask]
+            counts = np.bincount(codes[codes >= 0], minlength=len(TIERS))
+            names = TIERS
+        elif field == 'year':
+            days = self['publish_date'][mask]
+            years = days[~np.isnat(days)].astype('datetime64[Y]').astype(np.int64) + 1970
+            names, counts = np.unique(years, return_counts=True)
+            names = [str(year) for year in names]
+        else:
+            raise ValueError(f'No facets for {field}')
+        order = np.argsort(-np.asarray(counts), kind='stable')
+        return {names[i]: int(counts[i]) for i in order if counts[i]}
+
+
+QUERY_FILTERS = ('categories', 'all_categories', 'primary_category', 'labels', 'since', 'until', 'min_upvotes',
+                 'min_stars', 'tiers', 'min_rating', 'starred')
+
+
+def query_rows(index: MetadataIndex, sort_by: str | None = None, descending: bool = True, limit: int = 20,
+               facets: list[str] = (), **filters) -> dict:
+    """Run a query, the matching papers and facet counts as plain JSON types."""
+    mask = index.where(**filters)
+    rows = np.flatnonzero(mask)
+    if sort_by:
+        rows = index.sort(rows, sort_by, descending)
+    papers = []
+    for row in rows[:limit]:
+        day = index['publish_date'][row]
+        stars = int(index['github_stars'][row])
+        papers.append({
+            'id': index.paper_id(row),
+            'title': index.title(row),
+            'publish_date': None if np.isnat(day) else str(day),
+            'hf_upvotes': int(index['hf_upvotes'][row]),
+            'github_stars': stars if stars >= 0 else None,
+        })
+    return {'total': len(rows), 'papers': papers, 'facets': {field: index.facets(field, mask) for field in facets}}
@@ -0,0 +1,162 @@
+# coding=utf-8
+"""
+Section structure from font statistics.
+
+All spans of a document are flattened into NumPy arrays in one pass, which gives a
+char-weighted histogram of (font size, bold) styles. The most used style is the body
+text; numbered or well-known headings ("3.2 Training", "References") in a larger or bold
+style establish the heading styles, and their numbering depth maps styles to levels.
+"""
+import logging
+import re
+
+import numpy as np
+
+from pageleaf.schemas.io.pdf import DocumentOutline, OutlineSection, PdfDocument
+
+logger = logging.getLogger(__name__)
+
+_NUMBERED = re.compile(r'^(?P<num>\d{1,2}(?:\.\d{1,2}){0,3}|[A-Z](?:\.\d{1,2}){1,3}|[A-Z]\.|[IVX]{1,4}\.)\.?\s+[A-Z]')
+_KNOWN = re.compile(r'^(abstract|introduction|background|related work|methods?|methodology|experiments?|results|'
+                    r'discussion|conclusions?|limitations|acknowledge?ments?|references|bibliography|appendix)\b',
+                    re.IGNORECASE)
+# unnumbered even in papers with numbered sections, always at the top level.
+_TOP_LEVEL = re.compile(r'^(abstract|acknowledge?ments?|references|bibliography|appendix)\b', re.IGNORECASE)
+
+
+def looks_like_heading(text: str, max_chars: int = 120) -> bool:
+    """A numbered or well-known heading by its text alone, for when font statistics are not available."""
+    text = text.strip()
+    return 0 < len(text) <= max_chars and '\n' not in text and bool(_NUMBERED.match(text) or _KNOWN.match(text))
+
+
+def _depth(number: str) -> int:
+    number = number.rstrip('.')
+    if number.isdigit() or len(number) == 1 or set(number) <= set('IVX'):
+        return 1
+    return number.count('.') + 1
+
+
+class OutlineExtractor:
+    def __init__(self, max_levels: int = 3, max_heading_chars: int = 120, size_step: float = 0.5):
+        self.max_levels = max_levels
+        self.max_heading_chars = max_heading_chars
+        self.size_step = size_step
+
+    def extract(self, doc: PdfDocument) -> DocumentOutline:
+        anchors, texts = [], []
+        span_line, span_size, span_bold, span_chars = [], [], [], []
+        for page in doc.pages:
+            for block_index, block in enumerate(page.blocks):
+                if not block.is_text():
+                    continue
+                for line_index, line in enumerate(block.lines):
+                    line_id = len(anchors)
+                    anchors.append((page.page_number, block_index, line_index))
+                    texts.append(line.text.strip())
+                    for span in line.spans:
+                        span_line.append(line_id)
+                        span_size.append(span.font_size)
+                        span_bold.append(span.is_bold())
+                        span_chars.append(len(span.text.strip()))
+
+        if not anchors:
+            return DocumentOutline()
+
+        n_lines = len(anchors)
+        span_line = np.array(span_line, dtype=np.int64)
+        span_chars = np.array(span_chars, dtype=np.float64)
+        span_units = np.round(np.array(span_size, dtype=np.float64) / self.size_step).astype(np.int64)
+        span_size = span_units * self.size_step
+        span_bold = np.array(span_bold, dtype=bool)
+
+        # char-weighted histogram of (size, bold) styles over the whole document.
+        styles, style_of_span = np.unique(span_units * 2 + span_bold, return_inverse=True)
+        histogram = np.bincount(style_of_span, weights=span_chars)
+        body_size = float(styles[int(np.argmax(histogram))] // 2 * self.size_step)
+
+        chars = np.bincount(span_line, weights=span_chars, minlength=n_lines)
+        has_chars = chars > 0
+        safe_chars = np.where(has_chars, chars, 1.0)
+        line_size = np.bincount(span_line, weights=span_size * span_chars, minlength=n_lines) / safe_chars
+        line_size = np.round(line_size / self.size_step) * self.size_step
+        line_bold = np.bincount(span_line, weights=span_bold * span_chars, minlength=n_lines) / safe_chars >= 0.9
+
+        styled = has_chars & (chars <= self.max_heading_chars) & ((line_size >= body_size + self.size_step) | line_bold)
+        candidates = np.flatnonzero(styled)
+
+        # numbered and well-known headings establish which styles are heading styles.
+        depth_by_style: dict[tuple[float, bool], list[int]] = {}
+        numbers = {}
+        for i in candidates:
+            style = (float(line_size[i]), bool(line_bold[i]))
+            match = _NUMBERED.match(texts[i])
+            if match:
+                numbers[i] = _depth(match.group('num'))
+                depth_by_style.setdefault(style, []).append(numbers[i])
+            elif _KNOWN.match(texts[i]) and len(texts[i]) <= 40:
+                depth_by_style.setdefault(style, [])
+
+        if not depth_by_style:
+            return DocumentOutline(body_font_size=body_size)
+
+        # a style without numbered headings takes the level of the closest numbered style not smaller than it.
+        numbered_styles = sorted((style for style, depths in depth_by_style.items() if depths), key=lambda s: s[0])
+        level_by_style = {}
+        for style, depths in depth_by_style.items():
+            if depths:
+                level = int(np.median(depths))
+            else:
+                level = next((int(np.median(depth_by_style[other])) for other in numbered_styles
+                              if other[0] >= style[0]), 1)
+            level_by_style[style] = min(max(level, 1), self.max_levels)
+
+        headings = []
+        for i in candidates:
+            style = (float(line_size[i]), bool(line_bold[i]))
+            if style not in level_by_style:
+                continue
+            if i in numbers:
+                level = min(numbers[i], self.max_levels)
+            elif _TOP_LEVEL.match(texts[i]):
+                level = 1
+            else:
+                level = level_by_style[style]
+            page_number, block_index, line_index = anchors[i]
+            previous = headings[-1] if headings else None
+            # a heading wrapped over two lines of the same block.
+            if (previous is not None and i not in numbers and previous['line'] == i - 1
+                    and previous['anchor'][:2] == (page_number, block_index) and previous['style'] == style):
+                previous['title'] += ' ' + texts[i]
+                previous['line'] = i
+                continue
+            headings.append({'title': texts[i], 'level': level, 'style': style, 'line': i,
+                             'anchor': (page_number, block_index, line_index)})
+
+        roots: list[OutlineSection] = []
+        stack: list[OutlineSection] = []
+        for heading in headings:
+            page_number, block_index, line_index = heading['anchor']
+            section = OutlineSection(title=heading['title'],
+                                     level=heading['level'],
+                                     page_number=page_number,
+                                     block_index=block_index,
+                                     line_index=line_index,
+                                     font_size=heading['style'][0])
+            while stack and stack[-1].level >= section.level:
+                stack.pop()
+            if stack:
+                stack[-1].children.append(section)
+            else:
+                roots.append(section)
+            stack.append(section)
+
+        logger.debug(f'outline: {len(headings)} headings, body font size: {body_size}')
+        return DocumentOutline(sections=roots, body_font_size=body_size)
+
+
+def build_outline(doc: PdfDocument, extractor: OutlineExtractor | None = None, refresh: bool = False) -> DocumentOutline:
+    """Return the outline cached on `doc`, extracting it first if needed."""
+    if doc.outline is None or refresh:
+        doc.outline = (extractor or OutlineExtractor()).extract(doc)
+    return doc.outline
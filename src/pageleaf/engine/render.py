@@ -0,0 +1,134 @@
+# coding=utf-8
+"""
+Page thumbnails and figure crops.
+
+Rasterizing with PyMuPDF takes hundreds of milliseconds per page at a useful DPI, so
+renders run in a process pool (a task opens its PDF once for several pages) and land
+in a size-capped `RenderCache`.
+"""
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import fitz
+from pydantic import BaseModel
+
+from pageleaf.commons.io.files import file_sha256
+from pageleaf.schemas.io.pdf import ImageBlock
+from pageleaf.storage.render_cache import RenderCache, render_key
+
+logger = logging.getLogger(__name__)
+
+
+class RenderRequest(BaseModel):
+    pdf_file: str
+    page_number: int
+    dpi: int = 48
+    clip: tuple[float, float, float, float] | None = None
+
+
+def render_pages(pdf_file: str, items: list[tuple[int, int, tuple | None]]) -> list[bytes | None]:
+    """Render (page number, dpi, clip) items of one PDF as PNG. Runs in worker processes."""
+    results = []
+    with fitz.open(pdf_file) as doc:
+        for page_number, dpi, clip in items:
+            if not 1 <= page_number <= len(doc):
+                results.append(None)
+                continue
+            page = doc[page_number - 1]
+            pixmap = page.get_pixmap(dpi=dpi, clip=fitz.Rect(clip) if clip else None)
+            results.append(pixmap.tobytes('png'))
+    return results
+
+
+class PageRenderer:
+    def __init__(self, cache: RenderCache | None = None, max_workers: int | None = None, pages_per_task: int = 4):
+        """
+        Args:
+            cache: where renders are kept, the default cache location if None.
+            max_workers: size of the process pool, 0 renders in the calling process.
+            pages_per_task: pages of one PDF rendered by a single worker task.
+        """
+        self.cache = cache if cache is not None else RenderCache()
+        self.max_workers = os.cpu_count() if max_workers is None else max_workers
+        self.pages_per_task = pages_per_task
+        self._pool: ProcessPoolExecutor | None = None
+        self._hashes: dict[tuple[str, int, int], str] = {}
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def pdf_hash(self, pdf_file: str | Path) -> str:
+        stat = os.stat(pdf_file)
+        cache_key = (str(pdf_file), stat.st_mtime_ns, stat.st_size)
+        if cache_key not in self._hashes:
+            self._hashes[cache_key] = file_sha256(pdf_file)
+        return self._hashes[cache_key]
+
+    def render_many(self, requests: list[RenderRequest]) -> list[bytes | None]:
+        """Render requests in order, cache hits are served without touching the PDF."""
+        results: list[bytes | None] = [None] * len(requests)
+        keys = [render_key(self.pdf_hash(r.pdf_file), r.page_number, r.dpi, r.clip) for r in requests]
+
+        missing: dict[str, list[int]] = {}
+        for i, (request, key) in enumerate(zip(requests, keys)):
+            data = self.cache.get(key)
+            if data is not None:
+                results[i] = data
+            else:
+                missing.setdefault(request.pdf_file, []).append(i)
+        if not missing:
+            return results
+
+        # a task opens its PDF once, long runs of pages of the same PDF are split over several tasks.
+        tasks = [(pdf_file, indices[start:start + self.pages_per_task])
+                 for pdf_file, indices in missing.items()
+                 for start in range(0, len(indices), self.pages_per_task)]
+        items = [[(requests[i].page_number, requests[i].dpi, requests[i].clip) for i in indices]
+                 for _, indices in tasks]
+        if self.max_workers == 0 or len(tasks) == 1:
+            rendered = [render_pages(pdf_file, task_items) for (pdf_file, _), task_items in zip(tasks, items)]
+        else:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            futures = [self._pool.submit(render_pages, pdf_file, task_items)
+                       for (pdf_file, _), task_items in zip(tasks, items)]
+            rendered = []
+            for (pdf_file, indices), future in zip(tasks, futures):
+                try:
+                    rendered.append(future.result())
+                except Exception as e:
+                    logger.error(f'Render failed for {pdf_file}: {e}')
+                    rendered.append([None] * len(indices))
+
+        for (_, indices), task_results in zip(tasks, rendered):
+            for i, data in zip(indices, task_results):
+                if data is not None:
+                    self.cache.put(keys[i], data)
+                results[i] = data
+        return results
+
+    def thumbnail(self, pdf_file: str | Path, page_number: int, dpi: int = 48) -> bytes | None:
+        return self.render_many([RenderRequest(pdf_file=str(pdf_file), page_number=page_number, dpi=dpi)])[0]
+
+    def figure(self, pdf_file: str | Path, block: ImageBlock, dpi: int = 150) -> bytes | None:
+        """Crop of an image block, rendered from the page so vector overlays are kept."""
+        request = RenderRequest(pdf_file=str(pdf_file), page_number=block.page_number, dpi=dpi, clip=block.bbox)
+        return self.render_many([request])[0]
+
+    def prefetch(self, pdf_files: list[str | Path], n_pages: int = 3, dpi: int = 48) -> int:
+        """Warm thumbnails of the first `n_pages` pages of each PDF, e.g. right after ingest."""
+        # pages past the end of a short PDF come back as None and are not cached.
+        requests = [RenderRequest(pdf_file=str(pdf_file), page_number=page_number, dpi=dpi)
+                    for pdf_file in pdf_files for page_number in range(1, n_pages + 1)]
+        results = self.render_many(requests)
+        return sum(1 for data in results if data is not None)
@@ -0,0 +1,219 @@
+# coding=utf-8
+"""
+Offline similarity index over paper title, abstract and keywords.
+
+Texts are embedded with signed feature hashing (no vocabulary, no network model), so
+papers can be added one at a time. Raw term-frequency rows live in an append-only
+float32 matrix that is memory-mapped on open; IDF weights come from a document
+frequency vector kept next to it and are applied at query time, which keeps adds
+incremental. Top-k cosine queries run as batched matrix products.
+
+Files under the index root:
+    vectors.f32   raw (n, n_features) float32 rows
+    df.npy        document frequency of each hashed feature
+    ids.json      row -> paper id, and the number of features
+"""
+import json
+import logging
+import math
+import os
+import re
+import zlib
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from pageleaf.config.paths import data_path
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r'[a-z][a-z0-9\-]+|\d+[a-z]+[a-z0-9]*')
+STOP_WORDS = frozenset('''
+a an and are as at be been but by can for from has have in into is it its of on or our such than that the their
+them then there these they this to was we were which while with without via using use used based both also more
+most not only over new show shows paper propose proposed approach method methods model models results task tasks
+'''.split())
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased words without stop words, plus adjacent word pairs."""
+    words = [w for w in _TOKEN.findall(text.lower()) if w not in STOP_WORDS]
+    return words + [f'{a} {b}' for a, b in zip(words, words[1:])]
+
+
+class HashingVectorizer:
+    def __init__(self, n_features: int = 2048):
+        self.n_features = n_features
+        self._buckets: dict[str, tuple[int, float]] = {}
+
+    def _bucket(self, token: str) -> tuple[int, float]:
+        # `hash()` is salted per process, crc32 keeps vectors stable on disk.
+        bucket = self._buckets.get(token)
+        if bucket is None:
+            h = zlib.crc32(token.encode('utf-8'))
+            bucket = self._buckets[token] = (h % self.n_features, 1.0 if h & 0x80000000 else -1.0)
+        return bucket
+
+    def transform(self, fields: Iterable[tuple[str, float]]) -> np.ndarray:
+        """Embed weighted text fields, e.g. [(title, 2.0), (abstract, 1.0)], as sublinear TF."""
+        counts: dict[int, float] = {}
+        signs: dict[int, float] = {}
+        for text, weight in fields:
+            for token in tokenize(text or ''):
+                index, sign = self._bucket(token)
+                counts[index] = counts.get(index, 0.0) + weight
+                signs[index] = signs.get(index, 0.0) + sign * weight
+
+        vector = np.zeros(self.n_features, dtype=np.float32)
+        for index, count in counts.items():
+            # colliding tokens may cancel out, the sign of the sum decides.
+            vector[index] = math.copysign(1.0 + math.log(count), signs[index] or 1.0)
+        return vector
+
+
+class SimilarityIndex:
+    def __init__(self, root: str | Path | None = None, n_features: int = 2048):
+        self.root = Path(root) if root else data_path('index', 'similarity')
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        meta_file = self.root / 'ids.json'
+        if meta_file.exists():
+            meta = json.loads(meta_file.read_text(encoding='utf-8'))
+            n_features = meta['n_features']
+            self.ids: list[str] = meta['ids']
+            self.df = np.load(self.root / 'df.npy')
+        else:
+            self.ids = []
+            self.df = np.zeros(n_features, dtype=np.int64)
+
+        self.n_features = n_features
+        self.vectorizer = HashingVectorizer(n_features)
+        self._rows = {paper_id: row for row, paper_id in enumerate(self.ids)}
+        self._vectors: np.memmap | None = None
+
+    @property
+    def vectors_file(self) -> Path:
+        return self.root / 'vectors.f32'
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, paper_id) -> bool:
+        return str(paper_id) in self._rows
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Raw TF rows, memory-mapped read-only."""
+        if self._vectors is None:
+            if not self.ids:
+                return np.zeros((0, self.n_features), dtype=np.float32)
+            self._vectors = np.memmap(self.vectors_file, dtype=np.float32, mode='r',
+                                      shape=(len(self.ids), self.n_features))
+        return self._vectors
+
+    def _save_meta(self):
+        np.save(self.root / 'df.npy', self.df)
+        tmp_file = self.root / 'ids.json.tmp'
+        tmp_file.write_text(json.dumps({'n_features': self.n_features, 'ids': self.ids}), encoding='utf-8')
+        os.replace(tmp_file, self.root / 'ids.json')
+
+    def add(self, items: Iterable[tuple[str, Iterable[tuple[str, float]]]]) -> int:
+        """
+        Add or update papers, `items` yields (paper id, weighted text fields).
+
+        New papers are appended to the matrix file, known ones are rewritten in place. A
+        paper given twice takes its last fields.
+        """
+        vectors = {}
+        for paper_id, fields in items:
+            vectors[str(paper_id)] = self.vectorizer.transform(fields)
+
+        new_rows, updates = [], {}
+        for paper_id, vector in vectors.items():
+            if paper_id in self._rows:
+                updates[self._rows[paper_id]] = vector
+            else:
+                self._rows[paper_id] = len(self.ids) + len(new_rows)
+                new_rows.append((paper_id, vector))
+
+        if not new_rows and not updates:
+            return 0
+
+        self._vectors = None
+        if updates:
+            matrix = np.memmap(self.vectors_file, dtype=np.float32, mode='r+', shape=(len(self.ids), self.n_features))
+            for row, vector in updates.items():
+                self.df -= matrix[row] != 0
+                self.df += vector != 0
+                matrix[row] = vector
+            matrix.flush()
+            del matrix
+
+        if new_rows:
+            block = np.stack([vector for _, vector in new_rows])
+            self.df += np.count_nonzero(block, axis=0)
+            with open(self.vectors_file, 'ab') as fout:
+                fout.write(block.tobytes())
+            self.ids.extend(paper_id for paper_id, _ in new_rows)
+
+        self._save_meta()
+        return len(new_rows) + len(updates)
+
+    @property
+    def idf(self) -> np.ndarray:
+        n = len(self.ids)
+        return (np.log((1.0 + n) / (1.0 + self.df)) + 1.0).astype(np.float32)
+
+    def _weighted(self, rows: np.ndarray, idf: np.ndarray) -> np.ndarray:
+        weighted = rows * idf
+        norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+        return weighted / np.where(norms > 0, norms, 1.0)
+
+    def query(self,
+              fields: Iterable[tuple[str, float]],
+              k: int = 10) -> list[tuple[str, float]]:
+        """Top-k papers for free text, e.g. [('sparse attention long context', 1.0)]."""
+        vector = self.vectorizer.transform(fields)[None, :]
+        return self._top_k(vector, k, exclude_rows=None)[0]
+
+    def _top_k(self, queries: np.ndarray, k: int, exclude_rows: np.ndarray | None,
+               batch_size: int = 2048) -> list[list[tuple[str, float]]]:
+        n = len(self.ids)
+        if n == 0:
+            return [[] for _ in range(len(queries))]
+
+        idf = self.idf
+        queries = self._weighted(queries, idf)
+        results = []
+        # score against the library in row batches, the memory-mapped matrix is never copied whole.
+        for start in range(0, len(queries), batch_size):
+            q = queries[start:start + batch_size]
+            scores = np.empty((len(q), n), dtype=np.float32)
+            for row in range(0, n, batch_size):
+                scores[:, row:row + batch_size] = q @ self._weighted(self.vectors[row:row + batch_size], idf).T
+            if exclude_rows is not None:
+                scores[np.arange(len(q)), exclude_rows[start:start + batch_size]] = -np.inf
+
+            top = min(k, n - (1 if exclude_rows is not None else 0))
+            if top <= 0:
+                results.extend([] for _ in range(len(q)))
+                continue
+            candidates = np.argpartition(-scores, top - 1, axis=1)[:, :top]
+            candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+            order = np.argsort(-candidate_scores, axis=1)
+            candidates = np.take_along_axis(candidates, order, axis=1)
+            candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+            for rows, values in zip(candidates, candidate_scores):
+                results.append([(self.ids[r], float(v)) for r, v in zip(rows, values)])
+        return results
+
+    def most_similar(self, paper_ids: list[str] | None = None, k: int = 10,
+                     batch_size: int = 2048) -> Iterator[tuple[str, list[tuple[str, float]]]]:
+        """Top-k neighbours of indexed papers (all of them by default), excluding the paper itself."""
+        rows = np.arange(len(self.ids)) if paper_ids is None else np.array([self._rows[str(i)] for i in paper_ids])
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            neighbours = self._top_k(np.asarray(self.vectors[batch]), k, exclude_rows=batch, batch_size=batch_size)
+            for row, result in zip(batch, neighbours):
+                yield self.ids[row], result
@@ -0,0 +1,286 @@
+# coding=utf-8
+"""
+Tables of PDF pages as structured cells.
+
+PyMuPDF's `find_tables` costs 20-200 ms per page whether or not the page has a table,
+several times the cost of parsing its text. So a cheap pre-check runs first and only
+pages that pass it get the full detection:
+    - hints in the already parsed text of the page: a caption such as "Table 3:", or
+      rows of three or more cells (text on one baseline, apart by more than a space);
+    - ruling lines, from the page's vector paths (`get_cdrawings`, a millisecond or two,
+      so only read on pages with a hint): horizontal rules of booktabs tables, vertical
+      ones of fully ruled grids.
+A page passes with a caption and some rules, or with a ruled grid; pages drawn full of
+vector paths (plots) need a caption. Tables without any rules are not found, nor are
+grids of two columns without a caption.
+
+Ruled grids are detected by `find_tables` from their lines. Booktabs tables, rules
+without columns, are read from the words between the rules, which costs a fraction of
+`find_tables` with its text strategy.
+
+Results, negatives included, are cached by PDF hash and page next to the parsed
+document, see `ParsedDocumentStore.load_tables`.
+"""
+import logging
+import re
+import time
+
+import fitz
+from pydantic import BaseModel, Field
+
+from pageleaf.schemas.io.pdf import PdfPage, PdfSpan, PdfTable, TableCell
+
+logger = logging.getLogger(__name__)
+
+_CAPTION = re.compile(r'^\s*(?:Table|TABLE|Tab\.)\s*[0-9IVX]+\b')
+
+
+class PageSignals(BaseModel):
+    page_number: int
+    h_rules: int = 0  # horizontal ruling lines
+    v_rules: int = 0  # vertical ruling lines
+    drawings: int = 0  # vector paths on the page
+    caption: bool = False  # a line starting with "Table N"
+    grid_rows: int = 0  # rows of three or more cells in the text
+    # (x0, y, x1) of the horizontal rules, to find the tables without reading the drawings again.
+    rules: list[tuple[float, float, float]] = Field(default_factory=list, exclude=True)
+
+
+class TableGate(BaseModel):
+    min_rules: int = 2  # rules of a captioned table: top and bottom at least
+    min_grid_rules: int = 3  # rules each way of a grid without a caption on the page
+    max_drawings: int = 1000  # more paths than this is a figure, unless there is a caption
+    min_rule_length: float = 20.0
+    min_grid_rows: int = 3  # rows of cells that make the vector paths of a page without a caption worth reading
+
+    def passes(self, signals: PageSignals) -> bool:
+        rules = max(signals.h_rules, signals.v_rules)
+        if signals.caption:
+            return rules >= self.min_rules
+        if signals.drawings > self.max_drawings:
+            return False
+        return signals.h_rules >= self.min_grid_rules and signals.v_rules >= self.min_grid_rules
+
+
+def captions(parsed: PdfPage | None) -> list[tuple[tuple[float, float, float, float], str]]:
+    """(bbox, text) of the table captions of a parsed page."""
+    if parsed is None:
+        return []
+    return [(block.bbox, block.text) for block in parsed.blocks
+            if block.is_text() and _CAPTION.match(block.text)]
+
+
+def grid_rows(parsed: PdfPage | None, min_cells: int = 3) -> int:
+    """Baselines of a parsed page holding `min_cells` or more runs of text apart by more than a space."""
+    if parsed is None:
+        return 0
+    baselines: dict[int, list[PdfSpan]] = {}
+    for block in parsed.blocks:
+        if block.is_text():
+            for line in block.lines:
+                for span in line.spans:
+                    if span.text.strip():
+                        baselines.setdefault(round(span.origin[1]), []).append(span)
+    n = 0
+    for spans in baselines.values():
+        if len(spans) < min_cells:
+            continue
+        spans.sort(key=lambda span: span.bbox[0])
+        cells = 1 + sum(1 for a, b in zip(spans, spans[1:]) if b.bbox[0] - a.bbox[2] > a.font_size / 2)
+        n += cells >= min_cells
+    return n
+
+
+def page_signals(page: fitz.Page, parsed: PdfPage | None = None, min_rule_length: float = 20.0,
+                 min_grid_rows: int | None = 3) -> PageSignals:
+    """
+    The pre-check signals of `page`, `parsed` is its parsed text. The vector paths are only
+    read with a caption or `min_grid_rows` rows of cells on the page, always if it is None.
+    """
+    signals = PageSignals(page_number=page.number + 1, caption=bool(captions(parsed)), grid_rows=grid_rows(parsed))
+    if min_grid_rows is not None and parsed is not None and not signals.caption and signals.grid_rows < min_grid_rows:
+        return signals
+    for path in page.get_cdrawings():
+        signals.drawings += 1
+        stroked = 's' in path.get('type', '')
+        for item in path['items']:
+            if item[0] == 'l':
+                (x0, y0), (x1, y1) = item[1], item[2]
+                dx, dy = abs(x1 - x0), abs(y1 - y0)
+            elif item[0] == 're':
+                rect = fitz.Rect(item[1])
+                dx, dy = rect.width, rect.height
+                if stroked and dx >= min_rule_length and dy >= min_rule_length:
+                    # a stroked box, e.g. the border of a cell.
+                    signals.h_rules += 2
+                    signals.v_rules += 2
+                    continue
+            else:
+                continue
+            if dy < 2 and dx >= min_rule_length:
+                signals.h_rules += 1
+                if item[0] == 'l':
+                    signals.rules.append((min(x0, x1), (y0 + y1) / 2, max(x0, x1)))
+                else:
+                    signals.rules.append((rect.x0, (rect.y0 + rect.y1) / 2, rect.x1))
+            elif dx < 2 and dy >= min_rule_length / 2:
+                signals.v_rules += 1
+    return signals
+
+
+def _caption_of(bbox: fitz.Rect, page_captions: list, max_distance: float = 40.0) -> str | None:
+    best, best_distance = None, max_distance
+    for caption_bbox, text in page_captions:
+        caption_bbox = fitz.Rect(caption_bbox)
+        if caption_bbox.x1 < bbox.x0 or caption_bbox.x0 > bbox.x1:
+            continue
+        distance = max(bbox.y0 - caption_bbox.y1, caption_bbox.y0 - bbox.y1, 0)
+        if distance < best_distance:
+            best, best_distance = text.replace('\n', ' '), distance
+    return best
+
+
+def rule_groups(rules: list[tuple[float, float, float]], tolerance: float = 5.0) -> list[fitz.Rect]:
+    """
+    Areas of booktabs-like tables: two or more horizontal rules (x0, y, x1) of the same
+    extent, top rule to bottom rule.
+    """
+    groups = []
+    for x0, y, x1 in sorted(rules, key=lambda rule: rule[1]):
+        group = next((g for g in groups if abs(g[0] - x0) <= tolerance and abs(g[2] - x1) <= tolerance), None)
+        if group is None:
+            groups.append([x0, y, x1, y, 1])
+        else:
+            group[3], group[4] = y, group[4] + 1
+    return [fitz.Rect(x0, top - 1, x1, bottom + 1) for x0, top, x1, bottom, n in groups if n >= 2]
+
+
+def _make_table(page_number: int, bbox: fitz.Rect, n_rows: int, n_cols: int, cells: list[TableCell],
+                page_captions: list, min_cells: int) -> PdfTable | None:
+    if n_rows < 2 or n_cols < 2 or sum(1 for cell in cells if cell.text) < min_cells:
+        return None
+    result = PdfTable(page_number=page_number, bbox=tuple(bbox), n_rows=n_rows, n_cols=n_cols,
+                      caption=_caption_of(bbox, page_captions), cells=cells)
+    result.header = result.rows()[0]
+    return result
+
+
+def _to_table(table, page_number: int, page_captions: list, min_cells: int) -> PdfTable | None:
+    texts = table.extract()
+    # text alignment makes rows of the gaps around the rules, they hold no text.
+    kept = [r for r, row in enumerate(texts) if any((text or '').strip() for text in row)]
+    cells = [TableCell(row=i, col=c, bbox=tuple(bbox), text=(texts[r][c] or '').strip())
+             for i, r in enumerate(kept) for c, bbox in enumerate(table.rows[r].cells) if bbox is not None]
+    return _make_table(page_number, fitz.Rect(table.bbox), len(kept), table.col_count, cells, page_captions,
+                       min_cells)
+
+
+def _text_table(page: fitz.Page, clip: fitz.Rect, page_number: int, page_captions: list,
+                min_cells: int) -> PdfTable | None:
+    """
+    The table in `clip` read from its words: a row is words whose vertical centres fall
+    within it, a column an x range covered by words of any row, up to a gap wider than
+    half the text height.
+    """
+    words = [w for w in page.get_text('words', clip=clip) if clip.contains(fitz.Point((w[0] + w[2]) / 2,
+                                                                                      (w[1] + w[3]) / 2))]
+    if not words:
+        return None
+    rows = []  # [y0, y1, words]
+    for word in sorted(words, key=lambda w: (w[1] + w[3]) / 2):
+        if rows and (word[1] + word[3]) / 2 <= rows[-1][1]:
+            rows[-1][1] = max(rows[-1][1], word[3])
+            rows[-1][2].append(word)
+        else:
+            rows.append([word[1], word[3], [word]])
+    heights = sorted(w[3] - w[1] for w in words)
+    gap = heights[len(heights) // 2] / 2
+    columns = []  # [x0, x1]
+    for x0, x1 in sorted((w[0], w[2]) for w in words):
+        if columns and x0 <= columns[-1][1] + gap:
+            columns[-1][1] = max(columns[-1][1], x1)
+        else:
+            columns.append([x0, x1])
+
+    cells = []
+    for r, (y0, y1, row_words) in enumerate(rows):
+        row_words.sort(key=lambda w: w[0])
+        for c, (x0, x1) in enumerate(columns):
+            text = ' '.join(w[4] for w in row_words if x0 <= w[0] and w[2] <= x1)
+            cells.append(TableCell(row=r, col=c, bbox=(x0, y0, x1, y1), text=text))
+    return _make_table(page_number, clip, len(rows), len(columns), cells, page_captions, min_cells)
+
+
+def extract_tables(page: fitz.Page, parsed: PdfPage | None = None, signals: PageSignals | None = None,
+                   min_cells: int = 4) -> list[PdfTable]:
+    """
+    Run the full table detection on `page`. Ruled grids are found from their lines;
+    booktabs tables have no vertical rules, so the area of each group of horizontal
+    rules is read from the alignment of its words.
+    """
+    signals = signals or page_signals(page, parsed, min_grid_rows=None)
+    page_captions = captions(parsed)
+    found = []
+    if signals.v_rules >= 2:
+        found = page.find_tables(horizontal_strategy='lines', vertical_strategy='lines').tables
+    if found:
+        tables = [_to_table(table, signals.page_number, page_captions, min_cells) for table in found]
+    else:
+        tables = [_text_table(page, clip, signals.page_number, page_captions, min_cells)
+                  for clip in rule_groups(signals.rules)]
+    return [table for table in tables if table is not None]
+
+
+class PageTables(BaseModel):
+    page_number: int
+    candidate: bool  # passed the pre-check, the detection ran
+    tables: list[PdfTable] = []
+
+
+class TableStats(BaseModel):
+    pages: int = 0
+    candidates: int = 0  # pages that passed the pre-check
+    tables: int = 0
+    check_seconds: float = 0.0
+    detect_seconds: float = 0.0
+
+
+class TableExtractor:
+    """
+    Usage:
+        extractor = TableExtractor()
+        with fitz.open(pdf_file) as doc:
+            tables = extractor.extract(doc, parsed_pages)
+    """
+
+    def __init__(self, gate: TableGate | None = None):
+        self.gate = gate or TableGate()
+        self.stats = TableStats()
+
+    def extract(self, doc: fitz.Document, parsed: dict[int, PdfPage], pages: list[int] | None = None,
+                gated: bool = True) -> dict[int, PageTables]:
+        """
+        Tables of `pages` (page numbers, all pages if None) by page number. `parsed` holds
+        the parsed text by page number, `gated=False` runs the detection on every page.
+        """
+        results = {}
+        for page_number in pages or range(1, doc.page_count + 1):
+            if not 1 <= page_number <= doc.page_count:
+                continue
+            page, text = doc[page_number - 1], parsed.get(page_number)
+            start = time.perf_counter()
+            # without the gate every page is examined in full, vector paths included.
+            signals = page_signals(page, text, self.gate.min_rule_length,
+                                   self.gate.min_grid_rows if gated else None)
+            candidate = self.gate.passes(signals)
+            self.stats.check_seconds += time.perf_counter() - start
+            self.stats.pages += 1
+            self.stats.candidates += candidate
+            tables = []
+            if candidate or not gated:
+                start = time.perf_counter()
+                tables = extract_tables(page, text, signals)
+                self.stats.detect_seconds += time.perf_counter() - start
+                self.stats.tables += len(tables)
+            results[page_number] = PageTables(page_number=page_number, candidate=candidate, tables=tables)
+        return results
@@ -1,19 +1,104 @@
 # coding=utf-8
 import logging
+import time
 from pathlib import Path
 
 import arxiv
+import requests
 
 from pageleaf.commons.io.files import json_dump, json_load
-from pageleaf.fetchers.base import BaseFetcher, extract_arxiv_id, RawPaperData
+from pageleaf.config.fetchers import FetcherConfig
+from pageleaf.fetchers.base import BaseFetcher, extract_arxiv_id, RawPaperData, retry_delay
 
 logger = logging.getLogger(__name__)
 
 
+def convert_result(paper: arxiv.Result) -> dict:
+    """The cached form of an arXiv API result."""
+    return {
+        'id': paper.entry_id,
+        'short_id': paper.get_short_id(),
+        'title': paper.title,
+        'summary': paper.summary,
+
+        'published': paper.published.isoformat() if paper.published else None,
+        'updated': paper.updated.isoformat() if paper.updated else None,
+
+        'categories': paper.categories,
+        'primary_category': paper.primary_category,
+        'authors': [author.name for author in paper.authors],
+
+        'links': [{'href': link.href, 'rel': link.rel, 'content-type': link.content_type, 'title': link.title} for link in paper.links],
+        'pdf_url': paper.pdf_url,
+        'source_url': paper.source_url(),
+        'doi': paper.doi,
+        'comment': paper.comment,
+    }
+
+
 class ArxivMetaFetcher(BaseFetcher):
     source = 'arxiv_api'
     priority = 9
 
+    def __init__(self, config: FetcherConfig | None = None):
+        self.config = config or FetcherConfig.from_env()
+        self.codec = self.config.layout.codec(self.config.codec)
+
+    def client(self, page_size: int = 100) -> arxiv.Client:
+        client = arxiv.Client(page_size=page_size, delay_seconds=self.config.arxiv_delay_seconds,
+                              num_retries=self.config.max_retries)
+        client.query_url_format = f'{self.config.arxiv_api_url}?{{}}'
+        return client
+
+    def _results(self, search: arxiv.Search, client: arxiv.Client | None = None) -> list[arxiv.Result]:
+        client = client or self.client()
+        # the client retries failed requests but not bodies cut short.
+        for attempt in range(self.config.max_retries + 1):
+            try:
+                return list(client.results(search))
+            except requests.exceptions.ChunkedEncodingError as e:
+                if attempt == self.config.max_retries:
+                    raise
+                delay = retry_delay({}, attempt, self.config.retry_cap)
+                logger.warning(f'Arxiv API response broken ({e}), retrying in {delay:.1f} s')
+                time.sleep(delay)
+
+    def _first_result(self, search: arxiv.Search) -> arxiv.Result:
+        return self._results(search)[0]
+
+    def cache_path(self, arxiv_id: str) -> Path:
+        return self.config.layout.resolve('arxiv', f'{arxiv_id}.json')
+
+    def cached(self, arxiv_id: str) -> dict | None:
+        path = self.cache_path(arxiv_id)
+        return json_load(path) if path.exists() else None
+
+    def save(self, arxiv_id: str, record: dict) -> RawPaperData:
+        """Cache `record`, replacing what was cached for the paper."""
+        save_path = self.cache_path(arxiv_id)
+        json_dump(record, save_path, indent=2, codec=self.codec)
+        return RawPaperData(source=self.source, external_ids={'arxiv': arxiv_id},
+                            payload={'json_path': str(save_path), 'data': record})
+
+    def fetch_batch(self, arxiv_ids: list[str], batch_size: int | None = None) -> dict[str, dict]:
+        """
+        Current metadata of many papers by arXiv id, `batch_size` ids per API request; the
+        cache is neither read nor written. Papers of a request that failed are left out.
+        """
+        batch_size = batch_size or self.config.arxiv_batch_size
+        client = self.client(page_size=batch_size)
+        records = {}
+        for start in range(0, len(arxiv_ids), batch_size):
+            batch = arxiv_ids[start:start + batch_size]
+            try:
+                for paper in self._results(arxiv.Search(id_list=batch, max_results=len(batch)), client):
+                    arxiv_id = extract_arxiv_id(paper.entry_id)
+                    if arxiv_id:
+                        records[arxiv_id] = convert_result(paper)
+            except Exception as e:
+                logger.error(f'Arxiv Metadata Batch Error ({len(batch)} papers from {batch[0]}): {e}')
+        return records
+
     def can_handle(self, identifier: str) -> bool:
         return extract_arxiv_id(identifier) is not None
 
@@ -22,8 +107,7 @@ class ArxivMetaFetcher(BaseFetcher):
         if not arxiv_id:
             return None
 
-        save_path = Path.home() / f'data/papers/arxiv/{arxiv_id}.json'
-        save_path.parent.mkdir(parents=True, exist_ok=True)
+        save_path = self.cache_path(arxiv_id)
         if save_path.exists():
             logger.info(f'Metadata File already exists: {save_path}, skipping download.')
             return RawPaperData(
@@ -35,36 +119,7 @@ class ArxivMetaFetcher(BaseFetcher):
 
         try:
             search = arxiv.Search(id_list=[arxiv_id])
-            paper = next(arxiv.Client().results(search))
-
-            converted = {
-                'id': paper.entry_id,
-                'short_id': paper.get_short_id(),
-                'title': paper.title,
-                'summary': paper.summary,
-
-                'published': paper.published.isoformat() if paper.published else None,
-                'updated': paper.updated.isoformat() if paper.updated else None,
-
-                'categories': paper.categories,
-                'primary_category': paper.primary_category,
-                'authors': [author.name for author in paper.authors],
-
-                'links': [{'href': link.href, 'rel': link.rel, 'content-type': link.content_type, 'title': link.title} for link in paper.links],
-                'pdf_url': paper.pdf_url,
-                'source_url': paper.source_url(),
-                'doi': paper.doi,
-                'comment': paper.comment,
-            }
-
-            json_dump(converted, save_path, indent=2)
-
-            return RawPaperData(
-                source=self.source,
-                external_ids={'arxiv': arxiv_id},
-                payload={'json_path': str(save_path),
-                         'data': converted}
-            )
+            return self.save(arxiv_id, convert_result(self._first_result(search)))
         except Exception as e:
             logger.error(f'Arxiv Metadata Fetch Error: {e}')
         return None
@@ -1,23 +1,56 @@
 # coding=utf-8
 import logging
+import os
 import sys
+import time
 from pathlib import Path
 
 import httpx
 
-from pageleaf.fetchers.base import BaseFetcher, extract_arxiv_id, RawPaperData, sanitize_filename
+from pageleaf.config.fetchers import FetcherConfig
+from pageleaf.fetchers.base import (BaseFetcher, extract_arxiv_id, RawPaperData, RETRY_STATUS, retry_delay,
+                                    sanitize_filename)
 
 logger = logging.getLogger(__name__)
 
 
+class IncompleteDownload(Exception):
+    pass
+
+
+def check_pdf(path: Path, expected_size: int = 0):
+    """Raise `IncompleteDownload` unless `path` holds a whole PDF (of `expected_size` bytes when known)."""
+    size = path.stat().st_size
+    if expected_size and size != expected_size:
+        raise IncompleteDownload(f'{size} of {expected_size} bytes')
+    with open(path, 'rb') as fin:
+        head = fin.read(5)
+        fin.seek(max(0, size - 1024))
+        tail = fin.read()
+    if head != b'%PDF-':
+        raise IncompleteDownload('not a PDF')
+    if b'%%EOF' not in tail:
+        raise IncompleteDownload('no %%EOF marker, the PDF is truncated')
+
+
 class ArxivPdfFetcher(BaseFetcher):
     source = 'arxiv'
     priority = 100
 
+    def __init__(self, config: FetcherConfig | None = None):
+        self.config = config or FetcherConfig.from_env()
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:145.0) Gecko/20100101 Firefox/145.0',
+        }
+        # one pooled client: building one costs more than a request to a nearby server.
+        self.client = httpx.Client(headers=headers, follow_redirects=True, timeout=self.config.timeout)
+
     def can_handle(self, identifier: str) -> bool:
         return extract_arxiv_id(identifier) is not None
 
-    def fetch(self, identifier: str, suggested_title: str = None):
+    def fetch(self, identifier: str, suggested_title: str = None, version: int | None = None,
+              refresh: bool = False):
+        """The latest PDF, or `version`; `refresh` downloads it again over the cached file."""
         arxiv_id = extract_arxiv_id(identifier)
         if not arxiv_id:
             return None
@@ -28,10 +61,9 @@ class ArxivPdfFetcher(BaseFetcher):
         else:
             filename = f'{arxiv_id}.pdf'
 
-        save_path = Path.home() / f'data/papers/arxiv/{filename}'
-        save_path.parent.mkdir(parents=True, exist_ok=True)
+        save_path = self.config.layout.resolve('arxiv', filename)
 
-        if save_path.exists():
+        if save_path.exists() and not refresh:
             logger.info(f'File already exists: {save_path}, skipping download.')
             return RawPaperData(
                 source=self.source,
@@ -39,45 +71,71 @@ class ArxivPdfFetcher(BaseFetcher):
                 payload={'pdf_path': str(save_path)}
             )
 
-        # TODO: multi versions support
-        pdf_url = f'https://arxiv.org/pdf/{arxiv_id}'
+        pdf_url = f'{self.config.arxiv_pdf_url}/{arxiv_id}' + (f'v{version}' if version else '')
 
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:145.0) Gecko/20100101 Firefox/145.0',
-        }
+        # the PDF only appears under its name once it is complete, a failed download leaves nothing behind.
+        part_path = save_path.with_name(f'{save_path.name}.{os.getpid()}.part')
         try:
-            with httpx.Client(headers=headers, follow_redirects=True) as client:
-                with client.stream('GET', pdf_url) as resp:
-                    if resp.status_code != 200:
-                        logger.warning(f'Arxiv download pdf failed, code: {resp.status_code}')
-                        return None
-
-                    logger.debug(f'headers: {resp.headers}')
-                    total_size = int(resp.headers.get('Content-Length', 0))
-                    downloaded = 0
-
-                    with open(save_path, 'wb') as f:
-                        print('is atty:', sys.stdout.isatty())
-                        for chunk in resp.iter_bytes(chunk_size=8192):
-                            f.write(chunk)
-                            downloaded += len(chunk)
-
-                            if total_size > 0 and sys.stdout.isatty():
-                                percent = downloaded / total_size * 100
-                                sys.stdout.write(f'\r[Fetcher] Progress: {percent:.1f}%')
-                                sys.stdout.flush()
-                    if sys.stdout.isatty():
-                        print()
-
-            return RawPaperData(
-                source=self.source,
-                external_ids={'arxiv': arxiv_id},
-                payload={'pdf_path': str(save_path)}
-            )
+            for attempt in range(self.config.max_retries + 1):
+                last = attempt == self.config.max_retries
+                try:
+                    status, headers = self._download(pdf_url, part_path)
+                except (httpx.TransportError, IncompleteDownload) as e:
+                    if last:
+                        raise
+                    delay = retry_delay({}, attempt, self.config.retry_cap)
+                    logger.warning(f'Arxiv download broken ({e}), retrying in {delay:.1f} s')
+                    time.sleep(delay)
+                    continue
+                if status in RETRY_STATUS and not last:
+                    delay = retry_delay(headers, attempt, self.config.retry_cap)
+                    logger.warning(f'Arxiv returned {status}, retrying in {delay:.1f} s')
+                    time.sleep(delay)
+                    continue
+                if status != 200:
+                    logger.warning(f'Arxiv download pdf failed, code: {status}')
+                    return None
+
+                os.replace(part_path, save_path)
+                return RawPaperData(
+                    source=self.source,
+                    external_ids={'arxiv': arxiv_id},
+                    payload={'pdf_path': str(save_path)}
+                )
         except Exception as e:
             logger.error(f'Arxiv Fetch Error: {e}')
+        finally:
+            part_path.unlink(missing_ok=True)
         return None
 
+    def fetch_with(self, identifier: str, inputs: dict) -> RawPaperData | None:
+        return self.fetch(identifier, suggested_title=inputs.get('title'))
+
+    def _download(self, url: str, path: Path) -> tuple[int, httpx.Headers]:
+        """Stream `url` into `path` and check that a whole PDF arrived, return the status and headers."""
+        with self.client.stream('GET', url) as resp:
+            if resp.status_code != 200:
+                return resp.status_code, resp.headers
+
+            logger.debug(f'headers: {resp.headers}')
+            total_size = int(resp.headers.get('Content-Length', 0))
+            progress = self.config.show_progress and total_size > 0 and sys.stdout.isatty()
+            downloaded = 0
+            with open(path, 'wb') as f:
+                for chunk in resp.iter_bytes(chunk_size=8192):
+                    f.write(chunk)
+                    downloaded += len(chunk)
+                    if progress:
+                        percent = downloaded / total_size * 100
+                        sys.stdout.write(f'\r[Fetcher] Progress: {percent:.1f}%')
+                        sys.stdout.flush()
+            if progress:
+                print()
+
+        # the length is that of the encoded body when the transfer is compressed.
+        check_pdf(path, 0 if resp.headers.get('Content-Encoding') else total_size)
+        return resp.status_code, resp.headers
+
 
 if __name__ == '__main__':
     # headers: Headers({'connection': 'keep-alive', 'content-length': '980616', 'access-control-allow-origin': '*',
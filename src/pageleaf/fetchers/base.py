@@ -2,10 +2,13 @@
 from abc import ABC, abstractmethod
 
 import re
+from pathlib import Path
 from typing import Any
 
 from pydantic import Field, BaseModel
 
+from pageleaf.config.paths import locate
+
 
 def is_valid_arxiv_id(arxiv_id: str) -> bool:
     """
@@ -48,6 +51,25 @@ def extract_arxiv_id(url_or_id: str) -> str | None:
     return None
 
 
+def record_version(record: dict) -> int | None:
+    """Version number of an arXiv metadata record, from its `short_id` such as 2501.01234v2."""
+    match = re.search(r'v(\d+)$', record.get('short_id') or '')
+    return int(match.group(1)) if match else None
+
+
+def relocate_payloads(results: dict) -> dict:
+    """Follow the files of fetched `results` moved into their shard since they were cached."""
+    for raw in results.values():
+        payload = raw.get('payload') or {}
+        for key in ('pdf_path', 'json_path'):
+            path = Path(payload[key]) if payload.get(key) else None
+            if path is not None and not path.exists():
+                found = locate(path.parent, path.name)
+                if found is not None:
+                    payload[key] = str(found)
+    return results
+
+
 def sanitize_filename(filename: str, max_length: int = 200) -> str:
     """清理文件名，去除特殊字符并限制长度"""
 
@@ -63,6 +85,19 @@ def sanitize_filename(filename: str, max_length: int = 200) -> str:
     return filename
 
 
+# statuses worth retrying after a pause, throttling and overload.
+RETRY_STATUS = frozenset({429, 502, 503, 504})
+
+
+def retry_delay(headers, attempt: int, cap: float = 30.0) -> float:
+    """Seconds to wait before the next attempt: `Retry-After` when the server sent it, else exponential."""
+    try:
+        delay = float(headers.get('Retry-After') or 2 ** attempt)
+    except ValueError:  # an HTTP date
+        delay = 2 ** attempt
+    return min(max(delay, 0.0), cap)
+
+
 class RawPaperData(BaseModel):
     source: str
     external_ids: dict[str, str] = Field(default_factory=dict)
@@ -81,3 +116,10 @@ class BaseFetcher(ABC):
     def fetch(self, identifier: str):
         """identifier should be a "raw" id, `fetch` will handle it accordingly."""
         pass
+
+    def fetch_with(self, identifier: str, inputs: dict[str, Any]) -> RawPaperData | None:
+        """
+        `fetch` given the outputs of other fetchers this one needs, see `FetcherSpec.needs`;
+        an input is None when no fetcher could provide it.
+        """
+        return self.fetch(identifier)
@@ -0,0 +1,199 @@
+# coding=utf-8
+"""
+Hugging Face daily papers feed.
+
+One paginated `GET /api/daily_papers?date=...` call returns every paper featured that
+day with the same fields as `GET /api/papers/{id}`, so tracking a month of hot papers
+takes a few dozen requests. Each paper of the feed is cached as
+`hf/{YYMM}/{arxiv id}.json`, where `HuggingFacePaperFetcher` finds it, and well-upvoted papers become tier P1
+candidates.
+"""
+import logging
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import httpx
+from pydantic import BaseModel
+
+from pageleaf.commons.io.codecs import StorageCodec
+from pageleaf.commons.io.files import json_dump, json_load
+from pageleaf.config.fetchers import FetcherConfig
+from pageleaf.config.paths import locate, sharded
+from pageleaf.fetchers.base import extract_arxiv_id, RETRY_STATUS, retry_delay
+from pageleaf.schemas.paper import PaperEngagement, Tier
+from pageleaf.storage.library import PaperLibrary
+
+logger = logging.getLogger(__name__)
+
+# fields read by the ingester, absent from the feed when HF has no value for them.
+_PAPER_FIELDS = ('ai_summary', 'ai_keywords', 'githubRepo', 'githubStars')
+
+
+class TierCandidate(BaseModel):
+    arxiv_id: str
+    title: str
+    upvotes: int
+    day: date
+    tier: Tier = Tier.P1
+
+    @property
+    def reason(self) -> str:
+        return f'HF daily papers {self.day}: {self.upvotes} upvotes'
+
+
+class FeedResult(BaseModel):
+    days: int = 0
+    requests: int = 0
+    papers: int = 0
+    candidates: list[TierCandidate] = []
+
+
+class HuggingFaceDailyFetcher:
+    source = 'huggingface_daily'
+
+    def __init__(self,
+                 base_url: str | None = None,
+                 cache_dir: str | Path | None = None,
+                 page_size: int = 100,
+                 min_upvotes: int = 50,
+                 timeout: float = 10.0,
+                 max_retries: int = 3,
+                 config: FetcherConfig | None = None):
+        """
+        Args:
+            base_url: HF API root, `config.hf_api_url` if None.
+            cache_dir: where per-paper JSON and per-day feeds are kept, `{config.data_dir}/hf` if None.
+            page_size: papers per request.
+            min_upvotes: papers with at least this many upvotes become P1 candidates.
+        """
+        config = config or FetcherConfig.from_env()
+        self.base_url = (base_url or config.hf_api_url).rstrip('/')
+        self.cache_dir = Path(cache_dir) if cache_dir else config.data_dir / 'hf'
+        # the dictionary of the data root is only found again from files under it.
+        self.codec = StorageCodec(config.codec) if cache_dir else config.layout.codec(config.codec)
+        self.retry_cap = config.retry_cap
+        self.page_size = page_size
+        self.min_upvotes = min_upvotes
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+    def day_path(self, day: date) -> Path:
+        return self.cache_dir / 'daily' / f'{day.isoformat()}.json'
+
+    @property
+    def candidates_path(self) -> Path:
+        return self.cache_dir / 'candidates.json'
+
+    def _get(self, client: httpx.Client, params: dict, result: FeedResult) -> list[dict]:
+        for attempt in range(self.max_retries + 1):
+            result.requests += 1
+            resp = client.get(f'{self.base_url}/daily_papers', params=params)
+            if resp.status_code in RETRY_STATUS and attempt < self.max_retries:
+                delay = retry_delay(resp.headers, attempt, self.retry_cap)
+                logger.warning(f'HF returned {resp.status_code}, retrying in {delay:.1f} s')
+                time.sleep(delay)
+                continue
+            resp.raise_for_status()
+            return resp.json()
+        return []
+
+    def fetch_day(self, client: httpx.Client, day: date, result: FeedResult) -> list[dict]:
+        """Papers featured on `day`, page by page."""
+        papers, page = [], 0
+        while True:
+            items = self._get(client, {'date': day.isoformat(), 'limit': self.page_size, 'p': page}, result)
+            papers.extend(item['paper'] for item in items if item.get('paper'))
+            if len(items) < self.page_size:
+                return papers
+            page += 1
+
+    def _cache_paper(self, paper: dict) -> str | None:
+        arxiv_id = extract_arxiv_id(paper.get('id') or '')
+        if arxiv_id is None:
+            return None
+        for field in _PAPER_FIELDS:
+            paper.setdefault(field, None)
+        name = f'{arxiv_id}.json'
+        save_path = locate(self.cache_dir, name)
+        if save_path is None:
+            save_path = sharded(self.cache_dir, name)
+            save_path.parent.mkdir(exist_ok=True)
+        else:
+            # keep fields only the per-paper endpoint returns, take fresh counts from the feed.
+            paper = {**json_load(save_path), **paper}
+        json_dump(paper, save_path, indent=2, codec=self.codec)
+        return arxiv_id
+
+    def fetch_range(self, start: date, end: date | None = None, refresh: bool = False) -> FeedResult:
+        """
+        Fetch the feeds of `start` to `end` (inclusive). Days fetched before are read from
+        the cache unless `refresh`, except today and yesterday whose upvotes still move.
+        """
+        end = end or start
+        result = FeedResult()
+        candidates: dict[str, TierCandidate] = {}
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        with httpx.Client(timeout=self.timeout) as client:
+            day = start
+            while day <= end:
+                day_path = self.day_path(day)
+                settled = day < date.today() - timedelta(days=1)
+                if day_path.exists() and settled and not refresh:
+                    papers = json_load(day_path)
+                else:
+                    papers = self.fetch_day(client, day, result)
+                    day_path.parent.mkdir(parents=True, exist_ok=True)
+                    json_dump(papers, day_path, codec=self.codec)
+                    for paper in papers:
+                        self._cache_paper(dict(paper))
+
+                result.days += 1
+                result.papers += len(papers)
+                for paper in papers:
+                    arxiv_id = extract_arxiv_id(paper.get('id') or '')
+                    upvotes = paper.get('upvotes') or 0
+                    if arxiv_id and upvotes >= self.min_upvotes:
+                        candidate = TierCandidate(arxiv_id=arxiv_id, title=paper.get('title') or '',
+                                                  upvotes=upvotes, day=day)
+                        if arxiv_id not in candidates or candidates[arxiv_id].upvotes < upvotes:
+                            candidates[arxiv_id] = candidate
+                day += timedelta(days=1)
+
+        result.candidates = sorted(candidates.values(), key=lambda c: -c.upvotes)
+        self._save_candidates(result.candidates)
+        logger.info(f'HF daily {start} - {end}: {result.papers} papers, {len(result.candidates)} P1 candidates, '
+                    f'{result.requests} requests')
+        return result
+
+    def _save_candidates(self, candidates: list[TierCandidate]):
+        saved = {}
+        if self.candidates_path.exists():
+            saved = {c['arxiv_id']: c for c in json_load(self.candidates_path)}
+        for candidate in candidates:
+            previous = saved.get(candidate.arxiv_id)
+            if previous is None or previous['upvotes'] <= candidate.upvotes:
+                saved[candidate.arxiv_id] = candidate.model_dump(mode='json')
+        json_dump(sorted(saved.values(), key=lambda c: -c['upvotes']), self.candidates_path, indent=2,
+                  codec=self.codec)
+
+
+def mark_candidates(library: PaperLibrary, candidates: list[TierCandidate]) -> int:
+    """Give library entries without an engagement record the candidate tier, return how many changed."""
+    n = 0
+    for candidate in candidates:
+        entry = library.find(arxiv=candidate.arxiv_id)
+        if entry is None or entry.engagement is not None:
+            continue
+        engagement = PaperEngagement(tier=candidate.tier, entry_reason=candidate.reason)
+        library.save(entry.model_copy(update={'engagement': engagement}))
+        n += 1
+    return n
+
+
+if __name__ == '__main__':
+    fetcher = HuggingFaceDailyFetcher()
+    result = fetcher.fetch_range(date.today() - timedelta(days=7), date.today())
+    for c in result.candidates[:20]:
+        print(c.arxiv_id, c.upvotes, c.title)
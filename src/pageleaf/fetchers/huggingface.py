@@ -1,11 +1,12 @@
 # coding=utf-8
 import logging
-from pathlib import Path
+import time
 
 import httpx
 
 from pageleaf.commons.io.files import json_dump, json_load
-from pageleaf.fetchers.base import BaseFetcher, extract_arxiv_id, RawPaperData
+from pageleaf.config.fetchers import FetcherConfig
+from pageleaf.fetchers.base import BaseFetcher, extract_arxiv_id, RawPaperData, RETRY_STATUS, retry_delay
 
 logger = logging.getLogger(__name__)
 
@@ -14,8 +15,11 @@ class HuggingFacePaperFetcher(BaseFetcher):
     source = 'huggingface'
     priority = 10
 
-    def __init__(self, base_url: str = 'https://huggingface.co/api/papers'):
-        self.base_url = base_url
+    def __init__(self, config: FetcherConfig | None = None):
+        self.config = config or FetcherConfig.from_env()
+        self.codec = self.config.layout.codec(self.config.codec)
+        # one pooled client: building one costs more than a request to a nearby server.
+        self.client = httpx.Client(timeout=self.config.timeout)
 
     def can_handle(self, identifier: str) -> bool:
         return extract_arxiv_id(identifier) is not None
@@ -25,8 +29,7 @@ class HuggingFacePaperFetcher(BaseFetcher):
         if not arxiv_id:
             return None
 
-        save_path = Path.home() / f'data/papers/hf/{arxiv_id}.json'
-        save_path.parent.mkdir(parents=True, exist_ok=True)
+        save_path = self.config.layout.resolve('hf', f'{arxiv_id}.json')
         if save_path.exists():
             logger.info(f'HF File already exists: {save_path}, skipping download.')
             return RawPaperData(
@@ -36,20 +39,34 @@ class HuggingFacePaperFetcher(BaseFetcher):
                          'data': json_load(save_path)}
             )
 
-        url = f'{self.base_url}/{arxiv_id}'
+        url = f'{self.config.hf_api_url}/papers/{arxiv_id}'
         try:
-            with httpx.Client() as client:
-                resp = client.get(url, timeout=10.0)
-                logger.debug(f'headers: {resp.headers}')
-                if resp.status_code == 200:
-                    data = resp.json()
-                    json_dump(data, save_path, indent=2)
-                    return RawPaperData(
-                        source=self.source,
-                        external_ids={'arxiv': arxiv_id},
-                        payload={'json_path': str(save_path),
-                                 'data': data}
-                    )
+            for attempt in range(self.config.max_retries + 1):
+                last = attempt == self.config.max_retries
+                try:
+                    resp = self.client.get(url)
+                except httpx.TransportError as e:
+                    if last:
+                        raise
+                    delay = retry_delay({}, attempt, self.config.retry_cap)
+                    logger.warning(f'HF request broken ({e}), retrying in {delay:.1f} s')
+                    time.sleep(delay)
+                    continue
+                if resp.status_code not in RETRY_STATUS or last:
+                    break
+                delay = retry_delay(resp.headers, attempt, self.config.retry_cap)
+                logger.warning(f'HF returned {resp.status_code}, retrying in {delay:.1f} s')
+                time.sleep(delay)
+            logger.debug(f'headers: {resp.headers}')
+            if resp.status_code == 200:
+                data = resp.json()
+                json_dump(data, save_path, indent=2, codec=self.codec)
+                return RawPaperData(
+                    source=self.source,
+                    external_ids={'arxiv': arxiv_id},
+                    payload={'json_path': str(save_path),
+                             'data': data}
+                )
         except Exception as e:
             logger.error(f'HF Fetch Error: {e}')
         return None
@@ -1,52 +1,117 @@
 # coding=utf-8
+"""
+Fetch a paper from every source that knows it and cache what came back.
+
+The fetchers come from a `FetcherRegistry`: routing a paper to them only reads their
+specs, and each fetcher is imported and created on first use. The fetchers of a paper
+run on threads, each as soon as the outputs it needs from others are settled: the arXiv
+and Hugging Face metadata in parallel, the PDF once there is a title to name it after.
+"""
 import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 
 from pageleaf.commons.io.files import json_load, json_dump
-from pageleaf.fetchers.arxiv_meta import ArxivMetaFetcher
-from pageleaf.fetchers.arxiv_pdf import ArxivPdfFetcher
-from pageleaf.fetchers.base import BaseFetcher, RawPaperData, extract_arxiv_id
-from pageleaf.fetchers.huggingface import HuggingFacePaperFetcher
+from pageleaf.config.fetchers import FetcherConfig
+from pageleaf.fetchers.base import BaseFetcher, RawPaperData, extract_arxiv_id, record_version, relocate_payloads
+from pageleaf.fetchers.registry import FetcherRegistry, FetchPlan
 
 logger = logging.getLogger(__name__)
 
 
 class FetcherManager:
-    def __init__(self):
-        self.fetchers: list[BaseFetcher] = sorted([
-            ArxivMetaFetcher(),
-            HuggingFacePaperFetcher(),
-            ArxivPdfFetcher(),
-        ], key=lambda fetcher: fetcher.priority)
+    required_sources = ('arxiv_api', 'arxiv')
+
+    def __init__(self, config: FetcherConfig | None = None, registry: FetcherRegistry | None = None):
+        self.config = config or FetcherConfig.from_env()
+        self.codec = self.config.layout.codec(self.config.codec)
+        self.registry = registry or FetcherRegistry.default()
+        self._fetchers: dict[str, BaseFetcher] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def sources(self) -> list[str]:
+        return self.registry.sources()
+
+    def fetcher(self, source: str) -> BaseFetcher:
+        """The fetcher of `source`, imported and created on first use."""
+        fetcher = self._fetchers.get(source)
+        if fetcher is None:
+            with self._lock:
+                fetcher = self._fetchers.get(source)
+                if fetcher is None:
+                    fetcher = self._fetchers[source] = self.registry.specs[source].load()(self.config)
+        return fetcher
+
+    def fetched_path(self, arxiv_id: str) -> Path:
+        return self.config.layout.resolve('fetched', f'{arxiv_id}.json')
 
     def fetch(self, identifier: str) -> dict[str, RawPaperData]:
         arxiv_id = extract_arxiv_id(identifier)
         if arxiv_id is None:
             return {}
 
-        save_path = Path.home() / f'data/papers/fetched/{arxiv_id}.json'
-        save_path.parent.mkdir(parents=True, exist_ok=True)
+        save_path = self.fetched_path(arxiv_id)
         if save_path.exists():
             logger.info(f'Metadata File already exists: {save_path}, skipping download.')
-            return json_load(save_path)
+            return relocate_payloads(json_load(save_path))
+
+        results = self._run(self.registry.route(identifier), identifier)
 
-        results = {}
-        suggested_title = None
+        if not all(source in results for source in self.required_sources):
+            # not cached, so a source that failed is tried again next time; many papers are not on HF at all.
+            logger.warning(f'Incomplete fetch of {arxiv_id}: {sorted(results)}')
+            return results
+        json_dump({k: v.model_dump() for k, v in results.items()}, save_path, indent=2, codec=self.codec)
+        return results
 
-        for fetcher in self.fetchers:
-            if fetcher.can_handle(identifier):
-                if fetcher.source == 'arxiv' and suggested_title:
-                    raw = fetcher.fetch(identifier, suggested_title=suggested_title)
-                else:
-                    raw = fetcher.fetch(identifier)
+    def _run(self, plan: FetchPlan, identifier: str) -> dict[str, RawPaperData]:
+        """Run the fetchers of `plan`, each as soon as its inputs are settled; results in priority order."""
+        finished: dict[str, RawPaperData | None] = {}
+        pending = list(plan.specs)
+        with ThreadPoolExecutor(max_workers=max(len(pending), 1), thread_name_prefix='fetcher') as pool:
+            running = {}
+            while pending or running:
+                for spec in list(pending):
+                    inputs = plan.inputs(spec, finished)
+                    if inputs is not None:
+                        pending.remove(spec)
+                        running[pool.submit(self._fetch_one, spec.source, identifier, inputs)] = spec.source
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finished[running.pop(future)] = future.result()
+        return {spec.source: finished[spec.source] for spec in plan.specs if finished.get(spec.source)}
 
-                if raw:
-                    results[fetcher.source] = raw
-                    if not suggested_title and fetcher.source in {'arxiv_api', 'huggingface'}:
-                        suggested_title = raw.payload.get('data', {}).get('title')
-                        logger.debug(f'got title from {fetcher.source}')
+    def _fetch_one(self, source: str, identifier: str, inputs: dict) -> RawPaperData | None:
+        try:
+            fetcher = self.fetcher(source)
+            if not fetcher.can_handle(identifier):
+                return None
+            return fetcher.fetch_with(identifier, inputs)
+        except Exception as e:
+            logger.error(f'Fetcher {source} failed on {identifier}: {e}')
+            return None
 
-        json_dump({k: v.model_dump() for k, v in results.items()}, save_path, indent=2)
+    def refresh(self, arxiv_id: str, record: dict) -> dict[str, RawPaperData]:
+        """
+        Move a paper to the version of `record`, its current metadata from
+        `ArxivMetaFetcher.fetch_batch`: the PDF of that version is downloaded again and the
+        metadata replaced, what other sources returned before is kept.
+        """
+        save_path = self.fetched_path(arxiv_id)
+        cached = relocate_payloads(json_load(save_path)) if save_path.exists() else {}
+        results = {source: RawPaperData.model_validate(raw) for source, raw in cached.items()}
+        raw = self.fetcher('arxiv').fetch(arxiv_id, suggested_title=record.get('title'),
+                                          version=record_version(record), refresh=True)
+        if raw is None:
+            logger.warning(f'Failed to refresh {arxiv_id}, keeping the cached version')
+            return {}
+        results['arxiv'] = raw
+        results['arxiv_api'] = self.fetcher('arxiv_api').save(arxiv_id, record)
+        json_dump({k: v.model_dump() for k, v in results.items()}, save_path, indent=2, codec=self.codec)
         return results
 
 
@@ -0,0 +1,151 @@
+# coding=utf-8
+"""
+Which fetchers there are, and what each one needs from the others.
+
+A fetcher is registered with a `FetcherSpec`: its source name, its class as a
+"module:Class" path, a pattern of the identifiers it handles, and the outputs it needs
+from other fetchers and provides to them (the PDF fetcher names its file after the title
+the metadata fetchers provide). Routing an identifier only looks at the specs, so the
+module of a fetcher, and whatever it imports (the `arxiv` client for one), is loaded
+when a paper is first routed to it.
+
+The built-in fetchers are always registered. Other packages add theirs through the
+`pageleaf.fetchers` entry point group, each entry point naming a spec or a list of them:
+
+    [project.entry-points."pageleaf.fetchers"]
+    semantic_scholar = "pageleaf_s2.specs:SPEC"
+
+Loading an entry point imports its module, so specs should live apart from the fetcher.
+A plugin registering a source again replaces the built-in one.
+"""
+import importlib
+import logging
+import re
+from importlib.metadata import entry_points
+from typing import Any
+
+from pydantic import BaseModel
+
+from pageleaf.fetchers.base import BaseFetcher, RawPaperData
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = 'pageleaf.fetchers'
+ARXIV_PATTERN = r'\d{4}\.\d{5}(v\d+)?$'
+
+
+class FetcherSpec(BaseModel):
+    source: str
+    target: str  # "module:Class" of a `BaseFetcher` created with a `FetcherConfig`
+    pattern: str  # searched in an identifier, stripped of slashes and spaces
+    priority: int = 50  # lower runs first, and is asked first among providers of the same output
+    needs: list[str] = []  # outputs of other fetchers passed to `BaseFetcher.fetch_with`
+    provides: list[str] = []  # keys of `payload['data']` other fetchers may need
+
+    def handles(self, identifier: str) -> bool:
+        return re.search(self.pattern, (identifier or '').strip().strip('/')) is not None
+
+    def load(self) -> type[BaseFetcher]:
+        module, _, name = self.target.partition(':')
+        return getattr(importlib.import_module(module), name)
+
+
+BUILTIN_SPECS = [
+    FetcherSpec(source='arxiv_api', target='pageleaf.fetchers.arxiv_meta:ArxivMetaFetcher', pattern=ARXIV_PATTERN,
+                priority=9, provides=['title']),
+    FetcherSpec(source='huggingface', target='pageleaf.fetchers.huggingface:HuggingFacePaperFetcher',
+                pattern=ARXIV_PATTERN, priority=10, provides=['title']),
+    FetcherSpec(source='arxiv', target='pageleaf.fetchers.arxiv_pdf:ArxivPdfFetcher', pattern=ARXIV_PATTERN,
+                priority=100, needs=['title']),
+]
+
+
+def output_of(raw: RawPaperData | None, name: str) -> Any:
+    if raw is None or not isinstance(raw.payload, dict):
+        return None
+    data = raw.payload.get('data')
+    return data.get(name) if isinstance(data, dict) else None
+
+
+class FetchPlan:
+    """
+    The dependency graph of the fetchers routed for one paper: a fetcher depends on every
+    other one that provides an output it needs.
+    """
+
+    def __init__(self, specs: list[FetcherSpec]):
+        self.specs = sorted(specs, key=lambda spec: spec.priority)
+        self._check()
+
+    def providers(self, spec: FetcherSpec, need: str) -> list[FetcherSpec]:
+        """The other fetchers providing `need`, in priority order."""
+        return [other for other in self.specs if need in other.provides and other is not spec]
+
+    def depends_on(self, spec: FetcherSpec) -> set[str]:
+        return {provider.source for need in spec.needs for provider in self.providers(spec, need)}
+
+    def _check(self):
+        remaining = {spec.source: self.depends_on(spec) for spec in self.specs}
+        while remaining:
+            ready = [source for source, deps in remaining.items() if not deps & remaining.keys()]
+            if not ready:
+                raise ValueError(f'Fetchers depend on each other: {sorted(remaining)}')
+            for source in ready:
+                del remaining[source]
+
+    def inputs(self, spec: FetcherSpec, finished: dict[str, RawPaperData | None]) -> dict[str, Any] | None:
+        """
+        The inputs of `spec` once they are settled, None while it still waits for a provider.
+        A need is settled by the first provider, in priority order, that returned it; the
+        later providers are not waited for.
+        """
+        inputs = {}
+        for need in spec.needs:
+            value = None
+            for provider in self.providers(spec, need):
+                if provider.source not in finished:
+                    return None
+                value = output_of(finished[provider.source], need)
+                if value is not None:
+                    break
+            inputs[need] = value
+        return inputs
+
+
+def discover(group: str = ENTRY_POINT_GROUP) -> list[FetcherSpec]:
+    """The specs installed packages register through entry points."""
+    specs = []
+    for entry_point in entry_points(group=group):
+        try:
+            loaded = entry_point.load()
+        except Exception as e:
+            logger.error(f'Failed to load fetcher plugin {entry_point.name}: {e}')
+            continue
+        specs.extend(loaded if isinstance(loaded, (list, tuple)) else [loaded])
+    return specs
+
+
+class FetcherRegistry:
+    """
+    Usage:
+        registry = FetcherRegistry.default()
+        plan = registry.route('https://arxiv.org/abs/2501.00042')
+    """
+
+    def __init__(self, specs: list[FetcherSpec] | None = None):
+        self.specs: dict[str, FetcherSpec] = {}
+        for spec in specs or []:
+            self.register(spec)
+
+    @classmethod
+    def default(cls) -> 'FetcherRegistry':
+        return cls(BUILTIN_SPECS + discover())
+
+    def register(self, spec: FetcherSpec):
+        self.specs[spec.source] = spec
+
+    def sources(self) -> list[str]:
+        return [spec.source for spec in sorted(self.specs.values(), key=lambda spec: spec.priority)]
+
+    def route(self, identifier: str) -> FetchPlan:
+        return FetchPlan([spec for spec in self.specs.values() if spec.handles(identifier)])
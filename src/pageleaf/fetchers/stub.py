@@ -0,0 +1,322 @@
+# coding=utf-8
+"""
+Local stand-in for arXiv and Hugging Face, for tests, benchmarks and load tests.
+
+    GET /arxiv/api/query?id_list=...         arXiv API Atom feed
+    GET /arxiv/pdf/{arxiv id}                a small generated PDF
+    GET /hf/api/papers/{arxiv id}            HF paper JSON
+    GET /hf/api/daily_papers?date=&limit=&p= HF daily papers feed
+
+Any well-formed new-style arXiv ID exists; its metadata and PDF are derived from the ID,
+so every run serves the same content. Papers are at v1 until `StubServer.revise` adds a
+version, dated a week after the previous one. `StubFaults` injects what real servers do
+under load: latency with a long tail, a request rate limit, random 429s and bodies cut
+short. `stub_config` points a `FetcherConfig` at a running stub.
+"""
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape, quoteattr
+
+import fitz
+from pydantic import BaseModel
+
+from pageleaf.config.fetchers import FetcherConfig
+from pageleaf.config.paths import data_root
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8766
+WORDS = ('sparse attention long context retrieval agents reasoning benchmark diffusion tokenizer alignment '
+         'distillation mixture experts scaling multimodal vision language policy reward memory').split()
+CATEGORIES = ('cs.CL', 'cs.LG', 'cs.AI', 'cs.CV', 'stat.ML')
+_ARXIV_ID = re.compile(r'\d{2}(0[1-9]|1[0-2])\.\d{4,5}')
+
+
+def exists(arxiv_id: str) -> bool:
+    """Papers the stub knows about: new-style IDs of a real month."""
+    return _ARXIV_ID.fullmatch(arxiv_id) is not None
+
+
+class StubFaults(BaseModel):
+    latency_ms: float = 0.0  # added to every response
+    jitter_ms: float = 0.0  # mean of an exponential extra delay, the long tail
+    rate_limit: float = 0.0  # requests per second over all routes, 0 for no limit; excess gets 429
+    error_rate: float = 0.0  # share of requests answered 429 at random
+    truncate_rate: float = 0.0  # share of response bodies cut in half
+    retry_after: float = 1.0  # seconds, sent with every 429
+    seed: int = 0
+
+
+def stub_config(url: str, data_dir: str | Path, **kwargs) -> FetcherConfig:
+    """A fetcher configuration that sends every request to the stub server at `url`."""
+    url = url.rstrip('/')
+    return FetcherConfig(arxiv_api_url=f'{url}/arxiv/api/query', arxiv_pdf_url=f'{url}/arxiv/pdf',
+                         hf_api_url=f'{url}/hf/api', data_dir=Path(data_dir), **kwargs)
+
+
+def _rng(arxiv_id: str) -> random.Random:
+    return random.Random(hashlib.sha1(arxiv_id.encode('utf-8')).digest())
+
+
+def _published(arxiv_id: str) -> datetime:
+    yymm, number = arxiv_id.split('.')
+    day = 1 + int(number) % 28
+    return datetime(2000 + int(yymm[:2]), int(yymm[2:]), day, 17, 0, tzinfo=timezone.utc)
+
+
+def stub_paper(arxiv_id: str) -> dict:
+    """Metadata of a made-up paper, the same for an ID on every call."""
+    rng = _rng(arxiv_id)
+    words = [rng.choice(WORDS) for _ in range(6)]
+    categories = rng.sample(CATEGORIES, 2)
+    published = _published(arxiv_id)
+    return {
+        'id': arxiv_id,
+        'title': f'{" ".join(words).capitalize()} ({arxiv_id})',
+        'summary': ' '.join(rng.choice(WORDS) for _ in range(120)).capitalize() + '.',
+        'authors': [f'Author {rng.randint(1, 999)}' for _ in range(rng.randint(1, 6))],
+        'categories': categories,
+        'published': published,
+        'upvotes': int(rng.paretovariate(1.2) * 5),
+        'githubStars': rng.choice([None, rng.randint(0, 5000)]),
+    }
+
+
+def _updated(arxiv_id: str, version: int) -> datetime:
+    return _published(arxiv_id) + timedelta(days=7 * (version - 1))
+
+
+def arxiv_feed(arxiv_ids: list[str], versions: dict[str, int] | None = None, total: int | None = None) -> bytes:
+    """One page of the Atom feed, `total` results in all; papers not in `versions` are at v1."""
+    versions = versions or {}
+    entries = []
+    for arxiv_id in arxiv_ids:
+        paper = stub_paper(arxiv_id)
+        version = versions.get(arxiv_id, 1)
+        stamp = paper['published'].strftime('%Y-%m-%dT%H:%M:%SZ')
+        updated = _updated(arxiv_id, version).strftime('%Y-%m-%dT%H:%M:%SZ')
+        authors = ''.join(f'<author><name>{escape(name)}</name></author>' for name in paper['authors'])
+        categories = ''.join(f'<category term={quoteattr(c)} scheme="http://arxiv.org/schemas/atom"/>'
+                             for c in paper['categories'])
+        entries.append(
+            f'<entry><id>http://arxiv.org/abs/{arxiv_id}v{version}</id><updated>{updated}</updated>'
+            f'<published>{stamp}</published><title>{escape(paper["title"])}</title>'
+            f'<summary>{escape(paper["summary"])}</summary>{authors}'
+            f'<link href="http://arxiv.org/abs/{arxiv_id}v{version}" rel="alternate" type="text/html"/>'
+            f'<link title="pdf" href="http://arxiv.org/pdf/{arxiv_id}v{version}" rel="related" '
+            f'type="application/pdf"/>'
+            f'<arxiv:primary_category term={quoteattr(paper["categories"][0])}/>{categories}</entry>')
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:arxiv="http://arxiv.org/schemas/atom" '
+        'xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+        f'<opensearch:totalResults>{len(entries) if total is None else total}</opensearch:totalResults>'
+        '<opensearch:startIndex>0</opensearch:startIndex>'
+        f'<opensearch:itemsPerPage>{len(entries)}</opensearch:itemsPerPage>'
+        f'{"".join(entries)}</feed>'
+    ).encode('utf-8')
+
+
+@lru_cache(maxsize=256)
+def stub_pdf(arxiv_id: str, n_pages: int = 4, version: int = 1) -> bytes:
+    paper = stub_paper(arxiv_id)
+    doc = fitz.open()
+    for i in range(n_pages):
+        page = doc.new_page()
+        if i == 0:
+            page.insert_text((72, 72), paper['title'], fontsize=14)
+            if version > 1:
+                page.insert_text((72, 90), f'Revised version {version}', fontsize=10)
+        page.insert_textbox(fitz.Rect(72, 100, 540, 760), paper['summary'] * 3, fontsize=10)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def hf_paper(arxiv_id: str) -> dict:
+    paper = stub_paper(arxiv_id)
+    return {
+        'id': arxiv_id,
+        'title': paper['title'],
+        'summary': paper['summary'],
+        'authors': [{'name': name} for name in paper['authors']],
+        'publishedAt': paper['published'].isoformat(),
+        'upvotes': paper['upvotes'],
+        'ai_summary': paper['summary'][:200],
+        'ai_keywords': sorted(set(paper['title'].lower().split()[:4])),
+        'githubRepo': 'https://github.com/stub/repo' if paper['githubStars'] is not None else None,
+        'githubStars': paper['githubStars'],
+    }
+
+
+def daily_ids(day: date, n: int = 30) -> list[str]:
+    """The papers featured on `day`, numbered after the day so days never overlap."""
+    return [f'{day:%y%m}.{day.day * 1000 + i:05d}' for i in range(n)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server: 'StubServer'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        route, body, content_type = self._route(url.path, params)
+        self.server.count(route)
+
+        self.server.delay()
+        if self.server.throttled():
+            self.server.count('throttled')
+            self.send_response(429)
+            self.send_header('Retry-After', f'{self.server.faults.retry_after:g}')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if body is None:
+            self.server.count('not_found')
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.server.chance(self.server.faults.truncate_rate):
+            self.server.count('truncated')
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def _route(self, path: str, params: dict) -> tuple[str, bytes | None, str]:
+        if path == '/arxiv/api/query':
+            ids = [i for i in params.get('id_list', '').split(',') if exists(i)]
+            start = int(params.get('start', 0))
+            page = ids[start:start + int(params.get('max_results', len(ids)))]
+            return 'arxiv_api', arxiv_feed(page, self.server.versions, len(ids)), 'application/atom+xml'
+        if match := re.fullmatch(r'/arxiv/pdf/([^/]+)', path):
+            arxiv_id, _, version = match.group(1).partition('v')
+            version = int(version) if version else self.server.versions.get(arxiv_id, 1)
+            body = stub_pdf(arxiv_id, version=version) if exists(arxiv_id) else None
+            return 'arxiv_pdf', body, 'application/pdf'
+        if match := re.fullmatch(r'/hf/api/papers/([^/]+)', path):
+            arxiv_id = match.group(1)
+            body = hf_paper(arxiv_id) if exists(arxiv_id) else None
+            return 'hf_paper', self._json(body), 'application/json'
+        if path == '/hf/api/daily_papers':
+            limit, page = int(params.get('limit', 50)), int(params.get('p', 0))
+            ids = daily_ids(date.fromisoformat(params['date']))[page * limit:(page + 1) * limit]
+            items = [{'paper': hf_paper(i), 'title': stub_paper(i)['title']} for i in ids]
+            return 'hf_daily', self._json(items), 'application/json'
+        return 'unknown', None, ''
+
+    @staticmethod
+    def _json(data) -> bytes | None:
+        return json.dumps(data, default=str).encode('utf-8') if data is not None else None
+
+    def log_message(self, format, *args):
+        logger.debug(f'{self.address_string()} {format % args}')
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Usage:
+        with StubServer(faults=StubFaults(latency_ms=50, error_rate=0.05)) as stub:
+            manager = FetcherManager(stub_config(stub.url, tmp_dir))
+    """
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, faults: StubFaults | None = None, host: str = '127.0.0.1'):
+        super().__init__((host, port), StubHandler)
+        self.faults = faults or StubFaults()
+        self.stats: Counter[str] = Counter()
+        self.versions: dict[str, int] = {}  # latest version of revised papers
+        self._random = random.Random(self.faults.seed)
+        self._lock = threading.Lock()
+        self._tokens = self.faults.rate_limit
+        self._refilled = time.monotonic()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def revise(self, arxiv_id: str) -> int:
+        """Publish a new version of a paper, return its number."""
+        with self._lock:
+            self.versions[arxiv_id] = self.versions.get(arxiv_id, 1) + 1
+            return self.versions[arxiv_id]
+
+    def chance(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+    def delay(self):
+        faults = self.faults
+        seconds = faults.latency_ms / 1000
+        if faults.jitter_ms > 0:
+            with self._lock:
+                seconds += self._random.expovariate(1000 / faults.jitter_ms)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def throttled(self) -> bool:
+        """Token bucket of `rate_limit` requests per second, a second's worth of burst."""
+        if self.chance(self.faults.error_rate):
+            return True
+        rate = self.faults.rate_limit
+        if rate <= 0:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(rate, self._tokens + (now - self._refilled) * rate)
+            self._refilled = now
+            if self._tokens < 1:
+                return True
+            self._tokens -= 1
+            return False
+
+    def start(self) -> 'StubServer':
+        self._thread = threading.Thread(target=self.serve_forever, kwargs={'poll_interval': 0.05},
+                                        name='stub-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+if __name__ == '__main__':
+    with StubServer(DEFAULT_PORT, StubFaults(latency_ms=50, jitter_ms=50)) as stub:
+        print(f'stub on {stub.url}')
+        for name, value in stub_config(stub.url, data_root()).env().items():
+            print(f'export {name}={value}')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -1,26 +1,80 @@
 # coding=utf-8
 from pathlib import Path
+from uuid import uuid4
 
-from pageleaf.commons.io.files import json_load
-from pageleaf.fetchers.base import extract_arxiv_id
-from pageleaf.schemas.paper import Metadata, ExternalIdentifiers
+from pageleaf.commons.io.files import json_load, file_sha256
+from pageleaf.config.paths import locate
+from pageleaf.fetchers.base import extract_arxiv_id, record_version, relocate_payloads
+from pageleaf.schemas.paper import Metadata, Paper, PaperEntry, Content, PaperAnalysis, PaperRelations, PaperVersion
+from pageleaf.storage.documents import ParsedDocumentStore
+from pageleaf.storage.library import PaperLibrary
 
 
 class ArxivIngester:
-    def ingest(self, fetched_file: str | Path):
+    def __init__(self, library: PaperLibrary | None = None, documents: ParsedDocumentStore | None = None):
+        self.library = library
+        self.documents = documents
+
+    def ingest(self, fetched_file: str | Path) -> PaperEntry:
         fetched_file = Path(fetched_file)
-        if not fetched_file.exists():
+        # the data root may be migrating to sharded directories, files are followed to their shard.
+        found = fetched_file if fetched_file.exists() else locate(fetched_file.parent, fetched_file.name)
+        if found is None:
             raise FileNotFoundError(f'`fetched_file` not found: {fetched_file}')
 
-        fetched = json_load(fetched_file)
+        fetched = relocate_payloads(json_load(found))
         # arxiv metadata and pdf file
         required_sources = {'arxiv_api', 'arxiv'}
         missing_sources = required_sources - set(fetched.keys())
         if missing_sources:
             raise ValueError(f'Incomplete paper data, missing keys: {missing_sources}')
-        self._merge_data(fetched)
+        metadata = self._merge_data(fetched)
+        version = record_version(json_load(fetched['arxiv_api']['payload']['json_path']))
+        entry = self._to_entry(metadata, fetched['arxiv']['payload']['pdf_path'], version)
+        if self.library is not None:
+            self.library.save(entry)
+        return entry
+
+    @staticmethod
+    def _versions(existing: PaperEntry | None, current: PaperVersion) -> list[PaperVersion]:
+        """The version history with `current` added, unless it is the latest one already."""
+        versions = list(existing.versions) if existing is not None else []
+        if existing is not None and not versions and existing.paper.metadata.update_date is not None:
+            # ingested before versions were recorded.
+            versions.append(PaperVersion(updated=existing.paper.metadata.update_date, pdf_hash=existing.pdf_hash))
+        latest = versions[-1] if versions else None
+        if latest is not None and latest.updated == current.updated and latest.pdf_hash == current.pdf_hash:
+            return versions
+        return versions + [current]
+
+    def _to_entry(self, metadata: Metadata, pdf_file: str, version: int | None = None) -> PaperEntry:
+        outline, pdf_hash = None, None
+        if self.documents is not None and Path(pdf_file).exists():
+            pdf_hash = file_sha256(pdf_file)
+            doc = self.documents.load(pdf_file, pdf_hash)
+            outline = doc.outline.render() if doc.outline else None
+
+        content = {'abstract': metadata.abstract, 'outline': outline, 'keywords': metadata.hf_ai_keywords}
+        existing = self.library.find(arxiv=metadata.external_ids.arxiv) if self.library is not None else None
+        versions = self._versions(existing, PaperVersion(version=version, updated=metadata.update_date,
+                                                         pdf_hash=pdf_hash or (existing and existing.pdf_hash)))
+        if existing is not None:
+            # re-ingest: keep the internal id and everything the user added.
+            paper = existing.paper.model_copy(update={'identifiers': metadata.external_ids,
+                                                      'metadata': metadata,
+                                                      'content': existing.paper.content.model_copy(update=content)})
+            return existing.model_copy(update={'paper': paper, 'pdf_path': pdf_file,
+                                               'pdf_hash': pdf_hash or existing.pdf_hash, 'versions': versions})
 
-    def _merge_data(self, fetched):
+        paper = Paper(id=uuid4(),
+                      identifiers=metadata.external_ids,
+                      metadata=metadata,
+                      content=Content(**content),
+                      analysis=PaperAnalysis())
+        return PaperEntry(paper=paper, paper_relations=PaperRelations(), pdf_path=pdf_file, pdf_hash=pdf_hash,
+                          versions=versions)
+
+    def _merge_data(self, fetched) -> Metadata:
         arxiv_meta = json_load(fetched['arxiv_api']['payload']['json_path'])
         hf_data = None
         if 'huggingface' in fetched:
@@ -55,16 +109,14 @@ class ArxivIngester:
 
         ids = {
             'arxiv': arxiv_id,
-            'doi': arxiv_meta.get('doc') or None
+            'doi': arxiv_meta.get('doi') or None
         }
         metadata['external_ids'] = ids
 
-        metadata = Metadata.model_validate(metadata)
-
-        print(metadata.model_dump_json(indent=2))
-
+        return Metadata.model_validate(metadata)
 
 
 if __name__ == '__main__':
     ingester = ArxivIngester()
-    ingester.ingest('/Users/andersc/data/papers/fetched/2512.16301.json')
+    entry = ingester.ingest('/Users/andersc/data/papers/fetched/2512.16301.json')
+    print(entry.model_dump_json(indent=2))
@@ -0,0 +1,367 @@
+# coding=utf-8
+"""
+Bulk import of local PDF folders.
+
+Files are hashed and sniffed (arXiv ID and title from the first page only) in a process
+pool, checked against the library, and only new files are parsed in full. Besides exact
+matches (file hash, arXiv ID, title), the first page is compared with every paper in the
+library through a MinHash/LSH index, which catches camera-ready and renamed copies. A
+near match is vetoed when the two papers carry different arXiv IDs or DOIs, papers
+from one template look alike. A duplicate of a paper that has no PDF yet becomes that
+paper's PDF; a near match of a paper that has one is imported as a paper of its own,
+linked to the match in `PaperRelations.duplicates`, since it is only approximate. Every
+finished file is appended to a journal, so an interrupted import picks up where it stopped;
+files that failed are tried again on every run.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from uuid import UUID, uuid4
+
+import fitz
+import numpy as np
+from pydantic import BaseModel
+
+from pageleaf.commons.io.files import list_files, file_sha256
+from pageleaf.config.paths import data_path
+from pageleaf.engine.dedup import NearDuplicateIndex
+from pageleaf.engine.layout import flow_text
+from pageleaf.fetchers.base import extract_arxiv_id
+from pageleaf.schemas.io.pdf import PdfPage
+from pageleaf.schemas.paper import (Metadata, ExternalIdentifiers, Paper, PaperEntry, Content, PaperAnalysis,
+                                    PaperRelations)
+from pageleaf.storage.documents import ParsedDocumentStore
+from pageleaf.storage.library import PaperLibrary
+
+logger = logging.getLogger(__name__)
+
+_ARXIV_STAMP = re.compile(r'arXiv:(\d{4}\.\d{4,5})(v\d+)?')
+# a labelled DOI only, the first page may cite other papers.
+_DOI_STAMP = re.compile(r'\b(?:doi:\s*|doi\.org/)(10\.\d{4,9}/[^\s"<>]+)', re.IGNORECASE)
+_NOT_WORD = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_title(title: str) -> str:
+    return _NOT_WORD.sub(' ', title.lower()).strip()
+
+
+class FirstPageInfo(BaseModel):
+    pdf_path: str
+    pdf_hash: str
+    arxiv_id: str | None = None
+    doi: str | None = None
+    title: str | None = None
+    text: str = ''
+
+
+def sniff_pdf(pdf_file: str) -> FirstPageInfo:
+    """Hash a PDF and read its arXiv ID, DOI and title from the first page only. Runs in worker processes."""
+    pdf_hash = file_sha256(pdf_file)
+    arxiv_id, title, text = None, None, ''
+    with fitz.open(pdf_file) as doc:
+        if len(doc):
+            # text only, images are not decoded.
+            page = PdfPage.load(doc[0].get_text('dict', flags=fitz.TEXTFLAGS_TEXT), 1)
+            if page is not None:
+                text = '\n'.join(block.text for block in page.blocks if block.is_text())
+                title = _guess_title(page)
+    match = _ARXIV_STAMP.search(text) or _ARXIV_STAMP.search(Path(pdf_file).name)
+    if match:
+        arxiv_id = match.group(1)
+    else:
+        arxiv_id = extract_arxiv_id(Path(pdf_file).stem.split(' ')[0])
+    doi = _DOI_STAMP.search(text)
+    return FirstPageInfo(pdf_path=str(pdf_file), pdf_hash=pdf_hash, arxiv_id=arxiv_id,
+                         doi=doi.group(1).rstrip('.,;') if doi else None, title=title, text=text)
+
+
+def _guess_title(page: PdfPage) -> str | None:
+    """The lines set in the largest font in the top half of the page."""
+    lines = [line for block in page.blocks if block.is_text() for line in block.lines
+             if line.bbox and line.bbox[1] < page.height / 2 and (not line.dir or abs(line.dir[0]) > 0.5)]
+    lines = [line for line in lines if len(line.text.strip()) > 1]
+    if not lines:
+        return None
+    size = lambda line: max(span.font_size for span in line.spans)
+    largest = max(size(line) for line in lines)
+    title = ' '.join(line.text.strip() for line in lines if size(line) >= largest - 0.5)
+    return title[:300] or None
+
+
+def parse_pdf(pdf_file: str, pdf_hash: str, documents: ParsedDocumentStore) -> dict:
+    """Parse a PDF in full into the document store, return its outline and abstract. Runs in worker processes."""
+    # the importer's store itself, so workers write with its codec and reading order.
+    doc = documents.load(pdf_file, pdf_hash)
+    abstract = ''
+    if doc.outline is not None:
+        for section, start, end in doc.outline.spans():
+            if section.title.lower().startswith('abstract'):
+                texts = []
+                for page in doc.pages:
+                    for block_index, block in enumerate(page.blocks):
+                        anchor = (page.page_number, block_index)
+                        if block.is_text() and start[:2] <= anchor and (end is None or anchor < end[:2]):
+                            texts.append(flow_text(block))
+                abstract = '\n'.join(texts).removeprefix('Abstract').strip()
+                break
+    return {
+        'outline': doc.outline.render() if doc.outline else None,
+        'abstract': abstract,
+    }
+
+
+class ImportReport(BaseModel):
+    imported: int = 0
+    duplicates: int = 0
+    merged: int = 0  # duplicates that became the PDF of a library paper without one
+    linked: int = 0  # near duplicates imported as their own paper, linked to the match
+    failed: int = 0
+    skipped: int = 0  # done in an earlier, interrupted run
+
+
+class LocalPdfImporter:
+    def __init__(self,
+                 library: PaperLibrary,
+                 documents: ParsedDocumentStore,
+                 max_workers: int | None = None,
+                 journal_dir: str | Path | None = None,
+                 dedup_threshold: float | None = 0.5):
+        """
+        Args:
+            library: where new entries are saved.
+            documents: where parsed documents are cached.
+            max_workers: size of the process pool, 0 runs everything in the calling process.
+            journal_dir: where the per-directory import journals are kept.
+            dedup_threshold: estimated Jaccard similarity above which a file is a near-duplicate
+                of a library paper, None to only match exactly.
+        """
+        self.library = library
+        self.documents = documents
+        self.max_workers = os.cpu_count() if max_workers is None else max_workers
+        self.journal_dir = Path(journal_dir) if journal_dir else data_path('imports')
+        self.dedup_threshold = dedup_threshold
+
+    def journal_path(self, directory: Path) -> Path:
+        """One journal per imported directory."""
+        digest = hashlib.sha1(str(directory).encode('utf-8')).hexdigest()[:16]
+        return self.journal_dir / f'{digest}.jsonl'
+
+    def read_journal(self, journal: Path) -> dict[str, dict]:
+        done = {}
+        if journal.exists():
+            with journal.open('r', encoding='utf-8') as fin:
+                for line in fin:
+                    line = line.strip()
+                    if line:
+                        record = json.loads(line)
+                        done[record['path']] = record
+        return done
+
+    def run(self, directory: str | Path, pattern: str = '*.pdf', max_workers: int | None = None) -> ImportReport:
+        """Import the files of `directory` matching `pattern`, `max_workers` overrides the pool size if given."""
+        max_workers = self.max_workers if max_workers is None else max_workers
+        directory = Path(directory).expanduser().resolve()
+        journal = self.journal_path(directory)
+        journal.parent.mkdir(parents=True, exist_ok=True)
+        done = self.read_journal(journal)
+
+        report = ImportReport()
+        files = []
+        for path in list_files(directory, pattern):
+            stat = path.stat()
+            record = done.get(str(path))
+            # failures may be transient (a crashed worker, a full disk), they are tried again.
+            if (record and record['status'] != 'failed'
+                    and record['size'] == stat.st_size and record['mtime'] == stat.st_mtime_ns):
+                report.skipped += 1
+                continue
+            files.append(path)
+        logger.info(f'{len(files)} files to import, {report.skipped} done before.')
+        if not files:
+            return report
+
+        known_hashes, known_titles = set(), set()
+        near = NearDuplicateIndex(threshold=self.dedup_threshold) if self.dedup_threshold is not None else None
+        # (arXiv ID, DOI) of every key in `near`, and the library paper a key is or will be.
+        identities: dict[str, tuple[str | None, str | None]] = {}
+        paper_ids: dict[str, UUID] = {}
+        for entry in self.library:
+            if entry.pdf_hash:
+                known_hashes.add(entry.pdf_hash)
+            known_titles.add(normalize_title(entry.paper.metadata.title))
+            if near is not None:
+                key = str(entry.paper.id)
+                near.add(key, near.entry_signature(entry, self.documents))
+                identities[key] = (entry.paper.identifiers.arxiv, entry.paper.identifiers.doi)
+                paper_ids[key] = entry.paper.id
+
+        journal_file = journal.open('a', encoding='utf-8')
+
+        def record(path: Path, status: str, **fields):
+            stat = path.stat()
+            fields.update({'path': str(path), 'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'status': status})
+            journal_file.write(json.dumps(fields, ensure_ascii=False) + '\n')
+            journal_file.flush()
+
+        pool = ProcessPoolExecutor(max_workers=max_workers) if max_workers else None
+        try:
+            # stage 1: hash and sniff every file, cheap.
+            new, merges, links = [], {}, {}
+            for path, info, error in self._run_tasks(pool, sniff_pdf, {path: (str(path),) for path in files}):
+                if error is not None:
+                    logger.error(f'Failed to read {path}: {error}')
+                    record(path, 'failed', error=str(error))
+                    report.failed += 1
+                    continue
+
+                signature = near.signature(info.title or '', '', info.text) if near is not None else None
+                duplicate_of = self._find_duplicate(info, known_hashes, known_titles, near, signature, identities)
+                target = self._merge_target(duplicate_of) if duplicate_of else None
+                if target is not None:
+                    merges[path] = target
+                elif duplicate_of and duplicate_of.startswith('near:'):
+                    links[path] = paper_ids[duplicate_of[len('near:'):]]
+                elif duplicate_of:
+                    record(path, 'duplicate', pdf_hash=info.pdf_hash, duplicate_of=duplicate_of)
+                    report.duplicates += 1
+                    continue
+                known_hashes.add(info.pdf_hash)
+                if info.title:
+                    known_titles.add(normalize_title(info.title))
+                if near is not None:
+                    key = f'file:{info.pdf_path}'
+                    near.add(key, signature)
+                    identities[key] = (info.arxiv_id, info.doi)
+                    paper_ids[key] = merges[path].paper.id if path in merges else uuid4()
+                new.append(info)
+
+            # stage 2: full parse of new files only.
+            tasks = {Path(info.pdf_path): (info.pdf_path, info.pdf_hash, self.documents) for info in new}
+            infos = {Path(info.pdf_path): info for info in new}
+            for path, parsed, error in self._run_tasks(pool, parse_pdf, tasks):
+                if error is not None:
+                    logger.error(f'Failed to parse {path}: {error}')
+                    record(path, 'failed', error=str(error))
+                    report.failed += 1
+                    continue
+                info = infos[path]
+                if path in merges:
+                    entry = self._merge(merges[path], info, parsed)
+                    self.library.save(entry)
+                    record(path, 'merged', pdf_hash=info.pdf_hash, paper_id=str(entry.paper.id))
+                    report.merged += 1
+                    continue
+                paper_id = paper_ids.get(f'file:{info.pdf_path}') or uuid4()
+                entry = self._to_entry(info, parsed, paper_id)
+                self.library.save(entry)
+                if path in links:
+                    # both may be new papers, linked once both are saved.
+                    record(path, 'imported', pdf_hash=info.pdf_hash, paper_id=str(entry.paper.id),
+                           near_duplicate_of=str(links[path]))
+                    report.linked += 1
+                else:
+                    record(path, 'imported', pdf_hash=info.pdf_hash, paper_id=str(entry.paper.id))
+                    report.imported += 1
+
+            for path, target_id in links.items():
+                paper_id = paper_ids[f'file:{path}']
+                if self.library.get(paper_id) is not None and self.library.get(target_id) is not None:
+                    self._link(paper_id, target_id)
+                    self._link(target_id, paper_id)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            journal_file.close()
+
+        logger.info(f'import finished: {report}')
+        return report
+
+    @staticmethod
+    def _run_tasks(pool: ProcessPoolExecutor | None, fn, tasks: dict):
+        """Yield (key, result, error) as the tasks finish."""
+        if pool is None:
+            for key, args in tasks.items():
+                try:
+                    yield key, fn(*args), None
+                except Exception as e:
+                    yield key, None, e
+            return
+
+        futures = {pool.submit(fn, *args): key for key, args in tasks.items()}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+
+    def _find_duplicate(self,
+                        info: FirstPageInfo,
+                        known_hashes: set[str],
+                        known_titles: set[str],
+                        near: NearDuplicateIndex | None = None,
+                        signature: np.ndarray | None = None,
+                        identities: dict[str, tuple[str | None, str | None]] | None = None) -> str | None:
+        if info.pdf_hash in known_hashes:
+            return f'sha256:{info.pdf_hash}'
+        if info.arxiv_id and self.library.find(arxiv=info.arxiv_id):
+            return f'arxiv:{info.arxiv_id}'
+        if info.title and normalize_title(info.title) in known_titles:
+            return f'title:{normalize_title(info.title)}'
+        if near is not None:
+            identities = identities or {}
+            for match in near.query(signature):
+                arxiv_id, doi = identities.get(match.key, (None, None))
+                # alike, but two different papers.
+                if info.arxiv_id and arxiv_id and info.arxiv_id != arxiv_id:
+                    continue
+                if info.doi and doi and info.doi.lower() != doi.lower():
+                    continue
+                return f'near:{match.key}'
+        return None
+
+    def _merge_target(self, duplicate_of: str) -> PaperEntry | None:
+        """The library paper a duplicate should be the PDF of: one found by ID that has no PDF."""
+        kind, _, key = duplicate_of.partition(':')
+        if kind == 'arxiv':
+            entry = self.library.find(arxiv=key)
+        elif kind == 'near' and not key.startswith('file:'):
+            entry = self.library.get(key)
+        else:
+            return None
+        if entry is None or (entry.pdf_path and Path(entry.pdf_path).exists()):
+            return None
+        return entry
+
+    @staticmethod
+    def _merge(entry: PaperEntry, info: FirstPageInfo, parsed: dict) -> PaperEntry:
+        content = entry.paper.content
+        if not content.outline:
+            content = content.model_copy(update={'outline': parsed['outline']})
+        paper = entry.paper.model_copy(update={'content': content})
+        return entry.model_copy(update={'paper': paper, 'pdf_path': info.pdf_path, 'pdf_hash': info.pdf_hash})
+
+    def _link(self, paper_id: UUID, other: UUID):
+        entry = self.library.get(paper_id)
+        relations = entry.paper_relations or PaperRelations()
+        if other not in relations.duplicates:
+            entry.paper_relations = relations.model_copy(update={'duplicates': relations.duplicates + [other]})
+            self.library.save(entry)
+
+    def _to_entry(self, info: FirstPageInfo, parsed: dict, paper_id: UUID | None = None) -> PaperEntry:
+        ids = ExternalIdentifiers(arxiv=info.arxiv_id, doi=info.doi)
+        metadata = Metadata(title=info.title or Path(info.pdf_path).stem,
+                            abstract=parsed['abstract'],
+                            venue=None,
+                            paper_type=None,
+                            source='local',
+                            external_ids=ids)
+        paper = Paper(id=paper_id or uuid4(),
+                      identifiers=ids,
+                      metadata=metadata,
+                      content=Content(abstract=parsed['abstract'] or None, outline=parsed['outline']),
+                      analysis=PaperAnalysis())
+        return PaperEntry(paper=paper, paper_relations=PaperRelations(), pdf_path=info.pdf_path, pdf_hash=info.pdf_hash)
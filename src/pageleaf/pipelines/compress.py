@@ -0,0 +1,83 @@
+# coding=utf-8
+"""
+Compress a data root written before storage codecs, or re-encode it with another codec.
+
+The JSON caches of the fetchers (`arxiv/`, `hf/`, `fetched/`) train a dictionary from a
+sample of them first, then every file is rewritten in place with an atomic rename; the
+parsed documents are compressed one directory at a time. Readers go through `json_load`
+and the document store, which read old and new files alike, so this can run while
+pageleaf is in use. `codec='none'` turns everything back into plain files.
+"""
+import logging
+import os
+import random
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from pageleaf.commons.io.codecs import decode, read_bytes
+from pageleaf.config.paths import DataLayout, default_codec, SHARDED_SOURCES
+from pageleaf.storage.documents import ParsedDocumentStore
+
+logger = logging.getLogger(__name__)
+
+
+class CompressionReport(BaseModel):
+    codec: str
+    dictionary: str | None = None  # id of the dictionary trained for the JSON files
+    files: int = 0  # JSON files rewritten
+    bytes_before: int = 0  # of the JSON files
+    bytes_after: int = 0
+    documents: int = 0  # parsed documents rewritten
+
+    def render(self) -> str:
+        ratio = self.bytes_before / self.bytes_after if self.bytes_after else 0.0
+        return '\n'.join([f'codec: {self.codec}, dictionary: {self.dictionary or "-"}',
+                          f'json: {self.files} files rewritten, {self.bytes_before / 1e6:.1f} MB -> '
+                          f'{self.bytes_after / 1e6:.1f} MB ({ratio:.1f}x)',
+                          f'documents: {self.documents} rewritten'])
+
+
+def compress_data(root: str | Path | None = None,
+                  codec: str | None = None,
+                  train: bool = True,
+                  n_samples: int = 2000,
+                  documents_dir: str | Path | None = None) -> CompressionReport:
+    """
+    Args:
+        root: data root, PAGELEAF_DATA_ROOT or ~/data/papers if None.
+        codec: 'zlib', 'zstd' or 'none', PAGELEAF_CODEC if None.
+        train: train a new dictionary for the JSON files, else keep the current one.
+        n_samples: JSON files to train the dictionary on.
+        documents_dir: parsed document store, `{root}/parsed` if None.
+    """
+    layout = DataLayout(root)
+    codec = codec or default_codec()
+    report = CompressionReport(codec=codec)
+
+    files = sorted(path for source in SHARDED_SOURCES if layout.dir(source).is_dir()
+                   for path in layout.dir(source).rglob('*.json'))
+    if train and files and codec != 'none':
+        sample = random.Random(0).sample(files, min(n_samples, len(files)))
+        report.dictionary = f'{layout.train_dictionary([read_bytes(path) for path in sample], codec):08x}'
+    json_codec = layout.codec(codec)
+    if json_codec.dict_id and report.dictionary is None:
+        report.dictionary = f'{json_codec.dict_id:08x}'
+
+    for path in files:
+        data = path.read_bytes()
+        encoded = json_codec.encode(decode(data, path))
+        report.bytes_before += len(data)
+        report.bytes_after += len(encoded)
+        if encoded != data:
+            tmp_path = path.with_name(f'{path.name}.tmp')
+            tmp_path.write_bytes(encoded)
+            os.replace(tmp_path, path)
+            report.files += 1
+
+    documents = ParsedDocumentStore(documents_dir or layout.dir('parsed'), codec=codec)
+    for directory in sorted(documents.root.iterdir()) if documents.root.is_dir() else []:
+        if directory.is_dir() and documents.compress(directory.name):
+            report.documents += 1
+    logger.info(f'Compressed {layout.root}: {report.files} JSON files, {report.documents} documents')
+    return report
@@ -0,0 +1,108 @@
+# coding=utf-8
+"""
+Load test of `FetcherManager` against the bundled stub server (or any server with the
+same routes, see `fetchers.stub`).
+
+Made-up arXiv IDs are fetched by a pool of threads into a temporary data directory, each
+`FetcherManager.fetch` call is timed end to end, retries and back-off included, and the
+report gives throughput, tail latency, the sources that failed and what the stub did.
+"""
+import logging
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from pydantic import BaseModel
+
+from pageleaf.fetchers.manager import FetcherManager
+from pageleaf.fetchers.stub import StubFaults, StubServer, stub_config
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 90, 99)
+
+
+class LoadTestReport(BaseModel):
+    papers: int
+    concurrency: int
+    seconds: float
+    complete: int  # papers all sources were fetched for
+    failures: dict[str, int]  # source: papers it failed for
+    latency_ms: dict[str, float]
+    server: dict[str, int] = {}  # stub counters, empty for an external server
+
+    @property
+    def throughput(self) -> float:
+        return self.papers / self.seconds if self.seconds else 0.0
+
+    def render(self) -> str:
+        latency = ', '.join(f'{name} {ms:.0f}' for name, ms in self.latency_ms.items())
+        lines = [f'{self.papers} papers, {self.concurrency} threads, {self.seconds:.2f} s, '
+                 f'{self.throughput:.1f} papers/s',
+                 f'complete: {self.complete}, failed: {self.papers - self.complete}',
+                 f'latency ms: {latency}']
+        if self.failures:
+            lines.append('failures: ' + ', '.join(f'{source} {n}' for source, n in sorted(self.failures.items())))
+        if self.server:
+            lines.append('server: ' + ', '.join(f'{name} {n}' for name, n in sorted(self.server.items())))
+        return '\n'.join(lines)
+
+
+def paper_ids(n: int, month: str = '2501') -> list[str]:
+    return [f'{month}.{i:05d}' for i in range(1, n + 1)]
+
+
+def run_load_test(n_papers: int = 100,
+                  concurrency: int = 8,
+                  faults: StubFaults | None = None,
+                  base_url: str | None = None,
+                  data_dir: str | Path | None = None,
+                  max_retries: int = 3,
+                  retry_cap: float = 5.0) -> LoadTestReport:
+    """
+    Args:
+        faults: injected into the bundled stub server, which is started unless `base_url` is given.
+        base_url: a stub server that is already running, e.g. `pageleaf stub`.
+        data_dir: where fetched files go, a temporary directory if None; it should be empty.
+    """
+    with tempfile.TemporaryDirectory(prefix='pageleaf-loadtest-') as tmp_dir:
+        stub = StubServer(faults=faults).start() if base_url is None else None
+        try:
+            config = stub_config(stub.url if stub else base_url, data_dir or tmp_dir, max_retries=max_retries,
+                                 retry_cap=retry_cap, arxiv_delay_seconds=0.5, show_progress=False)
+            manager = FetcherManager(config)
+            sources = manager.sources
+
+            def fetch(arxiv_id: str) -> tuple[float, set[str]]:
+                start = time.perf_counter()
+                results = manager.fetch(arxiv_id)
+                return time.perf_counter() - start, set(results)
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(concurrency) as pool:
+                outcomes = list(pool.map(fetch, paper_ids(n_papers)))
+            seconds = time.perf_counter() - start
+        finally:
+            if stub is not None:
+                stub.stop()
+
+    latencies = np.array([elapsed for elapsed, _ in outcomes]) * 1000
+    latency_ms = {f'p{p}': float(v) for p, v in zip(PERCENTILES, np.percentile(latencies, PERCENTILES))}
+    latency_ms['max'] = float(latencies.max())
+    failures = {}
+    for source in sources:
+        n = sum(source not in fetched for _, fetched in outcomes)
+        if n:
+            failures[source] = n
+    return LoadTestReport(papers=n_papers, concurrency=concurrency, seconds=seconds,
+                          complete=sum(len(fetched) == len(sources) for _, fetched in outcomes),
+                          failures=failures, latency_ms=latency_ms,
+                          server=dict(stub.stats) if stub is not None else {})
+
+
+if __name__ == '__main__':
+    report = run_load_test(200, 16, StubFaults(latency_ms=30, jitter_ms=40, rate_limit=200, error_rate=0.02,
+                                               truncate_rate=0.02, retry_after=0.2))
+    print(report.render())
@@ -0,0 +1,146 @@
+# coding=utf-8
+"""
+Profile the parse and store path of one PDF.
+
+The PDF is parsed and stored into a throw-away document store three times:
+  1. with the stage wrappers and a stack sampler, for exclusive time per stage and
+     folded stacks (flamegraph.pl, speedscope);
+  2. with tracemalloc on, for the peak memory of each stage;
+  3. under cProfile, for the functions that dominate.
+Timings of the first pass are not skewed by tracing memory or by cProfile hooks.
+"""
+import cProfile
+import io
+import logging
+import pstats
+import tempfile
+import time
+from pathlib import Path
+
+import fitz
+from pydantic import BaseModel
+
+from pageleaf.commons.io.files import file_sha256
+from pageleaf.commons.profiling import StackSampler, StageProfiler
+from pageleaf.engine import layout
+from pageleaf.schemas.io import pdf
+from pageleaf.storage import documents, text_store
+from pageleaf.storage.documents import ParsedDocumentStore
+from pageleaf.storage.library import PaperLibrary
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('get_text', 'validate', 'images', 'text', 'layout', 'outline', 'store')
+
+
+class StageReport(BaseModel):
+    stage: str
+    calls: int
+    ms: float
+    share: float  # of the total wall time
+    peak_mb: float | None = None
+
+
+class ProfileReport(BaseModel):
+    pdf_file: str
+    pages: int
+    total_ms: float
+    stages: list[StageReport]
+    top_functions: str = ''
+    folded: str = ''
+
+    def render(self) -> str:
+        lines = [f'{self.pdf_file}: {self.pages} pages, {self.total_ms:.1f} ms',
+                 f'{"stage":<10} {"calls":>8} {"ms":>10} {"%":>6} {"peak MB":>8}']
+        for s in self.stages:
+            peak = f'{s.peak_mb:.2f}' if s.peak_mb is not None else '-'
+            lines.append(f'{s.stage:<10} {s.calls:>8} {s.ms:>10.1f} {s.share:>6.1%} {peak:>8}')
+        if self.top_functions:
+            lines.extend(['', self.top_functions.rstrip()])
+        return '\n'.join(lines)
+
+
+def stage_profiler() -> StageProfiler:
+    """The hot spots of `ParsedDocumentStore.load`, each attributed to a stage."""
+    profiler = StageProfiler()
+    profiler.add(fitz.Page, 'get_text', 'get_text')
+    profiler.add(pdf, 'rename_keys', 'validate')
+    profiler.add(BaseModel, 'model_validate', 'validate')
+    profiler.add(pdf, 'save_image_block', 'images')
+    profiler.add(layout, 'flow_text', 'text')
+    profiler.add(text_store, 'flow_text', 'text')
+    profiler.add(pdf.PdfLine, 'text', 'text')
+    profiler.add(pdf.TextBlock, 'text', 'text')
+    profiler.add(layout.LayoutAnalyzer, 'reorder', 'layout')
+    profiler.add(documents, 'build_outline', 'outline')
+    profiler.add(ParsedDocumentStore, 'put', 'store')
+    return profiler
+
+
+def resolve_pdf(target: str, library: PaperLibrary | None = None) -> Path:
+    """A PDF path, or the local PDF of a library paper given by arXiv id or library id."""
+    path = Path(target).expanduser()
+    if path.is_file():
+        return path
+    library = library if library is not None else PaperLibrary()
+    entry = library.find(arxiv=target) or library.get(target)
+    if entry is None:
+        raise FileNotFoundError(f'no such file or paper: {target}')
+    if not entry.pdf_path or not Path(entry.pdf_path).is_file():
+        raise FileNotFoundError(f'no local PDF for {target}')
+    return Path(entry.pdf_path)
+
+
+def _parse(pdf_file: Path, pdf_hash: str) -> int:
+    with tempfile.TemporaryDirectory(prefix='pageleaf-profile-') as root:
+        store = ParsedDocumentStore(root)
+        doc = store.parse(pdf_file, pdf_hash)
+        store.put(pdf_hash, doc)
+        return len(doc.pages)
+
+
+def profile_pdf(pdf_file: str | Path,
+                memory: bool = True,
+                top: int = 20,
+                sample_interval: float = 0.001,
+                pstats_file: str | Path | None = None) -> ProfileReport:
+    pdf_file = Path(pdf_file)
+    pdf_hash = file_sha256(pdf_file)
+
+    timing = stage_profiler()
+    with timing.active(), StackSampler(sample_interval) as sampler:
+        start = time.perf_counter()
+        pages = _parse(pdf_file, pdf_hash)
+        total = time.perf_counter() - start
+
+    peaks = {}
+    if memory:
+        tracing = stage_profiler()
+        with tracing.active(memory=True):
+            _parse(pdf_file, pdf_hash)
+        peaks = {stage: stats.peak_bytes / 2 ** 20 for stage, stats in tracing.stats.items()}
+
+    profile = cProfile.Profile()
+    profile.runcall(_parse, pdf_file, pdf_hash)
+    if pstats_file:
+        profile.dump_stats(pstats_file)
+    out = io.StringIO()
+    pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(top)
+
+    stages = []
+    for stage in STAGES:
+        stats = timing.stats.get(stage)
+        if stats is None:
+            continue
+        stages.append(StageReport(stage=stage, calls=stats.calls, ms=stats.seconds * 1000,
+                                  share=stats.seconds / total, peak_mb=peaks.get(stage)))
+    other = total - sum(stats.seconds for stats in timing.stats.values())
+    stages.append(StageReport(stage='other', calls=1, ms=other * 1000, share=other / total))
+    return ProfileReport(pdf_file=str(pdf_file), pages=pages, total_ms=total * 1000, stages=stages,
+                         top_functions=out.getvalue(), folded=sampler.folded())
+
+
+if __name__ == '__main__':
+    import sys
+
+    print(profile_pdf(resolve_pdf(sys.argv[1]), top=15).render())
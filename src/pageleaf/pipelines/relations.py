@@ -0,0 +1,160 @@
+# coding=utf-8
+import logging
+from pathlib import Path
+from uuid import UUID
+
+from pageleaf.config.paths import data_path
+from pageleaf.engine.citations import CitationGraph, CitationGraphBuilder, extract_references
+from pageleaf.engine.dedup import NearDuplicateIndex
+from pageleaf.engine.similarity import SimilarityIndex
+from pageleaf.schemas.paper import PaperEntry, PaperRelations
+from pageleaf.storage.documents import ParsedDocumentStore
+from pageleaf.storage.library import PaperLibrary
+
+logger = logging.getLogger(__name__)
+
+
+def similarity_fields(entry: PaperEntry) -> list[tuple[str, float]]:
+    """Weighted text fields of a paper, title and keywords count more than the abstract."""
+    metadata = entry.paper.metadata
+    return [
+        (metadata.title, 2.0),
+        (metadata.abstract, 1.0),
+        (' . '.join(metadata.hf_ai_keywords), 2.0),
+    ]
+
+
+def index_library(library: PaperLibrary, index: SimilarityIndex, refresh: bool = False) -> int:
+    """Add library papers missing from the index (or all of them with `refresh`)."""
+    items = ((entry.paper.id, similarity_fields(entry))
+             for entry in library if refresh or entry.paper.id not in index)
+    added = index.add(items)
+    logger.info(f'{added} papers indexed, {len(index)} in total.')
+    return added
+
+
+def update_related(library: PaperLibrary,
+                   index: SimilarityIndex,
+                   k: int = 10,
+                   min_score: float = 0.1) -> int:
+    """Fill `PaperRelations.related` of every library paper with its most similar papers."""
+    index_library(library, index)
+
+    updated = 0
+    for paper_id, neighbours in index.most_similar(k=k):
+        entry = library.get(paper_id)
+        if entry is None:
+            continue
+        related = [UUID(other) for other, score in neighbours if score >= min_score and other in library]
+        relations = entry.paper_relations or PaperRelations()
+        if relations.related == related:
+            continue
+        entry.paper_relations = relations.model_copy(update={'related': related})
+        library.save(entry)
+        updated += 1
+
+    logger.info(f'related papers updated: {updated}')
+    return updated
+
+
+def find_duplicates(library: PaperLibrary,
+                    documents: ParsedDocumentStore | None = None,
+                    threshold: float = 0.5) -> list[tuple[UUID, UUID, float]]:
+    """Near-duplicate pairs of library papers, most similar first."""
+    index = NearDuplicateIndex(threshold=threshold)
+    index.add_entries(library, documents)
+    pairs = [(UUID(a), UUID(b), similarity) for a, b, similarity in index.pairs()]
+    return sorted(pairs, key=lambda pair: -pair[2])
+
+
+def update_duplicates(library: PaperLibrary,
+                      documents: ParsedDocumentStore | None = None,
+                      threshold: float = 0.5) -> int:
+    """Link near-duplicate papers both ways in `PaperRelations.duplicates`, return the entries changed."""
+    duplicates: dict[UUID, set[UUID]] = {}
+    for a, b, _ in find_duplicates(library, documents, threshold):
+        duplicates.setdefault(a, set()).add(b)
+        duplicates.setdefault(b, set()).add(a)
+
+    updated = 0
+    for paper_id, others in duplicates.items():
+        entry = library.get(paper_id)
+        relations = entry.paper_relations or PaperRelations()
+        linked = sorted(set(relations.duplicates) | others, key=str)
+        if linked == relations.duplicates:
+            continue
+        entry.paper_relations = relations.model_copy(update={'duplicates': linked})
+        library.save(entry)
+        updated += 1
+
+    logger.info(f'duplicate links updated: {updated}')
+    return updated
+
+
+def node_keys(entry: PaperEntry) -> list[str]:
+    """Citation graph keys of a library paper, the first one is its node."""
+    ids = entry.paper.identifiers
+    keys = []
+    if ids.arxiv:
+        keys.append(f'arxiv:{ids.arxiv}')
+    if ids.doi:
+        keys.append(f'doi:{ids.doi.lower()}')
+    keys.append(f'paper:{entry.paper.id}')
+    return keys
+
+
+def build_citation_graph(library: PaperLibrary, documents: ParsedDocumentStore) -> CitationGraph:
+    """Extract the references of every library paper with a local PDF and link them."""
+    entries = list(library)
+    # any identifier of a library paper resolves to that paper's node.
+    aliases = {}
+    for entry in entries:
+        keys = node_keys(entry)
+        for key in keys:
+            aliases[key] = keys[0]
+
+    builder = CitationGraphBuilder()
+    for entry in entries:
+        citing = node_keys(entry)[0]
+        builder.add_node(citing)
+        if not entry.pdf_path or not Path(entry.pdf_path).exists():
+            continue
+        # the known hash spares hashing the PDF to find its parsed document.
+        doc = documents.load(entry.pdf_path, entry.pdf_hash)
+        references = extract_references(doc)
+        for reference in references:
+            # a reference may carry both ids, either one can point into the library.
+            keys = [f'arxiv:{reference.arxiv}' if reference.arxiv else None,
+                    f'doi:{reference.doi.lower()}' if reference.doi else None]
+            cited = next((aliases[key] for key in keys if key in aliases), reference.key)
+            if cited:
+                builder.add_edge(citing, cited)
+        logger.debug(f'{citing}: {len(references)} references')
+
+    graph = builder.build()
+    logger.info(f'citation graph: {graph.n_nodes} nodes, {graph.n_edges} edges')
+    return graph
+
+
+def update_citations(library: PaperLibrary,
+                     documents: ParsedDocumentStore,
+                     graph_file: str | Path | None = None) -> CitationGraph:
+    """Fill `PaperRelations.cites` / `cited_by` with the library papers on either side of each edge."""
+    graph = build_citation_graph(library, documents)
+    graph_file = Path(graph_file) if graph_file else data_path('index', 'citations.npz')
+    graph.save(graph_file)
+
+    paper_ids = {}
+    for entry in library:
+        paper_ids[graph.node(node_keys(entry)[0])] = entry.paper.id
+
+    for node, paper_id in paper_ids.items():
+        entry = library.get(paper_id)
+        cites = [paper_ids[other] for other in graph.cites(node).tolist() if other in paper_ids]
+        cited_by = [paper_ids[other] for other in graph.cited_by(node).tolist() if other in paper_ids]
+        relations = entry.paper_relations or PaperRelations()
+        if relations.cites == cites and relations.cited_by == cited_by:
+            continue
+        entry.paper_relations = relations.model_copy(update={'cites': cites, 'cited_by': cited_by})
+        library.save(entry)
+    return graph
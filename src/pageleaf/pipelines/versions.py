@@ -0,0 +1,101 @@
+# coding=utf-8
+"""
+Keep the arXiv papers of the library at their latest version.
+
+The fetcher caches never expire, so a paper fetched at v1 stays at v1. `watch_versions`
+asks the arXiv API about the whole library in batched `id_list` queries, a few hundred
+papers per request, and compares the `updated` stamp of each paper with the stored
+one. Only papers with a new version are downloaded, parsed and ingested again; the
+ingester adds the version to `PaperEntry.versions`. Papers imported from local PDFs
+are left alone, their files are the user's.
+"""
+import logging
+import math
+import time
+from datetime import datetime
+
+from pydantic import BaseModel
+
+from pageleaf.fetchers.manager import FetcherManager
+from pageleaf.ingest.arxiv_ingesters import ArxivIngester
+from pageleaf.schemas.paper import PaperEntry
+from pageleaf.storage.documents import ParsedDocumentStore
+from pageleaf.storage.library import PaperLibrary
+
+logger = logging.getLogger(__name__)
+
+
+class VersionReport(BaseModel):
+    papers: int = 0  # arXiv papers in the library
+    requests: int = 0  # arXiv API metadata requests
+    unchanged: int = 0
+    updated: list[str] = []  # arXiv ids of the papers at a new version
+    missing: list[str] = []  # not in the API responses
+    failed: list[str] = []  # a new version that could not be fetched or ingested
+    seconds: float = 0.0
+
+    def render(self) -> str:
+        lines = [f'{self.papers} papers checked with {self.requests} requests in {self.seconds:.1f} s: '
+                 f'{self.unchanged} unchanged, {len(self.updated)} updated, {len(self.missing)} missing, '
+                 f'{len(self.failed)} failed']
+        lines.extend(f'  updated {arxiv_id}' for arxiv_id in self.updated)
+        lines.extend(f'  failed {arxiv_id}' for arxiv_id in self.failed)
+        return '\n'.join(lines)
+
+
+def _stored_update(entry: PaperEntry) -> datetime | None:
+    if entry.versions and entry.versions[-1].updated is not None:
+        return entry.versions[-1].updated
+    return entry.paper.metadata.update_date
+
+
+def watch_versions(library: PaperLibrary | None = None,
+                   fetchers: FetcherManager | None = None,
+                   documents: ParsedDocumentStore | None = None,
+                   batch_size: int | None = None,
+                   dry_run: bool = False) -> VersionReport:
+    """
+    Args:
+        library: the library to check, the default library if None.
+        fetchers: where metadata and PDFs come from.
+        documents: the parsed document store new versions are parsed into.
+        batch_size: papers per API request, `FetcherConfig.arxiv_batch_size` if None.
+        dry_run: only report the papers with a new version.
+    """
+    started = time.perf_counter()
+    library = library if library is not None else PaperLibrary()
+    fetchers = fetchers or FetcherManager()
+    ingester = ArxivIngester(library, documents if documents is not None else ParsedDocumentStore())
+    meta = fetchers.fetcher('arxiv_api')
+    batch_size = batch_size or fetchers.config.arxiv_batch_size
+
+    entries = {entry.paper.identifiers.arxiv: entry for entry in library
+               if entry.paper.identifiers.arxiv and entry.paper.metadata.source == 'arxiv'}
+    report = VersionReport(papers=len(entries), requests=math.ceil(len(entries) / batch_size))
+    records = meta.fetch_batch(sorted(entries), batch_size)
+
+    for arxiv_id, entry in sorted(entries.items()):
+        record = records.get(arxiv_id)
+        if record is None:
+            report.missing.append(arxiv_id)
+            continue
+        stored = _stored_update(entry)
+        updated = datetime.fromisoformat(record['updated']) if record.get('updated') else None
+        if stored is not None and (updated is None or updated <= stored):
+            report.unchanged += 1
+            continue
+        if dry_run:
+            report.updated.append(arxiv_id)
+            continue
+        try:
+            if not fetchers.refresh(arxiv_id, record):
+                raise RuntimeError('download failed')
+            ingester.ingest(fetchers.fetched_path(arxiv_id))
+            report.updated.append(arxiv_id)
+        except Exception as e:
+            logger.error(f'Failed to update {arxiv_id}: {e}')
+            report.failed.append(arxiv_id)
+
+    report.seconds = time.perf_counter() - started
+    logger.info(f'Checked {report.papers} papers: {len(report.updated)} updated, {len(report.failed)} failed')
+    return report
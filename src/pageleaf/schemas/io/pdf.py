@@ -1,9 +1,10 @@
 # coding=utf-8
 import logging
 from pathlib import Path
+from typing import Annotated, Iterator, Literal
 
 import fitz
-from pydantic import BaseModel, PrivateAttr, Field
+from pydantic import BaseModel, ConfigDict, PrivateAttr, Field
 
 from pageleaf.commons.iterable import rename_keys
 
@@ -200,7 +201,7 @@ class PdfBlock(BaseModel):
 
 
 class TextBlock(PdfBlock):
-    type: int = 0
+    type: Literal[0] = 0
 
     flags: int
 
@@ -230,7 +231,9 @@ class TextBlock(PdfBlock):
 
 
 class ImageBlock(PdfBlock):
-    type: int = 1
+    model_config = ConfigDict(ser_json_bytes='base64', val_json_bytes='base64')
+
+    type: Literal[1] = 1
 
     # width and height of original image.
     width: int
@@ -269,12 +272,16 @@ class ImageBlock(PdfBlock):
     #     return self.image_path is not None
 
 
+# `type` tells text and image blocks apart when a parsed document is loaded back from JSON.
+AnyBlock = Annotated[TextBlock | ImageBlock, Field(discriminator='type')]
+
+
 class PdfPage(BaseModel):
     page_number: int
 
     height: float
     width: float
-    blocks: list[PdfBlock]
+    blocks: list[AnyBlock]
 
     object_type: str = 'page'
 
@@ -291,17 +298,109 @@ class PdfPage(BaseModel):
         return cls.model_validate(data)
 
 
+class TableCell(BaseModel):
+    row: int
+    col: int
+    bbox: tuple[float, float, float, float]
+    text: str
+
+
+class PdfTable(BaseModel):
+    page_number: int
+    bbox: tuple[float, float, float, float]
+    n_rows: int
+    n_cols: int
+    header: list[str] = Field(default_factory=list)
+    caption: str | None = None
+    # row-major, cells spanned by a merged cell are left out.
+    cells: list[TableCell] = Field(default_factory=list)
+
+    object_type: str = 'table'
+
+    def rows(self) -> list[list[str]]:
+        rows = [[''] * self.n_cols for _ in range(self.n_rows)]
+        for cell in self.cells:
+            rows[cell.row][cell.col] = cell.text
+        return rows
+
+    def to_markdown(self) -> str:
+        rows = [[text.replace('\n', ' ').replace('|', '\\|') for text in row] for row in self.rows()]
+        if not rows:
+            return ''
+        lines = ['| ' + ' | '.join(rows[0]) + ' |', '|' + '---|' * self.n_cols]
+        lines.extend('| ' + ' | '.join(row) + ' |' for row in rows[1:])
+        return '\n'.join(lines)
+
+
+class OutlineSection(BaseModel):
+    title: str
+    level: int  # 1 for sections, 2 for subsections, ...
+
+    # anchor of the heading line, block_index is the index in `PdfPage.blocks`.
+    page_number: int
+    block_index: int
+    line_index: int = 0
+
+    font_size: float
+    children: list['OutlineSection'] = Field(default_factory=list)
+
+    @property
+    def anchor(self) -> tuple[int, int, int]:
+        return self.page_number, self.block_index, self.line_index
+
+
+class DocumentOutline(BaseModel):
+    sections: list[OutlineSection] = Field(default_factory=list)
+    body_font_size: float | None = None
+
+    def flatten(self) -> list[OutlineSection]:
+        """All sections in document order."""
+        flat = []
+        stack = list(reversed(self.sections))
+        while stack:
+            section = stack.pop()
+            flat.append(section)
+            stack.extend(reversed(section.children))
+        return flat
+
+    def find(self, title: str) -> OutlineSection | None:
+        """Find the first section whose title contains `title` (case-insensitive)."""
+        title = title.lower()
+        for section in self.flatten():
+            if title in section.title.lower():
+                return section
+        return None
+
+    def spans(self) -> list[tuple[OutlineSection, tuple[int, int, int], tuple[int, int, int] | None]]:
+        """
+        (section, start, end) for all sections in document order, `end` is the anchor of the next
+        section of the same or a higher level (exclusive), or None for the end of the document.
+        """
+        flat = self.flatten()
+        result = []
+        for i, section in enumerate(flat):
+            end = next((other.anchor for other in flat[i + 1:] if other.level <= section.level), None)
+            result.append((section, section.anchor, end))
+        return result
+
+    def render(self) -> str:
+        """Indented plain text, as stored in `Content.outline`."""
+        return '\n'.join(f'{"  " * (section.level - 1)}{section.title}' for section in self.flatten())
+
+
 class PdfDocument(BaseModel):
     pages: list[PdfPage]
+    outline: DocumentOutline | None = None
 
     object_type: str = 'document'
 
     @classmethod
-    def load_file(cls,
+    def iter_file(cls,
                   file_path: str,
                   image_dir: str | Path | None = None,
-                  n_pages: int = None):
-
+                  n_pages: int = None,
+                  flags: int | None = None) -> Iterator[PdfPage]:
+        """Yield the pages of a PDF one at a time, a page is only parsed when it is asked for."""
         if n_pages is not None and n_pages < 1:
             raise ValueError(f'Number of pages should be a positive integer.')
 
@@ -309,22 +408,26 @@ class PdfDocument(BaseModel):
             image_dir = Path(image_dir)
             image_dir.mkdir(parents=True, exist_ok=True)
 
-        pages = []
         try:
             with fitz.open(file_path) as doc:
                 for page in doc:
                     page_number = page.number + 1
                     if n_pages is not None and page_number > n_pages:
                         break
-                    page_obj = page.get_text('dict')
+                    page_obj = page.get_text('dict') if flags is None else page.get_text('dict', flags=flags)
                     page_loaded = PdfPage.load(page_obj, page_number, image_dir)
                     if page_loaded is None:
                         continue
-                    pages.append(page_loaded)
+                    yield page_loaded
         except Exception as e:
             logger.error(f'Error loading {file_path}: {e}')
 
-        return cls(pages=pages)
+    @classmethod
+    def load_file(cls,
+                  file_path: str,
+                  image_dir: str | Path | None = None,
+                  n_pages: int = None):
+        return cls(pages=list(cls.iter_file(file_path, image_dir, n_pages)))
 
 
 if __name__ == '__main__':
@@ -1,5 +1,5 @@
 # coding=utf-8
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
 from uuid import UUID
 
@@ -88,6 +88,7 @@ class PaperRelations(BaseModel):
     cited_by: list[UUID] = []
     based_on: list[UUID] = []
     related: list[UUID] = []
+    duplicates: list[UUID] = []  # the same work under another identity, see `engine.dedup`
 
 
 class PaperEngagement(BaseModel):
@@ -101,11 +102,23 @@ class PaperEngagement(BaseModel):
     notes: list[str] = Field(default_factory=list, description="用户笔记的内部ID列表 (未来可关联)")
 
 
+class PaperVersion(BaseModel):
+    """An arXiv version of a paper as it was ingested."""
+    version: int | None = None  # None if ingested before versions were recorded
+    updated: datetime | None = None  # `updated` of the arXiv metadata
+    pdf_hash: str | None = None  # the parsed document of this version
+    seen_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
 class PaperEntry(BaseModel):
     paper: Paper
     paper_relations: PaperRelations | None = None
     engagement: PaperEngagement | None = None
 
+    pdf_path: str | None = None  # local PDF file
+    pdf_hash: str | None = None  # SHA-256 of the PDF, key of the parsed document
+    versions: list[PaperVersion] = []  # oldest first, see `pipelines.versions`
+
 
 if __name__ == '__main__':
     pass
@@ -0,0 +1,87 @@
+# coding=utf-8
+"""
+Thin client of a running `pageleaf serve` daemon.
+
+Only the standard library is imported, so a CLI command served by the daemon does not
+pay for importing PyMuPDF, pydantic models or the fetchers.
+"""
+import json
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from pageleaf.config.paths import data_path
+
+
+class DaemonError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(f'{status}: {message}')
+        self.status = status
+
+
+class PageleafClient:
+    def __init__(self, url: str, token: str = '', timeout: float = 30.0):
+        self.url = url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+
+    @classmethod
+    def discover(cls, state_file: str | Path | None = None, timeout: float = 30.0) -> 'PageleafClient | None':
+        """A client of the running daemon, None if there is none."""
+        state_file = Path(state_file) if state_file else data_path('serve.json')
+        try:
+            state = json.loads(state_file.read_text(encoding='utf-8'))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        client = cls(state['url'], state.get('token', ''), timeout)
+        try:
+            client._request('GET', '/health', timeout=0.5)
+        except (OSError, DaemonError):
+            return None
+        return client
+
+    def _request(self, method: str, path: str, body: dict | None = None, timeout: float | None = None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(self.url + path, data=data, method=method,
+                                         headers={'Content-Type': 'application/json', 'X-Pageleaf-Token': self.token})
+        try:
+            with urllib.request.urlopen(request, timeout=timeout or self.timeout) as resp:
+                return json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get('error', e.reason)
+            except ValueError:
+                message = e.reason
+            raise DaemonError(e.code, message) from None
+
+    def _get_or_none(self, path: str) -> dict | None:
+        try:
+            return self._request('GET', path)
+        except DaemonError as e:
+            if e.status == 404:
+                return None
+            raise
+
+    def health(self) -> dict:
+        return self._request('GET', '/health')
+
+    def paper(self, paper_id: str) -> dict | None:
+        return self._get_or_none(f'/papers/{paper_id}')
+
+    def page_text(self, paper_id: str, page_number: int) -> str | None:
+        result = self._get_or_none(f'/papers/{paper_id}/pages/{page_number}')
+        return result['text'] if result else None
+
+    def find_arxiv(self, arxiv_id: str) -> dict | None:
+        return self._get_or_none(f'/arxiv/{arxiv_id}')
+
+    def query(self, **params) -> dict:
+        return self._request('POST', '/query', params)
+
+    def ingest(self, ids: list[str]) -> dict:
+        return self._request('POST', '/ingest', {'ids': ids})
+
+    def import_dir(self, path: str | Path, pattern: str = '*.pdf', workers: int | None = None) -> dict:
+        """`workers` overrides the daemon's import pool size for this import."""
+        return self._request('POST', '/import', {'path': str(Path(path).resolve()), 'pattern': pattern,
+                                                 'workers': workers})
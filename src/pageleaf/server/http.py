@@ -0,0 +1,204 @@
+# coding=utf-8
+"""
+Loopback JSON API of `pageleaf serve`.
+
+    GET  /health                        daemon status
+    GET  /papers/{id}                   library entry
+    GET  /papers/{id}/pages/{n}         page text of the parsed PDF
+    GET  /arxiv/{arxiv id}              library entry by arXiv ID
+    POST /query                         metadata query, body: `query_rows` keyword arguments
+    POST /ingest                        {"ids": [...]}, fetch and ingest arXiv papers
+    POST /import                        {"path": ..., "pattern": "*.pdf", "workers": null}, import a local folder
+
+The address of a running daemon is written to `serve.json` so clients can find it, with
+a random token only the user can read (mode 0600). Every request must carry the token in
+`X-Pageleaf-Token` and a loopback `Host`, and POST bodies must be `application/json`: a
+web page can neither send the token in a cross-site form nor reach the API by rebinding
+a DNS name to 127.0.0.1.
+"""
+import hmac
+import json
+import logging
+import os
+import re
+import secrets
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from pageleaf.config.paths import data_path
+from pageleaf.engine.metadata_index import QUERY_FILTERS
+from pageleaf.server.service import PageleafService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+QUERY_OPTIONS = ('sort_by', 'descending', 'limit', 'facets')
+TOKEN_HEADER = 'X-Pageleaf-Token'
+LOOPBACK_HOSTS = ('127.0.0.1', 'localhost', '::1')
+
+
+def state_file() -> Path:
+    return data_path('serve.json')
+
+
+class ApiError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server: 'ApiServer'
+    protocol_version = 'HTTP/1.1'
+
+    GET_ROUTES = [
+        (re.compile(r'^/health$'), 'health'),
+        (re.compile(r'^/papers/([0-9a-f\-]{36})$'), 'paper'),
+        (re.compile(r'^/papers/([0-9a-f\-]{36})/pages/(\d+)$'), 'page'),
+        (re.compile(r'^/arxiv/([^/]+)$'), 'arxiv'),
+    ]
+    POST_ROUTES = {'/query': 'query', '/ingest': 'ingest', '/import': 'import_dir'}
+
+    def _refuse(self) -> bool:
+        """Send an error and return True unless the request may use the API."""
+        host = (self.headers.get('Host') or '').strip()
+        host = host[1:].partition(']')[0] if host.startswith('[') else host.rpartition(':')[0] or host
+        if host.lower() not in LOOPBACK_HOSTS:
+            self._send(HTTPStatus.FORBIDDEN, {'error': f'host not allowed: {host}'})
+            return True
+        if not hmac.compare_digest(self.headers.get(TOKEN_HEADER) or '', self.server.token):
+            self._send(HTTPStatus.UNAUTHORIZED, {'error': f'missing or wrong {TOKEN_HEADER}'})
+            return True
+        if self.command == 'POST':
+            content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+            if content_type != 'application/json':
+                self._send(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, {'error': 'body must be application/json'})
+                return True
+        return False
+
+    def do_GET(self):
+        if self._refuse():
+            return
+        for pattern, name in self.GET_ROUTES:
+            match = pattern.match(self.path.split('?')[0])
+            if match:
+                self._dispatch(getattr(self, f'get_{name}'), *match.groups())
+                return
+        self._send(HTTPStatus.NOT_FOUND, {'error': f'no route: {self.path}'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if self._refuse():
+            # drain the body, the connection is kept alive.
+            self.rfile.read(length)
+            return
+        name = self.POST_ROUTES.get(self.path)
+        if name is None:
+            self.rfile.read(length)
+            self._send(HTTPStatus.NOT_FOUND, {'error': f'no route: {self.path}'})
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except json.JSONDecodeError as e:
+            self._send(HTTPStatus.BAD_REQUEST, {'error': f'invalid JSON: {e}'})
+            return
+        self._dispatch(getattr(self, f'post_{name}'), body)
+
+    def _dispatch(self, handler, *args):
+        try:
+            self._send(HTTPStatus.OK, handler(*args))
+        except ApiError as e:
+            self._send(e.status, {'error': str(e)})
+        except (ValueError, TypeError) as e:
+            self._send(HTTPStatus.BAD_REQUEST, {'error': str(e)})
+        except Exception as e:
+            logger.exception(f'{self.command} {self.path} failed')
+            self._send(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)})
+
+    def _send(self, status: HTTPStatus, payload):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    # -- routes
+
+    @property
+    def service(self) -> PageleafService:
+        return self.server.service
+
+    def get_health(self):
+        return {'status': 'ok', 'pid': os.getpid(), 'papers': len(self.service.library)}
+
+    def get_paper(self, paper_id: str):
+        entry = self.service.entry(paper_id)
+        if entry is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f'no paper: {paper_id}')
+        return entry.model_dump_json().encode('utf-8')
+
+    def get_page(self, paper_id: str, page_number: str):
+        text = self.service.page_text(paper_id, int(page_number))
+        if text is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f'no text for page {page_number} of {paper_id}')
+        return {'text': text}
+
+    def get_arxiv(self, arxiv_id: str):
+        entry = self.service.find(arxiv_id)
+        if entry is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f'no paper: arxiv {arxiv_id}')
+        return entry.model_dump_json().encode('utf-8')
+
+    def post_query(self, body: dict):
+        unknown = set(body) - set(QUERY_FILTERS) - set(QUERY_OPTIONS)
+        if unknown:
+            raise ValueError(f'unknown query parameters: {", ".join(sorted(unknown))}')
+        return self.service.query(**body)
+
+    def post_ingest(self, body: dict):
+        return self.service.ingest_ids(list(body.get('ids') or []))
+
+    def post_import_dir(self, body: dict):
+        path = Path(body.get('path') or '')
+        if not path.is_dir():
+            raise ValueError(f'not a directory: {path}')
+        workers = body.get('workers')
+        if workers is not None and (not isinstance(workers, int) or workers < 0):
+            raise ValueError(f'workers must be a count >= 0: {workers!r}')
+        return self.service.import_dir(path, body.get('pattern') or '*.pdf', workers=workers)
+
+
+class ApiServer(ThreadingHTTPServer):
+    def __init__(self, service: PageleafService, host: str = '127.0.0.1', port: int = DEFAULT_PORT):
+        # loopback only, the token keeps out other users' pages, not other machines.
+        if host not in LOOPBACK_HOSTS:
+            raise ValueError(f'Refusing to listen on a non-loopback address: {host}')
+        super().__init__((host, port), ApiHandler)
+        self.service = service
+        self.token = secrets.token_urlsafe(32)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def write_state(self, path: Path | None = None):
+        path = path or state_file()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.fchmod(fd, 0o600)  # an existing file keeps its mode otherwise
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'url': self.url, 'pid': os.getpid(), 'token': self.token}, f)
+
+    def remove_state(self, path: Path | None = None):
+        path = path or state_file()
+        try:
+            if json.loads(path.read_text(encoding='utf-8')).get('pid') == os.getpid():
+                path.unlink()
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
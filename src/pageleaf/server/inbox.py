@@ -0,0 +1,129 @@
+# coding=utf-8
+"""
+Inbox watcher: PDFs and ID lists dropped into the inbox directory are ingested in the
+background.
+
+    {inbox}/*.pdf     imported with `LocalPdfImporter`
+    {inbox}/*.txt     arXiv IDs or URLs, one per line, fetched and ingested
+    {inbox}/done/     processed files, the PDFs of imported papers stay here
+                      (ID lists get a `.result.json`)
+    {inbox}/failed/   files that could not be processed
+
+A file is picked up once its size and mtime are unchanged over one poll, so files still
+being copied in are left alone.
+"""
+import json
+import logging
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from pageleaf.config.paths import data_path
+from pageleaf.server.service import PageleafService
+
+logger = logging.getLogger(__name__)
+
+
+class InboxWatcher:
+    def __init__(self, service: PageleafService, inbox: str | Path | None = None, interval: float = 2.0):
+        self.service = service
+        self.inbox = Path(inbox) if inbox else data_path('inbox')
+        self.interval = interval
+        self._seen: dict[Path, tuple[int, int]] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        for name in ('done', 'failed', 'batches'):
+            (self.inbox / name).mkdir(parents=True, exist_ok=True)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='inbox-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        logger.info(f'watching inbox: {self.inbox}')
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f'Inbox poll failed: {e}')
+
+    def stable_files(self) -> list[Path]:
+        """Files unchanged since the previous poll."""
+        stable, seen = [], {}
+        for path in self.inbox.iterdir():
+            if not path.is_file() or path.suffix.lower() not in ('.pdf', '.txt'):
+                continue
+            stat = path.stat()
+            seen[path] = (stat.st_size, stat.st_mtime_ns)
+            if self._seen.get(path) == seen[path]:
+                stable.append(path)
+        self._seen = seen
+        return sorted(stable)
+
+    def _move(self, path: Path, folder: str) -> Path:
+        target = self.inbox / folder / path.name
+        if target.exists():
+            target = target.with_name(f'{path.stem}-{time.time_ns()}{path.suffix}')
+        shutil.move(path, target)
+        self._seen.pop(path, None)
+        return target
+
+    def poll(self) -> int:
+        """Process the stable files of the inbox, return how many were handled."""
+        files = self.stable_files()
+        pdfs = [path for path in files if path.suffix.lower() == '.pdf']
+        if pdfs:
+            self._import_pdfs(pdfs)
+        for path in files:
+            if path.suffix.lower() == '.txt':
+                self._ingest_ids(path)
+        return len(files)
+
+    def _import_pdfs(self, pdfs: list[Path]):
+        batch = self.inbox / 'batches' / str(time.time_ns())
+        batch.mkdir(parents=True)
+        importer = self.service.importer
+        journal = importer.journal_path(batch.resolve())
+        records, imported = {}, {}
+        try:
+            for path in pdfs:
+                shutil.move(path, batch / path.name)
+                self._seen.pop(path, None)
+            # thumbnails are rendered from done/, once the files are there.
+            self.service.import_dir(batch, prefetch=False)
+            records = importer.read_journal(journal)
+        except Exception as e:
+            logger.error(f'Failed to import {len(pdfs)} inbox PDFs: {e}')
+        finally:
+            # a PDF the journal does not mark as imported goes to failed/, even if the import broke off.
+            for path in sorted(batch.iterdir()):
+                record = records.get(str(path.resolve()), {})
+                status = record.get('status', 'failed')
+                target = self._move(path, 'failed' if status == 'failed' else 'done')
+                if status in ('imported', 'merged'):
+                    imported[record['paper_id']] = target
+            shutil.rmtree(batch, ignore_errors=True)
+            # batch directories are never imported again.
+            journal.unlink(missing_ok=True)
+        # entries were saved with the PDF in the batch directory.
+        for paper_id, target in imported.items():
+            try:
+                self.service.move_pdf(paper_id, target)
+            except Exception as e:
+                logger.error(f'Failed to point {paper_id} at {target}: {e}')
+        self.service.prefetch(list(imported.values()))
+
+    def _ingest_ids(self, path: Path):
+        identifiers = [line.strip() for line in path.read_text(encoding='utf-8').splitlines()
+                       if line.strip() and not line.startswith('#')]
+        result = self.service.ingest_ids(identifiers)
+        target = self._move(path, 'failed' if identifiers and len(result['failed']) == len(identifiers) else 'done')
+        target.with_name(target.stem + '.result.json').write_text(json.dumps(result, indent=2), encoding='utf-8')
+        logger.info(f'{path.name}: {len(result["ingested"])} ingested, {len(result["known"])} known, '
+                    f'{len(result["failed"])} failed')
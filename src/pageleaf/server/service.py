@@ -0,0 +1,237 @@
+# coding=utf-8
+"""
+The state `pageleaf serve` keeps warm between requests: the library and its lookup
+maps, the metadata index, recently used parsed documents and page text stores, and the
+fetchers. Every API call is a method here; the HTTP layer only decodes and encodes JSON.
+Thumbnails of the first pages of new papers are rendered in the background.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from uuid import UUID
+
+from pageleaf.engine.metadata_index import MetadataIndex, query_rows
+from pageleaf.engine.render import PageRenderer
+from pageleaf.fetchers.base import extract_arxiv_id
+from pageleaf.fetchers.manager import FetcherManager
+from pageleaf.ingest.arxiv_ingesters import ArxivIngester
+from pageleaf.ingest.local_ingesters import LocalPdfImporter
+from pageleaf.schemas.io.pdf import PdfDocument
+from pageleaf.schemas.paper import PaperEntry
+from pageleaf.storage.documents import ParsedDocumentStore
+from pageleaf.storage.library import PaperLibrary
+from pageleaf.storage.text_store import PageText
+
+logger = logging.getLogger(__name__)
+
+
+class PageleafService:
+    def __init__(self,
+                 library: PaperLibrary | None = None,
+                 documents: ParsedDocumentStore | None = None,
+                 index_dir: str | Path | None = None,
+                 max_documents: int = 32,
+                 import_workers: int | None = None,
+                 renderer: PageRenderer | None = None,
+                 prefetch_pages: int = 3):
+        self.library = library if library is not None else PaperLibrary()
+        self.documents = documents if documents is not None else ParsedDocumentStore()
+        self.index_dir = index_dir
+        self.fetchers = FetcherManager()
+        self.ingester = ArxivIngester(self.library, self.documents)
+        self.importer = LocalPdfImporter(self.library, self.documents, max_workers=import_workers)
+        self.max_documents = max_documents
+        self.renderer = renderer if renderer is not None else PageRenderer()
+        self.prefetch_pages = prefetch_pages
+        # one thread, renders of a batch already spread over the renderer's process pool.
+        self._prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch')
+
+        self._index: MetadataIndex | None = None
+        self._entries: dict[str, tuple[int, PaperEntry]] = {}
+        self._docs: OrderedDict[str, PdfDocument] = OrderedDict()
+        self._texts: OrderedDict[str, PageText] = OrderedDict()
+        # requests reading each text store; an evicted store is closed by its last reader.
+        self._text_users: dict[PageText, int] = {}
+        self._retired: set[PageText] = set()
+        # reads go through caches that tolerate races, anything writing the library is serialized.
+        self._write_lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+
+    def close(self):
+        self._prefetcher.shutdown(cancel_futures=True)
+        self.renderer.close()
+        with self._cache_lock:
+            for text in self._texts.values():
+                text.close()
+            self._texts.clear()
+            self._docs.clear()
+
+    # -- reads
+
+    @property
+    def index(self) -> MetadataIndex:
+        index = self._index
+        if index is None or not index.is_current(self.library):
+            with self._index_lock:
+                index = self._index = MetadataIndex.open(self.library, self.index_dir)
+        return index
+
+    def entry(self, paper_id: str | UUID) -> PaperEntry | None:
+        """A library entry, re-read only when its file changed."""
+        path = self.library.path_for(paper_id)
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._entries.pop(str(paper_id), None)
+            return None
+        cached = self._entries.get(str(paper_id))
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        entry = PaperEntry.model_validate_json(path.read_bytes())
+        self._entries[str(paper_id)] = (mtime, entry)
+        return entry
+
+    def find(self, arxiv_id: str) -> PaperEntry | None:
+        return self.library.find(arxiv=arxiv_id)
+
+    def query(self, **params) -> dict:
+        return query_rows(self.index, **params)
+
+    def _lru_get(self, cache: OrderedDict, key: str, load):
+        with self._cache_lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+        value = load()
+        if value is None:
+            return None
+        with self._cache_lock:
+            cache[key] = value
+            while len(cache) > self.max_documents:
+                cache.popitem(last=False)
+        return value
+
+    def _open_text(self, pdf_hash: str) -> PageText | None:
+        """The text store of `pdf_hash`, held until `_release_text`."""
+        with self._cache_lock:
+            text = self._texts.get(pdf_hash)
+            if text is not None:
+                self._texts.move_to_end(pdf_hash)
+                self._text_users[text] = self._text_users.get(text, 0) + 1
+                return text
+        loaded = self.documents.open_text(pdf_hash)
+        if loaded is None:
+            return None
+        with self._cache_lock:
+            text = self._texts.get(pdf_hash)
+            if text is None:
+                text = self._texts[pdf_hash] = loaded
+                while len(self._texts) > self.max_documents:
+                    _, evicted = self._texts.popitem(last=False)
+                    if self._text_users.get(evicted):
+                        self._retired.add(evicted)
+                    else:
+                        evicted.close()
+            else:
+                # another request opened it first.
+                self._texts.move_to_end(pdf_hash)
+                loaded.close()
+            self._text_users[text] = self._text_users.get(text, 0) + 1
+        return text
+
+    def _release_text(self, text: PageText):
+        with self._cache_lock:
+            users = self._text_users.pop(text) - 1
+            if users:
+                self._text_users[text] = users
+            elif text in self._retired:
+                self._retired.discard(text)
+                text.close()
+
+    def document(self, paper_id: str) -> PdfDocument | None:
+        entry = self.entry(paper_id)
+        if entry is None or not entry.pdf_hash:
+            return None
+        return self._lru_get(self._docs, entry.pdf_hash, lambda: self.documents.get(entry.pdf_hash))
+
+    def page_text(self, paper_id: str, page_number: int) -> str | None:
+        entry = self.entry(paper_id)
+        if entry is None or not entry.pdf_hash:
+            return None
+        text = self._open_text(entry.pdf_hash)
+        if text is None:
+            return None
+        try:
+            return text.page_text(page_number)
+        except KeyError:
+            return None
+        finally:
+            self._release_text(text)
+
+    # -- writes
+
+    def prefetch(self, pdf_files: list[str | Path]) -> Future | None:
+        """Render thumbnails of the first pages of `pdf_files` in the background."""
+        if not pdf_files or not self.prefetch_pages:
+            return None
+        return self._prefetcher.submit(self._prefetch, [str(pdf_file) for pdf_file in pdf_files])
+
+    def _prefetch(self, pdf_files: list[str]) -> int:
+        try:
+            return self.renderer.prefetch(pdf_files, self.prefetch_pages)
+        except Exception as e:
+            logger.error(f'Failed to prefetch thumbnails of {len(pdf_files)} PDFs: {e}')
+            return 0
+
+    def ingest_ids(self, identifiers: list[str]) -> dict:
+        """Fetch and ingest arXiv papers, already known papers are skipped."""
+        result = {'ingested': [], 'known': [], 'failed': []}
+        pdf_files = []
+        for identifier in identifiers:
+            arxiv_id = extract_arxiv_id(identifier.strip())
+            if arxiv_id is None:
+                result['failed'].append(identifier)
+                continue
+            existing = self.library.find(arxiv=arxiv_id)
+            if existing is not None:
+                result['known'].append(str(existing.paper.id))
+                continue
+            with self._write_lock:
+                try:
+                    self.fetchers.fetch(arxiv_id)
+                    entry = self.ingester.ingest(self.fetchers.fetched_path(arxiv_id))
+                    result['ingested'].append(str(entry.paper.id))
+                    if entry.pdf_path:
+                        pdf_files.append(entry.pdf_path)
+                except Exception as e:
+                    logger.error(f'Failed to ingest {arxiv_id}: {e}')
+                    result['failed'].append(identifier)
+        self.prefetch(pdf_files)
+        return result
+
+    def move_pdf(self, paper_id: str, pdf_path: str | Path):
+        """Point a library entry at its PDF moved to `pdf_path`."""
+        with self._write_lock:
+            entry = self.library.get(paper_id)
+            if entry is not None:
+                self.library.save(entry.model_copy(update={'pdf_path': str(pdf_path)}))
+
+    def import_dir(self, directory: str | Path, pattern: str = '*.pdf', prefetch: bool = True,
+                   workers: int | None = None) -> dict:
+        """
+        Import the PDFs of a directory, with `workers` processes instead of `import_workers` if
+        given. Thumbnails of the imported ones are prefetched unless `prefetch` is False, e.g.
+        when the files are about to be moved.
+        """
+        journal = self.importer.journal_path(Path(directory).expanduser().resolve())
+        with self._write_lock:
+            before = self.importer.read_journal(journal)
+            report = self.importer.run(directory, pattern, max_workers=workers)
+            after = self.importer.read_journal(journal)
+        if prefetch:
+            self.prefetch([path for path, record in after.items()
+                           if record['status'] in ('imported', 'merged') and before.get(path) != record])
+        return report.model_dump()
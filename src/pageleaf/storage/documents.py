@@ -0,0 +1,144 @@
+# coding=utf-8
+import logging
+import os
+from pathlib import Path
+
+import fitz
+from pydantic import TypeAdapter
+
+from pageleaf.commons.io.codecs import decode, read_bytes, StorageCodec
+from pageleaf.commons.io.files import file_sha256
+from pageleaf.config.paths import data_path, default_codec
+from pageleaf.engine.layout import LayoutAnalyzer
+from pageleaf.engine.outline import build_outline
+from pageleaf.engine.tables import PageTables, TableExtractor
+from pageleaf.schemas.io.pdf import PdfDocument
+from pageleaf.storage.text_store import INDEX_FILE, PageText, recode_text, write_page_text
+
+logger = logging.getLogger(__name__)
+
+_PAGE_TABLES = TypeAdapter(list[PageTables])
+
+
+class ParsedDocumentStore:
+    """
+    Parsed `PdfDocument`s keyed by the SHA-256 of the PDF file.
+
+    Documents are stored in reading order together with their outline, so readers never
+    re-open the PDF. Each document gets its own directory:
+        {root}/{pdf_hash}/document.json
+        {root}/{pdf_hash}/text.utf8 or text.utf8z, text.idx   page text store, see `storage.text_store`
+        {root}/{pdf_hash}/images/
+        {root}/{pdf_hash}/tables.json   tables by page, for the pages examined so far
+    `document.json` and long texts are compressed with `codec` (PAGELEAF_CODEC by default).
+    """
+
+    def __init__(self, root: str | Path | None = None, reading_order: bool = True, codec: str | None = None,
+                 tables: TableExtractor | None = None):
+        self.root = Path(root) if root else data_path('parsed')
+        self.reading_order = reading_order
+        self.tables = tables or TableExtractor()
+        # documents are large enough to compress well without a dictionary.
+        self.codec = StorageCodec(codec or default_codec())
+        self.analyzer = LayoutAnalyzer()
+
+    def doc_dir(self, pdf_hash: str) -> Path:
+        return self.root / pdf_hash
+
+    def document_path(self, pdf_hash: str) -> Path:
+        return self.doc_dir(pdf_hash) / 'document.json'
+
+    def exists(self, pdf_hash: str) -> bool:
+        return self.document_path(pdf_hash).exists()
+
+    def get(self, pdf_hash: str) -> PdfDocument | None:
+        path = self.document_path(pdf_hash)
+        if not path.exists():
+            return None
+        return PdfDocument.model_validate_json(read_bytes(path))
+
+    def put(self, pdf_hash: str, doc: PdfDocument):
+        path = self.document_path(pdf_hash)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_bytes(self.codec.encode(doc.model_dump_json().encode('utf-8')))
+        os.replace(tmp_path, path)
+        write_page_text(doc, path.parent, self.codec)
+
+    def compress(self, pdf_hash: str) -> bool:
+        """Rewrite a stored document with `codec`, e.g. one stored before compression; False if unchanged."""
+        path = self.document_path(pdf_hash)
+        if not path.exists():
+            return False
+        changed = False
+        for path in [path, self.tables_path(pdf_hash)]:
+            if not path.exists():
+                continue
+            data = path.read_bytes()
+            encoded = self.codec.encode(decode(data, path))
+            if encoded != data:
+                tmp_path = path.with_suffix('.tmp')
+                tmp_path.write_bytes(encoded)
+                os.replace(tmp_path, path)
+                changed = True
+        return recode_text(path.parent, self.codec) or changed
+
+    def open_text(self, pdf_hash: str) -> PageText | None:
+        """Memory-mapped page text of a parsed document, without loading the document itself."""
+        if not (self.doc_dir(pdf_hash) / INDEX_FILE).exists():
+            return None
+        return PageText(self.doc_dir(pdf_hash))
+
+    def tables_path(self, pdf_hash: str) -> Path:
+        return self.doc_dir(pdf_hash) / 'tables.json'
+
+    def get_tables(self, pdf_hash: str) -> dict[int, PageTables]:
+        """The cached tables of a document by page number, only pages examined before."""
+        path = self.tables_path(pdf_hash)
+        if not path.exists():
+            return {}
+        return {page.page_number: page for page in _PAGE_TABLES.validate_json(read_bytes(path))}
+
+    def load_tables(self,
+                    pdf_file: str | Path,
+                    pdf_hash: str | None = None,
+                    pages: list[int] | None = None,
+                    refresh: bool = False) -> dict[int, PageTables]:
+        """
+        Tables of `pages` (all pages if None) of `pdf_file`, by page number. Pages not
+        examined before are pre-checked, detected if they pass and added to the cache.
+        """
+        pdf_hash = pdf_hash or file_sha256(pdf_file)
+        cached = {} if refresh else self.get_tables(pdf_hash)
+        with fitz.open(pdf_file) as pdf:
+            wanted = [n for n in (pages or range(1, pdf.page_count + 1)) if 1 <= n <= pdf.page_count]
+            missing = [n for n in wanted if n not in cached]
+            if missing:
+                parsed = {page.page_number: page for page in self.load(pdf_file, pdf_hash).pages}
+                cached.update(self.tables.extract(pdf, parsed, missing))
+                path = self.tables_path(pdf_hash)
+                tmp_path = path.with_suffix('.tmp')
+                tmp_path.write_bytes(self.codec.encode(_PAGE_TABLES.dump_json(sorted(
+                    cached.values(), key=lambda page: page.page_number))))
+                os.replace(tmp_path, path)
+        return {n: cached[n] for n in wanted}
+
+    def parse(self, pdf_file: str | Path, pdf_hash: str) -> PdfDocument:
+        doc = PdfDocument.load_file(str(pdf_file), image_dir=self.doc_dir(pdf_hash) / 'images')
+        if self.reading_order:
+            doc = self.analyzer.reorder(doc)
+        build_outline(doc)
+        return doc
+
+    def load(self, pdf_file: str | Path, pdf_hash: str | None = None, refresh: bool = False) -> PdfDocument:
+        """Return the parsed document of `pdf_file`, parsing and caching it on the first call."""
+        pdf_hash = pdf_hash or file_sha256(pdf_file)
+        if not refresh:
+            doc = self.get(pdf_hash)
+            if doc is not None:
+                logger.debug(f'Parsed document found: {pdf_hash}')
+                return doc
+
+        doc = self.parse(pdf_file, pdf_hash)
+        self.put(pdf_hash, doc)
+        return doc
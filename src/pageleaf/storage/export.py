@@ -0,0 +1,266 @@
+# coding=utf-8
+"""
+Bulk export and import of the paper library.
+
+Two formats, both streamed in batches so memory stays flat however large the library is:
+
+    JSONL     one compact `PaperEntry` per line.
+    columnar  a directory with one file pair per column, so single fields (e.g. titles)
+              can be read without decoding whole entries:
+                  manifest.json            format, version, number of rows, column names
+                  {i:03d}.data             JSON-encoded cells of column i, back to back
+                  {i:03d}.offsets          int64 cell boundaries in the data file, n_rows + 1 of them
+
+Nested required models (`paper`, `paper.metadata`, ...) are split into one column per
+field, anything else (lists, optional models) is one JSON cell. Both formats validate a
+batch of entries with a single `TypeAdapter` call, and both are written beside their
+target and moved into place once complete.
+"""
+import json
+import logging
+import mmap
+import os
+import shutil
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+from pydantic import BaseModel, TypeAdapter
+
+from pageleaf.schemas.paper import PaperEntry
+from pageleaf.storage.library import PaperLibrary
+
+logger = logging.getLogger(__name__)
+
+ENTRY_ADAPTER = TypeAdapter(PaperEntry)
+ENTRIES_ADAPTER = TypeAdapter(list[PaperEntry])
+
+COLUMNAR_FORMAT = 'pageleaf-columnar'
+COLUMNAR_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+
+
+def batched(items: Iterable, batch_size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def model_columns(model: type[BaseModel], prefix: str = '') -> list[str]:
+    """Dotted column names of a model, required nested models are split into their fields."""
+    columns = []
+    for name, field in model.model_fields.items():
+        annotation = field.annotation
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            columns.extend(model_columns(annotation, f'{prefix}{name}.'))
+        else:
+            columns.append(f'{prefix}{name}')
+    return columns
+
+
+ENTRY_COLUMNS = model_columns(PaperEntry)
+
+
+def _flatten(row: dict, columns: list[str]) -> list:
+    values = []
+    for column in columns:
+        value = row
+        for key in column.split('.'):
+            value = value[key]
+        values.append(value)
+    return values
+
+
+def _unflatten(columns: list[str], values: list) -> dict:
+    row = {}
+    for column, value in zip(columns, values):
+        *parents, key = column.split('.')
+        node = row
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[key] = value
+    return row
+
+
+# -- JSONL
+
+
+def export_jsonl(entries: Iterable[PaperEntry], file: str | Path, batch_size: int = 1000) -> int:
+    """Write entries to a JSONL file, return the number of entries written."""
+    file = Path(file)
+    tmp_file = file.with_name(file.name + '.tmp')
+    n = 0
+    try:
+        with open(tmp_file, 'wb') as fout:
+            for batch in batched(entries, batch_size):
+                fout.write(b''.join(ENTRY_ADAPTER.dump_json(entry) + b'\n' for entry in batch))
+                n += len(batch)
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_file, file)
+    return n
+
+
+def read_jsonl(file: str | Path, batch_size: int = 1000) -> Iterator[list[PaperEntry]]:
+    """Yield batches of entries from a JSONL file."""
+    with open(file, 'rb') as fin:
+        lines = (line for line in fin if line.strip())
+        for batch in batched(lines, batch_size):
+            yield ENTRIES_ADAPTER.validate_json(b'[' + b','.join(batch) + b']')
+
+
+# -- columnar
+
+
+def export_columnar(entries: Iterable[PaperEntry], directory: str | Path, batch_size: int = 1000) -> int:
+    """
+    Write entries to a columnar directory, return the number of entries written. The export
+    is written next to `directory` and swapped in once complete, so a failed export leaves
+    the previous one intact; an existing directory that is not an export is refused.
+    """
+    directory = Path(directory)
+    if directory.exists() and any(directory.iterdir()) and not (directory / MANIFEST_FILE).exists():
+        raise ValueError(f'Not a columnar library export, refusing to replace it: {directory}')
+    tmp_dir = directory.with_name(f'{directory.name}.{os.getpid()}.tmp')
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    try:
+        n = _write_columnar(entries, tmp_dir, batch_size)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    # directories cannot be replaced in one rename, the old one is moved aside first.
+    old_dir = directory.with_name(f'{directory.name}.{os.getpid()}.old')
+    if directory.exists():
+        os.replace(directory, old_dir)
+    os.replace(tmp_dir, directory)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return n
+
+
+def _write_columnar(entries: Iterable[PaperEntry], directory: Path, batch_size: int) -> int:
+    columns = ENTRY_COLUMNS
+    data_files = [open(directory / f'{i:03d}.data', 'wb') for i in range(len(columns))]
+    offset_files = [open(directory / f'{i:03d}.offsets', 'wb') for i in range(len(columns))]
+    ends = [0] * len(columns)
+    n = 0
+    try:
+        for f in offset_files:
+            np.zeros(1, dtype=np.int64).tofile(f)
+        for batch in batched(entries, batch_size):
+            rows = [_flatten(row, columns) for row in ENTRIES_ADAPTER.dump_python(batch, mode='json')]
+            for i in range(len(columns)):
+                cells = [json.dumps(row[i], ensure_ascii=False).encode('utf-8') for row in rows]
+                offsets = np.cumsum([len(cell) for cell in cells], dtype=np.int64) + ends[i]
+                data_files[i].write(b''.join(cells))
+                offsets.tofile(offset_files[i])
+                ends[i] = int(offsets[-1])
+            n += len(batch)
+    finally:
+        for f in data_files + offset_files:
+            f.close()
+
+    manifest = {'format': COLUMNAR_FORMAT, 'version': COLUMNAR_VERSION, 'n_rows': n, 'columns': columns}
+    (directory / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+    return n
+
+
+class ColumnarReader:
+    """Read-only view of a columnar export, cells are decoded only when asked for."""
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        manifest = json.loads((self.directory / MANIFEST_FILE).read_text(encoding='utf-8'))
+        if manifest.get('format') != COLUMNAR_FORMAT:
+            raise ValueError(f'Not a columnar library export: {self.directory}')
+        if manifest['version'] != COLUMNAR_VERSION:
+            raise ValueError(f'Unsupported columnar export version: {manifest["version"]}')
+        self.n_rows: int = manifest['n_rows']
+        self.columns: list[str] = manifest['columns']
+        self._files, self._data, self._offsets = {}, {}, {}
+
+    def close(self):
+        for data in self._data.values():
+            if data is not None:
+                data.close()
+        for f in self._files.values():
+            f.close()
+        self._files, self._data, self._offsets = {}, {}, {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return self.n_rows
+
+    def _open(self, i: int):
+        if i not in self._files:
+            f = open(self.directory / f'{i:03d}.data', 'rb')
+            size = os.fstat(f.fileno()).st_size
+            self._files[i] = f
+            self._data[i] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+            self._offsets[i] = np.memmap(self.directory / f'{i:03d}.offsets', dtype=np.int64, mode='r')
+        return self._data[i], self._offsets[i]
+
+    def _cells(self, i: int, start: int, stop: int) -> list:
+        data, offsets = self._open(i)
+        bounds = np.asarray(offsets[start:stop + 1]) - offsets[start]
+        chunk = data[int(offsets[start]):int(offsets[stop])] if data is not None else b''
+        return [json.loads(chunk[bounds[j]:bounds[j + 1]]) for j in range(stop - start)]
+
+    def column(self, name: str, start: int = 0, stop: int | None = None) -> list:
+        """Values of one column, e.g. 'paper.metadata.title'."""
+        stop = self.n_rows if stop is None else min(stop, self.n_rows)
+        return self._cells(self.columns.index(name), start, stop)
+
+    def iter_batches(self, batch_size: int = 1000) -> Iterator[list[PaperEntry]]:
+        for start in range(0, self.n_rows, batch_size):
+            stop = min(start + batch_size, self.n_rows)
+            columns = [self._cells(i, start, stop) for i in range(len(self.columns))]
+            rows = [_unflatten(self.columns, values) for values in zip(*columns)]
+            yield ENTRIES_ADAPTER.validate_python(rows)
+
+
+def read_columnar(directory: str | Path, batch_size: int = 1000) -> Iterator[list[PaperEntry]]:
+    """Yield batches of entries from a columnar directory."""
+    with ColumnarReader(directory) as reader:
+        yield from reader.iter_batches(batch_size)
+
+
+# -- library
+
+
+def export_library(library: PaperLibrary, target: str | Path, fmt: str = 'jsonl', batch_size: int = 1000) -> int:
+    entries = (entry for batch in library.iter_batches(batch_size) for entry in batch)
+    if fmt == 'jsonl':
+        n = export_jsonl(entries, target, batch_size)
+    elif fmt == 'columnar':
+        n = export_columnar(entries, target, batch_size)
+    else:
+        raise ValueError(f'Unknown export format: {fmt}')
+    logger.info(f'{n} entries exported to {target}')
+    return n
+
+
+def import_library(library: PaperLibrary, source: str | Path, overwrite: bool = False, batch_size: int = 1000) -> int:
+    """Load an export into `library`, entries already in the library are kept unless `overwrite`."""
+    source = Path(source)
+    batches = read_columnar(source, batch_size) if source.is_dir() else read_jsonl(source, batch_size)
+    n = 0
+    for batch in batches:
+        for entry in batch:
+            if overwrite or entry.paper.id not in library:
+                library.save(entry)
+                n += 1
+    logger.info(f'{n} entries imported from {source}')
+    return n
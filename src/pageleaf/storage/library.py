@@ -0,0 +1,86 @@
+# coding=utf-8
+import logging
+import os
+from pathlib import Path
+from typing import Iterator
+from uuid import UUID
+
+from pydantic import TypeAdapter
+
+from pageleaf.config.paths import data_path
+from pageleaf.schemas.paper import PaperEntry
+
+logger = logging.getLogger(__name__)
+
+_ENTRIES = TypeAdapter(list[PaperEntry])
+
+
+class PaperLibrary:
+    """
+    The paper library, one `PaperEntry` JSON file per paper:
+        {root}/{paper id}.json
+    """
+
+    def __init__(self, root: str | Path | None = None):
+        self.root = Path(root) if root else data_path('library')
+        self.root.mkdir(parents=True, exist_ok=True)
+        # external id (e.g. 'arxiv:2512.02556') -> paper id, built on first lookup.
+        self._identifiers: dict[str, UUID] | None = None
+
+    def path_for(self, paper_id: UUID | str) -> Path:
+        return self.root / f'{paper_id}.json'
+
+    def ids(self) -> list[UUID]:
+        return [UUID(path.stem) for path in sorted(self.root.glob('*.json'))]
+
+    def __len__(self):
+        return sum(1 for _ in self.root.glob('*.json'))
+
+    def __iter__(self) -> Iterator[PaperEntry]:
+        for path in sorted(self.root.glob('*.json')):
+            yield PaperEntry.model_validate_json(path.read_bytes())
+
+    def iter_batches(self, batch_size: int = 1000) -> Iterator[list[PaperEntry]]:
+        """Iterate entries in batches, each batch is validated in one call."""
+        paths = sorted(self.root.glob('*.json'))
+        for start in range(0, len(paths), batch_size):
+            data = b','.join(path.read_bytes() for path in paths[start:start + batch_size])
+            yield _ENTRIES.validate_json(b'[' + data + b']')
+
+    def __contains__(self, paper_id: UUID | str) -> bool:
+        return self.path_for(paper_id).exists()
+
+    def get(self, paper_id: UUID | str) -> PaperEntry | None:
+        path = self.path_for(paper_id)
+        if not path.exists():
+            return None
+        return PaperEntry.model_validate_json(path.read_bytes())
+
+    def save(self, entry: PaperEntry):
+        path = self.path_for(entry.paper.id)
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(entry.model_dump_json(indent=2), encoding='utf-8')
+        os.replace(tmp_path, path)
+        if self._identifiers is not None:
+            self._index(entry)
+
+    def delete(self, paper_id: UUID | str):
+        self.path_for(paper_id).unlink(missing_ok=True)
+        self._identifiers = None
+
+    def _index(self, entry: PaperEntry):
+        for name, value in entry.paper.identifiers.model_dump().items():
+            if value:
+                self._identifiers[f'{name}:{value.lower()}'] = entry.paper.id
+
+    def find(self, arxiv: str | None = None, doi: str | None = None, acl: str | None = None) -> PaperEntry | None:
+        """Find an entry by one of its external identifiers."""
+        if self._identifiers is None:
+            self._identifiers = {}
+            for entry in self:
+                self._index(entry)
+
+        for name, value in (('arxiv', arxiv), ('doi', doi), ('acl', acl)):
+            if value and (paper_id := self._identifiers.get(f'{name}:{value.lower()}')):
+                return self.get(paper_id)
+        return None
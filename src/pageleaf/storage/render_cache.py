@@ -0,0 +1,79 @@
+# coding=utf-8
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+from pageleaf.config.paths import data_path
+
+logger = logging.getLogger(__name__)
+
+
+def render_key(pdf_hash: str, page_number: int, dpi: int,
+               clip: tuple[float, float, float, float] | None = None) -> str:
+    key = f'{pdf_hash}_p{page_number}_d{dpi}'
+    if clip is not None:
+        key += '_c' + '-'.join(f'{v:.0f}' for v in clip)
+    return key
+
+
+class RenderCache:
+    """
+    Rendered page images on disk, evicted least-recently-used first once the total size
+    passes `max_bytes`. Recency is the file mtime, so it survives restarts:
+        {root}/{pdf_hash[:2]}/{key}.png
+    """
+
+    def __init__(self, root: str | Path | None = None, max_bytes: int = 512 * 1024 * 1024):
+        self.root = Path(root) if root else data_path('cache', 'render')
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        entries = []
+        for path in self.root.glob('*/*.png'):
+            stat = path.stat()
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        entries.sort()
+        self._entries: OrderedDict[str, int] = OrderedDict((key, size) for _, key, size in entries)
+        self.total_bytes = sum(self._entries.values())
+
+    def path_for(self, key: str) -> Path:
+        return self.root / key[:2] / f'{key}.png'
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> bytes | None:
+        if key not in self._entries:
+            return None
+        path = self.path_for(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            # evicted by another process.
+            self.total_bytes -= self._entries.pop(key)
+            return None
+        self._entries.move_to_end(key)
+        return data
+
+    def put(self, key: str, data: bytes):
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+        self.total_bytes += len(data) - self._entries.pop(key, 0)
+        self._entries[key] = len(data)
+        self._evict()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self.path_for(key).unlink(missing_ok=True)
+            self.total_bytes -= size
+            logger.debug(f'evicted: {key}')
@@ -0,0 +1,209 @@
+# coding=utf-8
+"""
+Page text store: the text of a parsed document in one contiguous UTF-8 file, plus an
+int64 offset index, both memory-mapped. Page and block lookups are O(1) slices of the
+mapping and never touch PyMuPDF.
+
+Index layout (int64):
+    header        MAGIC, VERSION, n_pages, n_blocks, max_page_number
+    page_rows     (max_page_number + 1,) page number -> row, -1 for pages without text
+    page_numbers  (n_pages,)
+    first_block   (n_pages + 1,) blocks of page row r are first_block[r]:first_block[r + 1]
+    block_starts  (n_blocks,) byte offsets into the text file
+    block_ends    (n_blocks,)
+
+Texts longer than one frame are stored compressed when a codec is given, as seekable
+frames in `text.utf8z` (see `commons.io.codecs.write_frames`); offsets stay those of the
+uncompressed text and a lookup inflates only the frames it touches.
+"""
+import mmap
+import os
+from pathlib import Path
+
+import numpy as np
+
+from pageleaf.commons.io.codecs import codec_of, FramedReader, StorageCodec, write_frames
+from pageleaf.engine.layout import flow_text
+from pageleaf.schemas.io.pdf import PdfDocument
+
+MAGIC = 0x504C545854  # 'PLTXT'
+VERSION = 1
+HEADER_SIZE = 5
+BLOCK_SEPARATOR = b'\n\n'
+
+TEXT_FILE = 'text.utf8'
+FRAMED_TEXT_FILE = 'text.utf8z'
+INDEX_FILE = 'text.idx'
+FRAME_SIZE = 1 << 16
+
+
+def write_page_text(doc: PdfDocument, directory: str | Path, codec: StorageCodec | None = None) -> Path:
+    """
+    Write the text of `doc` (in its block order) and its offset index to `directory`,
+    the text compressed with `codec` when it is longer than a frame.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    page_numbers, first_block, starts, ends = [], [0], [], []
+    offset = 0
+    tmp_text = directory / f'{TEXT_FILE}.tmp'
+    with open(tmp_text, 'wb') as fout:
+        for page in doc.pages:
+            for block in page.blocks:
+                data = flow_text(block).encode('utf-8') if block.is_text() else b''
+                if starts and data:
+                    fout.write(BLOCK_SEPARATOR)
+                    offset += len(BLOCK_SEPARATOR)
+                starts.append(offset)
+                fout.write(data)
+                offset += len(data)
+                ends.append(offset)
+            page_numbers.append(page.page_number)
+            first_block.append(len(starts))
+
+    max_page = max(page_numbers, default=0)
+    page_rows = np.full(max_page + 1, -1, dtype=np.int64)
+    page_rows[page_numbers] = np.arange(len(page_numbers))
+    index = np.concatenate([
+        np.array([MAGIC, VERSION, len(page_numbers), len(starts), max_page], dtype=np.int64),
+        page_rows,
+        np.array(page_numbers, dtype=np.int64),
+        np.array(first_block, dtype=np.int64),
+        np.array(starts, dtype=np.int64),
+        np.array(ends, dtype=np.int64),
+    ])
+    tmp_index = directory / f'{INDEX_FILE}.tmp'
+    index.tofile(tmp_index)
+
+    if codec is not None and codec.name != 'none' and offset > FRAME_SIZE:
+        compress_text_file(tmp_text, directory / FRAMED_TEXT_FILE, codec)
+        (directory / TEXT_FILE).unlink(missing_ok=True)
+    else:
+        os.replace(tmp_text, directory / TEXT_FILE)
+        (directory / FRAMED_TEXT_FILE).unlink(missing_ok=True)
+    os.replace(tmp_index, directory / INDEX_FILE)
+    return directory
+
+
+def compress_text_file(text_file: Path, framed_file: Path, codec: StorageCodec, frame_size: int = FRAME_SIZE):
+    """Replace a plain text file by its seekable frames."""
+    tmp_path = framed_file.with_name(f'{framed_file.name}.tmp')
+    write_frames(tmp_path, text_file.read_bytes(), codec, frame_size)
+    os.replace(tmp_path, framed_file)
+    text_file.unlink()
+
+
+def recode_text(directory: str | Path, codec: StorageCodec | None) -> bool:
+    """Store the text of `directory` as `write_page_text` would with `codec`, return whether it changed."""
+    directory = Path(directory)
+    text_file, framed_file = directory / TEXT_FILE, directory / FRAMED_TEXT_FILE
+    compress = codec is not None and codec.name != 'none'
+    if text_file.exists():
+        if not compress or text_file.stat().st_size <= FRAME_SIZE:
+            return False
+        compress_text_file(text_file, framed_file, codec)
+        return True
+    if not framed_file.exists() or codec_of(framed_file) == (codec.name if compress else 'none'):
+        return False
+    with FramedReader(framed_file) as reader:
+        data = reader.read(0, len(reader))
+    tmp_text = directory / f'{TEXT_FILE}.tmp'
+    tmp_text.write_bytes(data)
+    if compress and len(data) > FRAME_SIZE:
+        compress_text_file(tmp_text, framed_file, codec)
+    else:
+        os.replace(tmp_text, text_file)
+        framed_file.unlink()
+    return True
+
+
+class PageText:
+    """Read-only view of a page text store."""
+
+    def __init__(self, directory: str | Path):
+        directory = Path(directory)
+        index = np.memmap(directory / INDEX_FILE, dtype=np.int64, mode='r')
+        if len(index) < HEADER_SIZE or index[0] != MAGIC:
+            raise ValueError(f'Not a page text index: {directory / INDEX_FILE}')
+        if index[1] != VERSION:
+            raise ValueError(f'Unsupported page text index version: {index[1]}')
+
+        n_pages, n_blocks, max_page = int(index[2]), int(index[3]), int(index[4])
+        pos = HEADER_SIZE
+        sizes = [('page_rows', max_page + 1), ('page_numbers', n_pages), ('first_block', n_pages + 1),
+                 ('block_starts', n_blocks), ('block_ends', n_blocks)]
+        for name, size in sizes:
+            setattr(self, name, index[pos:pos + size])
+            pos += size
+
+        self._frames = None
+        self._file = self._mmap = None
+        self._view = memoryview(b'')
+        if not (directory / TEXT_FILE).exists() and (directory / FRAMED_TEXT_FILE).exists():
+            self._frames = FramedReader(directory / FRAMED_TEXT_FILE)
+            return
+        self._file = open(directory / TEXT_FILE, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        if self._mmap is not None:
+            self._view = memoryview(self._mmap)
+
+    def close(self):
+        self._view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+        if self._file is not None:
+            self._file.close()
+        if self._frames is not None:
+            self._frames.close()
+
+    @property
+    def compressed(self) -> bool:
+        return self._frames is not None
+
+    def _slice(self, start: int, end: int) -> memoryview:
+        if self._frames is not None:
+            return memoryview(self._frames.read(start, end))
+        return self._view[start:end]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def n_pages(self) -> int:
+        return len(self.page_numbers)
+
+    def _row(self, page_number: int) -> int:
+        row = int(self.page_rows[page_number]) if 0 <= page_number < len(self.page_rows) else -1
+        if row < 0:
+            raise KeyError(f'No text for page {page_number}')
+        return row
+
+    def n_blocks(self, page_number: int) -> int:
+        row = self._row(page_number)
+        return int(self.first_block[row + 1] - self.first_block[row])
+
+    def page_bytes(self, page_number: int) -> memoryview:
+        """UTF-8 text of a page, a zero-copy view into the mapped file unless it is compressed."""
+        row = self._row(page_number)
+        first, last = int(self.first_block[row]), int(self.first_block[row + 1])
+        if first == last:
+            return self._view[0:0]
+        return self._slice(int(self.block_starts[first]), int(self.block_ends[last - 1]))
+
+    def block_bytes(self, page_number: int, block_index: int) -> memoryview:
+        row = self._row(page_number)
+        block = int(self.first_block[row]) + block_index
+        if block_index < 0 or block >= self.first_block[row + 1]:
+            raise IndexError(f'No block {block_index} on page {page_number}')
+        return self._slice(int(self.block_starts[block]), int(self.block_ends[block]))
+
+    def page_text(self, page_number: int) -> str:
+        return str(self.page_bytes(page_number), 'utf-8')
+
+    def block_text(self, page_number: int, block_index: int) -> str:
+        return str(self.block_bytes(page_number, block_index), 'utf-8')
@@ -0,0 +1,79 @@
+# coding=utf-8
+import gzip
+import json
+
+import pytest
+
+from pageleaf.commons.io.codecs import (codec_of, decode, FramedReader, load_dictionary, read_bytes, StorageCodec,
+                                        train_dictionary, write_frames)
+from pageleaf.commons.io.files import json_dump, json_load
+from pageleaf.config.paths import DataLayout
+from pageleaf.pipelines.compress import compress_data
+
+
+def record(i):
+    return {'id': f'http://arxiv.org/abs/2501.{i:05d}v1', 'short_id': f'2501.{i:05d}v1', 'title': f'Paper {i}',
+            'summary': f'We study problem {i} and report results.', 'categories': ['cs.CL', 'cs.LG'],
+            'primary_category': 'cs.CL', 'authors': [f'Author {i}', 'Ada Lovelace'],
+            'links': [{'href': f'http://arxiv.org/abs/2501.{i:05d}v1', 'rel': 'alternate', 'content-type': None,
+                       'title': None}],
+            'pdf_url': f'http://arxiv.org/pdf/2501.{i:05d}v1', 'doi': None, 'comment': None}
+
+
+def test_codecs(tmp_path):
+    data = json.dumps(record(1), indent=2).encode('utf-8')
+    samples = [json.dumps(record(i), indent=2).encode('utf-8') for i in range(2, 50)]
+    dictionary = train_dictionary(samples)
+    assert 0 < len(dictionary) <= 32 * 1024 and b'"primary_category": "cs.CL",' in dictionary
+
+    plain, trained = StorageCodec('zlib'), StorageCodec('zlib', dictionary)
+    assert decode(plain.encode(data)) == decode(trained.encode(data)) == data
+    assert len(trained.encode(data)) < len(plain.encode(data)) < len(data)
+    assert decode(gzip.compress(data)) == decode(data) == data
+    with pytest.raises(ValueError):
+        StorageCodec('brotli')
+
+    big = b''.join(samples)
+    write_frames(tmp_path / 'text.z', big, plain, frame_size=1000)
+    assert codec_of(tmp_path / 'text.z') == 'zlib'
+    with FramedReader(tmp_path / 'text.z', cache_frames=2) as reader:
+        assert len(reader) == len(big)
+        for start, end in [(0, 10), (990, 1010), (1500, 4700), (len(big) - 5, len(big) + 5), (30, 30)]:
+            assert reader.read(start, end) == big[start:end]
+    # read whole, like any other encoded file.
+    assert read_bytes(tmp_path / 'text.z') == big
+    with pytest.raises(ValueError):
+        decode((tmp_path / 'text.z').read_bytes()[:-100])
+
+
+def test_json_caches(tmp_path):
+    layout = DataLayout(tmp_path)
+    layout.train_dictionary([json.dumps(record(i), indent=2).encode('utf-8') for i in range(50)], 'zlib')
+    codec = layout.codec('zlib')
+    path = layout.path('arxiv', '2501.00001.json')
+    json_dump(record(1), path, indent=2, codec=codec)
+    assert codec_of(path) == 'zlib' and json_load(path) == record(1)
+
+    # another process finds the dictionary next to the data.
+    from pageleaf.commons.io import codecs
+    codecs._dictionaries.clear()
+    assert json_load(path) == record(1)
+    with pytest.raises(FileNotFoundError):
+        load_dictionary(12345, path)
+
+
+def test_compress_data(tmp_path):
+    layout = DataLayout(tmp_path)
+    for i in range(1, 30):
+        json_dump(record(i), layout.path('arxiv', f'2501.{i:05d}.json'), indent=2)
+    json_dump({'arxiv': {'payload': {'pdf_path': 'x.pdf'}}}, layout.path('fetched', '2501.00001.json'))
+
+    report = compress_data(tmp_path, 'zlib')
+    assert report.files == 30 and report.dictionary
+    assert report.bytes_after * 2 < report.bytes_before
+    assert all(codec_of(path) == 'zlib' for path in (tmp_path / 'arxiv').rglob('*.json'))
+    assert json_load(layout.path('arxiv', '2501.00007.json')) == record(7)
+    assert compress_data(tmp_path, 'zlib', train=False).files == 0
+
+    assert compress_data(tmp_path, 'none').files == 30
+    assert json.loads(layout.path('arxiv', '2501.00007.json').read_text()) == record(7)
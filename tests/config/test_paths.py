@@ -0,0 +1,67 @@
+# coding=utf-8
+from uuid import uuid4
+
+from pageleaf.commons.io.files import json_dump, json_load
+from pageleaf.config.fetchers import FetcherConfig
+from pageleaf.config.paths import data_path, DataLayout, ENV_DATA_ROOT, shard_of
+from pageleaf.fetchers.manager import FetcherManager
+from pageleaf.schemas.paper import Content, ExternalIdentifiers, Metadata, Paper, PaperAnalysis, PaperEntry
+from pageleaf.storage.library import PaperLibrary
+
+
+def test_layout(tmp_path, monkeypatch):
+    monkeypatch.setenv(ENV_DATA_ROOT, str(tmp_path))
+    assert data_path('index', 'similarity') == tmp_path / 'index' / 'similarity'
+    assert PaperLibrary().root == tmp_path / 'library'
+    assert FetcherConfig().layout.root == tmp_path
+
+    assert shard_of('2501.00042 - A Title.pdf') == '2501'
+    assert shard_of('candidates.json') is None
+    layout = DataLayout(tmp_path)
+    assert layout.resolve('arxiv', '2501.00042.json') == tmp_path / 'arxiv' / '2501' / '2501.00042.json'
+    assert layout.resolve('hf', 'candidates.json') == tmp_path / 'hf' / 'candidates.json'
+    # a file not migrated yet is found where it is.
+    (tmp_path / 'hf' / '2502.00001.json').write_text('{}')
+    assert layout.resolve('hf', '2502.00001.json') == tmp_path / 'hf' / '2502.00001.json'
+
+
+def test_migrate(tmp_path):
+    arxiv, fetched = tmp_path / 'arxiv', tmp_path / 'fetched'
+    arxiv.mkdir()
+    fetched.mkdir()
+    pdf = arxiv / '2501.00042 - A Title.pdf'
+    pdf.write_bytes(b'%PDF-1.7 %%EOF')
+    (arxiv / '2501.00042.json').write_text('{"title": "A Title"}')
+    (arxiv / '2501.00043.pdf.123.part').write_bytes(b'%PDF-')  # a download in flight
+    (arxiv / '2412.00001.json').write_text('{"title": "old"}')
+    (arxiv / '2412').mkdir()
+    (arxiv / '2412' / '2412.00001.json').write_text('{"title": "new"}')
+    results = {'arxiv': {'source': 'arxiv', 'external_ids': {}, 'payload': {'pdf_path': str(pdf)}}}
+    json_dump(results, fetched / '2501.00042.json')
+    library = PaperLibrary(tmp_path / 'library')
+    ids = ExternalIdentifiers(arxiv='2501.00042')
+    metadata = Metadata(title='A Title', abstract='', venue='arxiv', paper_type='preprint', source='arxiv',
+                        external_ids=ids)
+    paper = Paper(id=uuid4(), identifiers=ids, metadata=metadata, content=Content(abstract=None, outline=None),
+                  analysis=PaperAnalysis())
+    entry = PaperEntry(paper=paper, pdf_path=str(pdf))
+    library.save(entry)
+
+    layout = DataLayout(tmp_path)
+    assert layout.migrate(dry_run=True).moved == 3
+    assert pdf.exists()
+
+    report = layout.migrate()
+    moved_pdf = arxiv / '2501' / pdf.name
+    assert (report.moved, report.duplicates, report.rewritten) == (3, 0, 2)
+    assert report.conflicts == [str(arxiv / '2412.00001.json')]
+    assert moved_pdf.exists() and not pdf.exists()
+    assert (arxiv / '2501.00043.pdf.123.part').exists()
+    assert json_load(fetched / '2501' / '2501.00042.json')['arxiv']['payload']['pdf_path'] == str(moved_pdf)
+    assert library.get(entry.paper.id).pdf_path == str(moved_pdf)
+    assert layout.migrate().moved == 0
+
+    # results cached before the move still lead to the file.
+    json_dump(results, fetched / '2501' / '2501.00042.json')
+    cached = FetcherManager(FetcherConfig(data_dir=tmp_path)).fetch('2501.00042')
+    assert cached['arxiv']['payload']['pdf_path'] == str(moved_pdf)
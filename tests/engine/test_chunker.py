@@ -0,0 +1,89 @@
+# coding=utf-8
+import fitz
+
+from pageleaf.engine.chunker import CachedChunker, ChunkerConfig, TextChunker, count_tokens, stream_pages
+from pageleaf.storage.documents import ParsedDocumentStore
+
+BODY = 'We study sparse attention for long documents and report results on several benchmarks. '
+
+
+def write_pdf(path):
+    doc = fitz.open()
+    sections = [('1 Introduction', 3), ('2 Method', 12), ('2.1 Architecture', 2), ('3 Experiments', 2)]
+    page, y = doc.new_page(), 72
+    for title, n_sentences in sections:
+        if y > 500:
+            page, y = doc.new_page(), 72
+        page.insert_text((72, y), title, fontsize=12, fontname='hebo')
+        rect = fitz.Rect(72, y + 10, 540, y + 250)
+        page.insert_textbox(rect, BODY * n_sentences, fontsize=10, fontname='tiro')
+        y += 30 + 13 * (len(BODY) * n_sentences // 90 + 1)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def test_chunks_respect_budget_and_sections(tmp_path):
+    pdf_file = write_pdf(tmp_path / 'paper.pdf')
+    doc = ParsedDocumentStore(tmp_path / 'parsed').load(pdf_file)
+    chunks = list(TextChunker(ChunkerConfig(max_tokens=80)).iter_chunks(doc.pages, doc.outline))
+
+    assert all(chunk.n_tokens <= 80 for chunk in chunks)
+    assert all(count_tokens(chunk.text) == chunk.n_tokens for chunk in chunks)
+    assert [chunk.index for chunk in chunks] == list(range(len(chunks)))
+    # the long method section is split at sentence ends, never mixed with another section.
+    method = [chunk for chunk in chunks if chunk.section == ['2 Method']]
+    assert len(method) > 1 and all(chunk.text.rstrip().endswith('.') for chunk in method)
+    assert chunks[-1].section == ['3 Experiments'] and chunks[-1].text.startswith('3 Experiments')
+    assert ['2 Method', '2.1 Architecture'] in [chunk.section for chunk in chunks]
+    assert all(source.bbox and source.page_number >= 1 for chunk in chunks for source in chunk.sources)
+
+    # without an outline, headings are recognized by their text.
+    streamed = list(TextChunker(ChunkerConfig(max_tokens=80)).iter_chunks(stream_pages(pdf_file)))
+    assert [chunk.section for chunk in streamed][-1] == ['3 Experiments']
+
+
+def test_cache(tmp_path):
+    pdf_file = write_pdf(tmp_path / 'paper.pdf')
+    store = ParsedDocumentStore(tmp_path / 'parsed')
+    chunker = CachedChunker(store, ChunkerConfig(max_tokens=120))
+
+    # an abandoned run leaves no cache behind.
+    next(iter(chunker.chunks(pdf_file)))
+    pdf_hash = store.root.iterdir().__next__().name
+    assert not chunker.cache_path(pdf_hash).exists()
+
+    first = [chunk.model_dump() for chunk in chunker.chunks(pdf_file)]
+    assert chunker.cache_path(pdf_hash).exists()
+    assert [chunk.model_dump() for chunk in chunker.chunks(pdf_file, pdf_hash)] == first
+    # another config, another cache entry.
+    other = CachedChunker(store, ChunkerConfig(max_tokens=60))
+    assert other.cache_path(pdf_hash) != chunker.cache_path(pdf_hash)
+    assert len(list(other.chunks(pdf_file))) > len(first)
+
+    # once the document is parsed its outline gives the sections, under another key.
+    streamed = chunker.cache_path(pdf_hash)
+    doc = store.load(pdf_file)
+    parsed = chunker.cache_path(pdf_hash)
+    assert chunker.source_key(pdf_hash).startswith('parsed-') and parsed != streamed
+    chunks = list(chunker.chunks(pdf_file))
+    assert parsed.exists()
+    assert chunks == list(TextChunker(ChunkerConfig(max_tokens=120)).iter_chunks(doc.pages, doc.outline))
+    # a document whose outline is rebuilt is chunked again.
+    store.put(pdf_hash, doc.model_copy(update={'outline': None}))
+    assert chunker.cache_path(pdf_hash) not in (streamed, parsed)
+
+
+def test_runs_over_the_budget_are_cut(tmp_path):
+    # formula lines without spaces, each a single "word" of 120 tokens.
+    doc = fitz.open()
+    page = doc.new_page()
+    for i in range(4):
+        page.insert_text((36, 72 + 10 * i), 'x+' * 60, fontsize=4)
+    doc.save(tmp_path / 'formula.pdf')
+    doc.close()
+
+    chunks = list(TextChunker(ChunkerConfig(max_tokens=50)).iter_chunks(stream_pages(tmp_path / 'formula.pdf')))
+    assert sum(chunk.n_tokens for chunk in chunks) == 480
+    assert all(chunk.n_tokens <= 50 for chunk in chunks)
+    assert all(count_tokens(chunk.text) == chunk.n_tokens for chunk in chunks)
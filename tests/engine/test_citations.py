@@ -0,0 +1,68 @@
+# coding=utf-8
+import fitz
+import numpy as np
+
+from pageleaf.engine.citations import CitationGraph, CitationGraphBuilder, extract_references, parse_reference
+from pageleaf.storage.documents import ParsedDocumentStore
+
+
+def test_parse_reference():
+    ref = parse_reference('[3] A. Vaswani et al. Attention is all you need. arXiv preprint arXiv:1706.03762v7, 2017.')
+    assert ref.arxiv == '1706.03762' and ref.key == 'arxiv:1706.03762'
+    ref = parse_reference('[4] J. Devlin et al. BERT. In NAACL, 2019. doi:10.18653/v1/N19-1423.')
+    assert ref.doi == '10.18653/v1/N19-1423' and ref.key == 'doi:10.18653/v1/n19-1423'
+    assert parse_reference('[5] Some book. MIT Press, 1998.').key is None
+    # identifiers from before 2007, with or without the arXiv prefix.
+    assert parse_reference('[6] J. Maldacena. Large N. arXiv:hep-th/9711200v3, 1997.').arxiv == 'hep-th/9711200'
+    assert parse_reference('[7] A. Author. Parsing. cs.CL/0501001, 2005.').key == 'arxiv:cs.CL/0501001'
+    assert parse_reference('[8] B. Author. https://arxiv.org/abs/math.AG/0703001').arxiv == 'math.AG/0703001'
+    assert parse_reference('[9] Tech report, http://example.org/cs/0501001.pdf').arxiv is None
+
+
+def test_extract_references(tmp_path):
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), '1 Introduction', fontsize=12, fontname='hebo')
+    page.insert_textbox(fitz.Rect(72, 80, 540, 300), 'Attention is cheap, see https://arxiv.org/abs/2001.00001. ' * 8,
+                        fontsize=10, fontname='tiro')
+    page.insert_text((72, 320), 'References', fontsize=12, fontname='hebo')
+    refs = ['[1] A. Author. Sparse attention. arXiv:2101.00001, 2021.',
+            '[2] B. Author. Dense attention. In ACL, 2020. doi:10.18653/v1/2020.acl-main.1.',
+            '[3] C. Author. A book about attention. 2019.']
+    for i, ref in enumerate(refs):
+        page.insert_textbox(fitz.Rect(72, 335 + i * 40, 540, 370 + i * 40), ref, fontsize=9, fontname='tiro')
+    path = tmp_path / 'paper.pdf'
+    doc.save(path)
+
+    parsed = ParsedDocumentStore(tmp_path / 'parsed').load(path)
+    references = extract_references(parsed)
+    assert [r.key for r in references] == ['arxiv:2101.00001', 'doi:10.18653/v1/2020.acl-main.1', None]
+
+
+def test_graph_queries(tmp_path):
+    builder = CitationGraphBuilder()
+    for citing, cited in [('a', 'x'), ('a', 'y'), ('b', 'x'), ('b', 'y'), ('b', 'z'), ('c', 'x'), ('c', 'z'),
+                          ('x', 'z'), ('a', 'x'), ('a', 'a')]:
+        builder.add_edge(citing, cited)
+    graph = builder.build()
+    node = graph.node
+    names = lambda nodes: sorted(graph.keys[n] for n in nodes)
+
+    # duplicates and self-citations are dropped.
+    assert graph.n_edges == 8
+    assert names(graph.cites(node('a'))) == ['x', 'y']
+    assert names(graph.cited_by(node('x'))) == ['a', 'b', 'c']
+    assert names(graph.neighborhood(node('a'), k=1, direction='out')) == ['x', 'y']
+    assert names(graph.neighborhood(node('a'), k=2, direction='out')) == ['x', 'y', 'z']
+    assert names(graph.neighborhood(node('a'), k=2)) == ['b', 'c', 'x', 'y', 'z']
+
+    # x and y are cited together by a and b, x and z by b and c.
+    assert graph.co_citation(node('x')) == [(node('y'), 2), (node('z'), 2)]
+    # b shares x and y with a, x and z with c, z with x.
+    assert graph.bibliographic_coupling(node('b')) == [(node('a'), 2), (node('c'), 2), (node('x'), 1)]
+
+    graph.save(tmp_path / 'graph.npz')
+    loaded = CitationGraph.load(tmp_path / 'graph.npz')
+    assert loaded.keys == graph.keys
+    assert np.array_equal(loaded.out_indices, graph.out_indices)
+    assert np.array_equal(loaded.in_indptr, graph.in_indptr)
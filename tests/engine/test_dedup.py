@@ -0,0 +1,32 @@
+# coding=utf-8
+from pageleaf.engine.dedup import NearDuplicateIndex, front_matter
+
+ABSTRACT = ('We study sparse attention for long documents and show that a learned routing scheme reduces memory '
+            'while matching dense attention on long context benchmarks for summarization and question answering.')
+FIRST_PAGE = ('Sparse Routing Attention for Long Documents\nJane Doe, John Roe\nUniversity of Somewhere\n'
+              f'Abstract\n{ABSTRACT}\n1 Introduction\nLong documents are everywhere, and reading them is slow. '
+              'Transformers struggle with the quadratic cost of attention over thousands of tokens.')
+
+
+def test_front_matter():
+    assert front_matter(FIRST_PAGE).endswith('question answering.\n')
+    assert front_matter('no heading here') == 'no heading here'
+
+
+def test_near_duplicates():
+    index = NearDuplicateIndex()
+    index.add('preprint', index.signature('Sparse Routing Attention for Long Documents', ABSTRACT))
+    index.add('other', index.signature('Latent diffusion with a cosine noise schedule',
+                                       'We train image diffusion models and report FID on ImageNet.'))
+    index.add('empty', index.signature())
+    assert len(index) == 2
+
+    # the camera-ready first page: same title and abstract, authors and the introduction around them.
+    matches = index.query(index.signature('', '', FIRST_PAGE.replace('benchmarks', 'tasks')))
+    assert [m.key for m in matches] == ['preprint'] and 0.5 <= matches[0].similarity < 1
+    assert index.query(index.signature('Graph neural networks for molecules', 'We predict properties.')) == []
+
+    index.add('renamed', index.signature('', '', FIRST_PAGE))
+    assert [pair[:2] for pair in index.pairs()] == [('preprint', 'renamed')]
+    index.remove('renamed')
+    assert index.pairs() == [] and 'renamed' not in index
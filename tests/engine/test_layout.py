@@ -0,0 +1,95 @@
+# coding=utf-8
+from pageleaf.engine.layout import LayoutAnalyzer, flow_text
+from pageleaf.schemas.io.pdf import PdfDocument, PdfLine, PdfPage, PdfSpan, TextBlock
+
+WIDTH, HEIGHT = 612.0, 792.0
+
+
+def make_block(number, bbox, texts, page_number=1, direction=(1.0, 0.0)):
+    x0, y0, x1, y1 = bbox
+    height = (y1 - y0) / len(texts)
+    lines = []
+    for i, text in enumerate(texts):
+        line_bbox = (x0, y0 + i * height, x1, y0 + (i + 1) * height)
+        span = PdfSpan(page_number=page_number, origin=(x0, line_bbox[3]), bbox=line_bbox, text=text,
+                       font_name='Times', font_size=10.0, font_color=0, ascender=0.9, descender=-0.2, flags=4)
+        lines.append(PdfLine(page_number=page_number, writing_mode=0, dir=direction, bbox=line_bbox, spans=[span]))
+    return TextBlock(page_number=page_number, block_number=number, bbox=bbox, flags=0, lines=lines)
+
+
+def column(number, x0, y0, n_lines, page_number=1, prefix='text'):
+    texts = [f'{prefix} {number} line {i}' for i in range(n_lines)]
+    return make_block(number, (x0, y0, x0 + 228, y0 + 12 * n_lines), texts, page_number)
+
+
+def make_page(page_number, blocks):
+    return PdfPage(page_number=page_number, width=WIDTH, height=HEIGHT, blocks=blocks)
+
+
+def test_two_columns_reading_order():
+    # content-stream order interleaves the columns.
+    blocks = [
+        column(0, 72, 100, 10),
+        column(1, 312, 100, 10),
+        column(2, 72, 240, 10),
+        column(3, 312, 240, 10),
+    ]
+    layout = LayoutAnalyzer().analyze_page(make_page(1, blocks))
+    assert layout.n_columns == 2
+    assert layout.gutter[0] >= 300 and layout.gutter[1] <= 312
+    assert layout.order == [0, 2, 1, 3]
+
+
+def test_spanning_block_starts_a_new_band():
+    blocks = [
+        column(0, 72, 100, 10),
+        column(1, 312, 100, 10),
+        make_block(2, (72, 240, 540, 300), ['Figure 1: a wide figure caption across both columns']),
+        column(3, 72, 320, 10),
+        column(4, 312, 320, 10),
+    ]
+    layout = LayoutAnalyzer().analyze_page(make_page(1, blocks))
+    assert layout.order == [0, 1, 2, 3, 4]
+
+
+def test_single_column_and_margin_text():
+    blocks = [
+        make_block(0, (72, 300, 540, 420), ['a single wide column of text'] * 10),
+        make_block(1, (72, 100, 540, 280), ['that starts above the other block'] * 15),
+        make_block(2, (10, 300, 22, 560), ['arXiv:2501.01234v1 [cs.CL] 1 Jan 2025'], direction=(0.0, -1.0)),
+    ]
+    layout = LayoutAnalyzer().analyze_page(make_page(1, blocks))
+    assert layout.n_columns == 1
+    assert layout.margin == [2]
+    assert layout.order == [1, 0]
+
+
+def test_running_heads_are_removed():
+    pages = []
+    for page_number in range(1, 5):
+        blocks = [
+            column(0, 72, 100, 10, page_number),
+            column(1, 312, 100, 10, page_number),
+            make_block(2, (72, 30, 260, 42), ['Sparse Attention for Long Context'], page_number),
+            make_block(3, (300, 760, 306, 772), [str(page_number)], page_number),
+        ]
+        if page_number == 1:
+            blocks.append(make_block(4, (200, 20, 400, 40), ['Preprint under review'], page_number))
+        pages.append(make_page(page_number, blocks))
+    doc = PdfDocument(pages=pages)
+
+    analyzer = LayoutAnalyzer()
+    layouts = analyzer.analyze(doc)
+    assert layouts[0].repeated == [2, 3]
+    assert layouts[0].order == [4, 0, 1]
+    assert all(layout.order == [0, 1] for layout in layouts[1:])
+
+    reordered = analyzer.reorder(doc)
+    assert [block.block_number for block in reordered.pages[1].blocks] == [0, 1]
+    # the source document is left untouched.
+    assert len(doc.pages[1].blocks) == 4
+
+
+def test_flow_text():
+    block = make_block(0, (72, 100, 300, 136), ['Large lan-', 'guage models are', 'Multi-Task learners'])
+    assert flow_text(block) == 'Large language models are Multi-Task learners'
@@ -0,0 +1,86 @@
+# coding=utf-8
+import os
+import time
+from datetime import datetime
+from uuid import uuid4
+
+import numpy as np
+
+from pageleaf.engine.metadata_index import MetadataIndex
+from pageleaf.schemas.paper import (Content, ExternalIdentifiers, Metadata, Paper, PaperAnalysis, PaperEngagement,
+                                    PaperEntry, Tier)
+from pageleaf.storage.library import PaperLibrary
+
+
+def make_entry(title, date, categories, upvotes=0, stars=None, tier=None, rating=None, labels=()):
+    ids = ExternalIdentifiers()
+    metadata = Metadata(title=title, abstract='', publish_date=date, venue='arxiv', paper_type='preprint',
+                        source='arxiv', primary_category=categories[0] if categories else None,
+                        categories=list(categories), hf_upvotes=upvotes, github_stars=stars, external_ids=ids)
+    paper = Paper(id=uuid4(), identifiers=ids, metadata=metadata,
+                  content=Content(abstract=None, outline=None), analysis=PaperAnalysis())
+    engagement = PaperEngagement(tier=tier, rating=rating, labels=list(labels)) if tier else None
+    return PaperEntry(paper=paper, engagement=engagement)
+
+
+ENTRIES = [
+    make_entry('Alpha', datetime(2025, 3, 1), ['cs.CL', 'cs.LG'], upvotes=120, stars=900, tier=Tier.P1, rating=5,
+               labels=['llm', 'agents']),
+    make_entry('Beta', datetime(2025, 6, 2), ['cs.CL'], upvotes=60, stars=None),
+    make_entry('Gamma', datetime(2024, 1, 5), ['cs.CL'], upvotes=300, stars=50, tier=Tier.P2, labels=['llm']),
+    make_entry('Delta', datetime(2025, 2, 1), ['cs.CV'], upvotes=80, stars=2000),
+    make_entry('Epsilon', None, [], upvotes=55, stars=10, tier=Tier.P1, rating=3),
+    make_entry('Zeta', datetime(2025, 9, 9), ['cs.LG', 'cs.CL'], upvotes=51, stars=10),
+]
+
+
+def titles(index, rows):
+    return [index.title(row) for row in rows]
+
+
+def check_queries(index):
+    rows = index.query(categories=['cs.CL'], since='2025-01-01', until='2025-12-31', min_upvotes=50,
+                       sort_by='github_stars')
+    # missing stars go last.
+    assert titles(index, rows) == ['Alpha', 'Zeta', 'Beta']
+    assert titles(index, index.query(categories=['cs.CL', 'cs.LG'], all_categories=True,
+                                     sort_by='publish_date', descending=False)) == ['Alpha', 'Zeta']
+    assert titles(index, index.query(primary_category='cs.LG')) == ['Zeta']
+    assert titles(index, index.query(labels=['llm'], sort_by='rating')) == ['Alpha', 'Gamma']
+    assert titles(index, index.query(tiers=['p1'], limit=1, sort_by='hf_upvotes')) == ['Alpha']
+    assert len(index.query(categories=['math.AG'])) == 0
+
+    mask = index.where(min_upvotes=55)
+    assert index.facets('categories', mask) == {'cs.CL': 3, 'cs.LG': 1, 'cs.CV': 1}
+    assert index.facets('year') == {'2025': 4, '2024': 1}
+    assert index.facets('tier') == {'p1': 2, 'p2': 1}
+    assert index.facets('labels') == {'llm': 2, 'agents': 1}
+
+
+def test_queries_and_facets():
+    check_queries(MetadataIndex.build(ENTRIES))
+
+
+def test_snapshot(tmp_path):
+    library = PaperLibrary(tmp_path / 'library')
+    for entry in ENTRIES:
+        library.save(entry)
+    # an index built right after a save is rebuilt on the next open, it may have missed one.
+    assert not MetadataIndex.open(library, tmp_path / 'index').is_current(library)
+    os.utime(library.root, ns=(time.time_ns() - 60 * 10 ** 9,) * 2)
+
+    index = MetadataIndex.open(library, tmp_path / 'index')
+    loaded = MetadataIndex.open(library, tmp_path / 'index')
+    assert isinstance(loaded['hf_upvotes'], np.memmap)
+    assert sorted(loaded.paper_id(row) for row in range(len(loaded))) == sorted(str(e.paper.id) for e in ENTRIES)
+    check_queries(loaded)
+
+    # a library change triggers a rebuild.
+    library.save(make_entry('Eta', datetime(2025, 1, 1), ['cs.CL'], upvotes=70, stars=5))
+    assert len(MetadataIndex.open(library, tmp_path / 'index')) == len(index) + 1
+
+
+def test_empty():
+    index = MetadataIndex.build([])
+    assert len(index.query(categories=['cs.CL'], sort_by='github_stars')) == 0
+    assert index.facets('categories') == {}
@@ -0,0 +1,66 @@
+# coding=utf-8
+import fitz
+
+from pageleaf.engine.outline import build_outline
+from pageleaf.schemas.io.pdf import PdfDocument
+from pageleaf.storage.documents import ParsedDocumentStore
+
+BODY = 'We study sparse attention for long documents and report results on several benchmarks. ' * 4
+
+
+def write_pdf(path):
+    doc = fitz.open()
+    headings = [
+        ('A Study of Sparse Attention', 18, 1),
+        ('Abstract', 12, 1),
+        ('1 Introduction', 12, 1),
+        ('2 Method', 12, 1),
+        ('2.1 Architecture', 10.5, 2),
+        ('2.2 Training', 10.5, 2),
+        ('3 Experiments', 12, 1),
+        ('References', 12, 1),
+    ]
+    for i, (title, size, _) in enumerate(headings):
+        page = doc.new_page() if i % 4 == 0 else doc[-1]
+        y = 72 + (i % 4) * 170
+        page.insert_text((72, y), title, fontsize=size, fontname='hebo' if i else 'helv')
+        page.insert_textbox(fitz.Rect(72, y + 10, 540, y + 160), BODY * 2, fontsize=10, fontname='tiro')
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def test_outline_levels(tmp_path):
+    doc = PdfDocument.load_file(str(write_pdf(tmp_path / 'paper.pdf')))
+    outline = build_outline(doc)
+
+    assert outline.body_font_size == 10.0
+    assert [(s.title, s.level) for s in outline.sections] == [
+        ('Abstract', 1), ('1 Introduction', 1), ('2 Method', 1), ('3 Experiments', 1), ('References', 1)]
+    method = outline.find('method')
+    assert [s.title for s in method.children] == ['2.1 Architecture', '2.2 Training']
+    assert method.page_number == 1
+
+    spans = {s.title: (start, end) for s, start, end in outline.spans()}
+    assert spans['2 Method'][1] == outline.find('Experiments').anchor
+    assert spans['2.2 Training'][1] == outline.find('Experiments').anchor
+    assert spans['References'][1] is None
+    assert outline.render().splitlines()[3] == '  2.1 Architecture'
+
+    # cached on the document.
+    assert build_outline(doc) is outline
+
+
+def test_parsed_document_store(tmp_path):
+    pdf_file = write_pdf(tmp_path / 'paper.pdf')
+    store = ParsedDocumentStore(tmp_path / 'parsed')
+
+    doc = store.load(pdf_file)
+    assert doc.outline is not None
+    assert len(doc.pages) == 2
+
+    pdf_hash = next(store.root.iterdir()).name
+    assert store.exists(pdf_hash)
+    cached = store.load(pdf_file)
+    assert cached.model_dump() == doc.model_dump()
+    assert cached.outline.find('References') is not None
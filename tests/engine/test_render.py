@@ -0,0 +1,51 @@
+# coding=utf-8
+import fitz
+
+from pageleaf.engine.render import PageRenderer
+from pageleaf.schemas.io.pdf import PdfDocument
+from pageleaf.storage.render_cache import RenderCache
+
+
+def write_pdf(path, n_pages=3):
+    doc = fitz.open()
+    pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 64, 64), False)
+    pixmap.set_rect(pixmap.irect, (200, 30, 30))
+    for i in range(n_pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f'Page {i + 1}', fontsize=20)
+        page.insert_image(fitz.Rect(72, 100, 272, 300), pixmap=pixmap)
+    doc.save(path)
+    return path
+
+
+def test_thumbnails_and_figures(tmp_path):
+    pdf_file = write_pdf(tmp_path / 'paper.pdf')
+    cache = RenderCache(tmp_path / 'cache')
+    renderer = PageRenderer(cache, max_workers=0)
+
+    png = renderer.thumbnail(pdf_file, 1, dpi=36)
+    assert png.startswith(b'\x89PNG')
+    assert len(cache) == 1
+    assert renderer.thumbnail(pdf_file, 1, dpi=36) == png
+    assert renderer.thumbnail(pdf_file, 9) is None
+
+    image_block = next(b for b in PdfDocument.load_file(str(pdf_file)).pages[0].blocks if b.is_image())
+    crop = renderer.figure(pdf_file, image_block, dpi=72)
+    assert fitz.Pixmap(crop).width == 200
+
+    # pages past the end are skipped.
+    assert renderer.prefetch([pdf_file], n_pages=5, dpi=36) == 3
+    assert len(RenderCache(tmp_path / 'cache')) == 4
+
+
+def test_lru_eviction(tmp_path):
+    cache = RenderCache(tmp_path / 'cache', max_bytes=250)
+    for key in ['aa1', 'aa2', 'bb3']:
+        cache.put(key, b'x' * 100)
+    assert 'aa1' not in cache and not cache.path_for('aa1').exists()
+
+    # aa2 becomes the most recently used, bb3 goes next.
+    assert cache.get('aa2') == b'x' * 100
+    cache.put('cc4', b'y' * 100)
+    assert sorted(cache._entries) == ['aa2', 'cc4']
+    assert cache.total_bytes == 200
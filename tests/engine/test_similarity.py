@@ -0,0 +1,50 @@
+# coding=utf-8
+import numpy as np
+
+from pageleaf.engine.similarity import SimilarityIndex, tokenize
+
+PAPERS = {
+    'a': 'Sparse attention for efficient long context language models',
+    'b': 'Efficient sparse attention kernels for long context transformers',
+    'c': 'Diffusion models for high resolution image generation',
+    'd': 'Image generation with latent diffusion and classifier free guidance',
+}
+
+
+def test_tokenize():
+    assert tokenize('The Sparse Attention of LLMs') == ['sparse', 'attention', 'llms', 'sparse attention', 'attention llms']
+
+
+def test_index_queries_and_reopen(tmp_path):
+    index = SimilarityIndex(tmp_path / 'index', n_features=512)
+    assert index.add((paper_id, [(text, 1.0)]) for paper_id, text in PAPERS.items()) == 4
+    assert len(index) == 4
+
+    neighbours = dict(index.most_similar(k=1))
+    assert neighbours['a'][0][0] == 'b'
+    assert neighbours['c'][0][0] == 'd'
+    assert index.query([('latent diffusion image', 1.0)], k=2)[0][0] in {'c', 'd'}
+
+    # incremental add and in-place update, then reopen from disk.
+    index.add([('e', [('Long context sparse attention at scale', 1.0)]),
+               ('a', [('Latent diffusion for image generation', 1.0)])])
+    reopened = SimilarityIndex(tmp_path / 'index')
+    assert reopened.ids == ['a', 'b', 'c', 'd', 'e']
+    assert isinstance(reopened.vectors, np.memmap)
+    assert np.array_equal(reopened.df, index.df)
+    neighbours = dict(reopened.most_similar(['a', 'e'], k=1))
+    assert neighbours['a'][0][0] in {'c', 'd'}
+    assert neighbours['e'][0][0] == 'b'
+
+
+def test_add_same_paper_twice_in_a_batch(tmp_path):
+    index = SimilarityIndex(tmp_path / 'index', n_features=512)
+    # a new paper twice, the last fields win.
+    assert index.add([('a', [(PAPERS['a'], 1.0)]), ('b', [(PAPERS['b'], 1.0)]),
+                      ('a', [(PAPERS['c'], 1.0)])]) == 2
+    # a known one twice.
+    index.add([('b', [(PAPERS['d'], 1.0)]), ('b', [(PAPERS['b'], 1.0)])])
+    assert index.ids == ['a', 'b']
+    expected = np.stack([index.vectorizer.transform([(PAPERS[key], 1.0)]) for key in 'cb'])
+    assert np.array_equal(SimilarityIndex(tmp_path / 'index').vectors, expected)
+    assert np.array_equal(index.df, np.count_nonzero(expected, axis=0))
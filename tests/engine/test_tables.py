@@ -0,0 +1,97 @@
+# coding=utf-8
+import fitz
+
+from pageleaf.engine.tables import page_signals, TableExtractor, TableGate
+from pageleaf.schemas.io.pdf import PdfDocument
+from pageleaf.storage.documents import ParsedDocumentStore
+
+BODY = 'We study sparse attention for long documents and report results on several benchmarks. ' * 6
+ROWS = [['Model', 'Params', 'Accuracy'], ['Dense', '7B', '61.2'], ['Sparse', '7B', '63.8'], ['Hybrid', '13B', '66.1']]
+
+
+def draw_table(page, top: float, grid: bool):
+    x0, x1, row_h, col_w = 72, 372, 16, 100
+    for r in range(len(ROWS) + 1):
+        if grid or r in (0, 1, len(ROWS)):
+            page.draw_line((x0, top + r * row_h), (x1, top + r * row_h), width=0.8)
+    if grid:
+        for c in range(len(ROWS[0]) + 1):
+            page.draw_line((x0 + c * col_w, top), (x0 + c * col_w, top + len(ROWS) * row_h), width=0.8)
+    for r, row in enumerate(ROWS):
+        for c, text in enumerate(row):
+            page.insert_text((x0 + c * col_w + 4, top + r * row_h + 12), text, fontsize=9, fontname='tiro')
+
+
+def write_pdf(path):
+    doc = fitz.open()
+    # booktabs: a caption, three horizontal rules, columns from the text.
+    page = doc.new_page()
+    page.insert_textbox(fitz.Rect(72, 72, 540, 250), BODY, fontsize=10, fontname='tiro')
+    page.insert_text((72, 300), 'Table 1: Accuracy on long-context benchmarks.', fontsize=9, fontname='tiro')
+    draw_table(page, 310, grid=False)
+    # text only.
+    page = doc.new_page()
+    page.insert_textbox(fitz.Rect(72, 72, 540, 400), BODY * 2, fontsize=10, fontname='tiro')
+    # a full grid without a caption.
+    page = doc.new_page()
+    draw_table(page, 100, grid=True)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def test_gate(tmp_path):
+    pdf_file = write_pdf(tmp_path / 'paper.pdf')
+    parsed = {page.page_number: page for page in PdfDocument.load_file(str(pdf_file)).pages}
+    gate = TableGate()
+    with fitz.open(pdf_file) as doc:
+        signals = [page_signals(page, parsed.get(page.number + 1)) for page in doc]
+    assert [(s.h_rules, s.v_rules, s.caption) for s in signals] == [(3, 0, True), (0, 0, False), (5, 4, False)]
+    # the rows of cells of the grid are what get its vector paths read without a caption.
+    assert [s.grid_rows for s in signals] == [4, 0, 4]
+    with fitz.open(pdf_file) as doc:
+        assert page_signals(doc[2], parsed[3], min_grid_rows=5).v_rules == 0
+    assert [gate.passes(s) for s in signals] == [True, False, True]
+    # no caption and no vertical rules.
+    assert not gate.passes(signals[0].model_copy(update={'caption': False}))
+
+
+def test_extract_tables(tmp_path):
+    pdf_file = write_pdf(tmp_path / 'paper.pdf')
+    parsed = {page.page_number: page for page in PdfDocument.load_file(str(pdf_file)).pages}
+    extractor = TableExtractor()
+    with fitz.open(pdf_file) as doc:
+        pages = extractor.extract(doc, parsed)
+
+    assert [(p.candidate, len(p.tables)) for p in pages.values()] == [(True, 1), (False, 0), (True, 1)]
+    assert extractor.stats.candidates == 2 and extractor.stats.tables == 2
+    for page_number in (1, 3):
+        table = pages[page_number].tables[0]
+        assert (table.n_rows, table.n_cols) == (4, 3)
+        assert table.rows() == ROWS
+        assert table.header == ROWS[0]
+        cell = next(cell for cell in table.cells if cell.text == '63.8')
+        assert (cell.row, cell.col) == (2, 2)
+        assert fitz.Rect(table.bbox).contains(fitz.Rect(cell.bbox))
+    assert pages[1].tables[0].caption.startswith('Table 1:')
+    assert pages[3].tables[0].caption is None
+    assert pages[1].tables[0].to_markdown().splitlines()[:2] == ['| Model | Params | Accuracy |', '|---|---|---|']
+
+
+def test_cached_tables(tmp_path):
+    pdf_file = write_pdf(tmp_path / 'paper.pdf')
+    store = ParsedDocumentStore(tmp_path / 'parsed')
+    pages = store.load_tables(pdf_file, pdf_hash='abc', pages=[1, 2])
+    assert sorted(pages) == [1, 2] and store.tables.stats.pages == 2
+    assert store.tables_path('abc').read_bytes()[:3] == b'PLZ'
+
+    # cached pages, negatives included, are not examined again; new pages are added.
+    pages = store.load_tables(pdf_file, pdf_hash='abc')
+    assert store.tables.stats.pages == 3
+    assert [len(p.tables) for p in pages.values()] == [1, 0, 1]
+    assert sorted(store.get_tables('abc')) == [1, 2, 3]
+    store.load_tables(pdf_file, pdf_hash='abc', pages=[2, 3])
+    assert store.tables.stats.pages == 3
+
+    assert store.load_tables(pdf_file, pdf_hash='abc', refresh=True)[1].tables[0].rows() == ROWS
+    assert store.tables.stats.pages == 6
@@ -0,0 +1,78 @@
+# coding=utf-8
+from pathlib import Path
+
+import fitz
+import pytest
+
+from pageleaf.commons.io.files import json_dump, json_load
+from pageleaf.fetchers.arxiv_pdf import ArxivPdfFetcher
+from pageleaf.fetchers.manager import FetcherManager
+from pageleaf.fetchers.stub import StubFaults, StubServer, stub_config, stub_paper
+from pageleaf.ingest.arxiv_ingesters import ArxivIngester
+from pageleaf.pipelines.loadtest import run_load_test
+from pageleaf.storage.library import PaperLibrary
+
+
+@pytest.fixture
+def stub():
+    server = StubServer().start()
+    yield server
+    server.stop()
+
+
+def test_manager_against_stub(stub, tmp_path):
+    manager = FetcherManager(stub_config(stub.url, tmp_path, show_progress=False))
+    results = manager.fetch('https://arxiv.org/abs/2501.00042')
+
+    assert set(results) == {'arxiv_api', 'huggingface', 'arxiv'}
+    title = stub_paper('2501.00042')['title']
+    assert results['arxiv_api'].payload['data']['title'] == title
+    assert results['huggingface'].payload['data']['title'] == title
+    pdf_path = results['arxiv'].payload['pdf_path']
+    assert title in pdf_path
+    with fitz.open(pdf_path) as doc:
+        assert doc.page_count == 4
+    assert json_load(tmp_path / 'hf' / '2501' / '2501.00042.json')['id'] == '2501.00042'
+    assert manager.fetched_path('2501.00042').exists()
+
+    # an ingest during a migration: files already in their shard, the results not yet rewritten.
+    fetched = json_load(manager.fetched_path('2501.00042'))
+    for raw in fetched.values():
+        for key in ('pdf_path', 'json_path'):
+            if raw['payload'].get(key):
+                path = Path(raw['payload'][key])
+                raw['payload'][key] = str(path.parent.parent / path.name)
+    json_dump(fetched, tmp_path / 'fetched' / '2501.00042.json')
+    entry = ArxivIngester(PaperLibrary(tmp_path / 'library')).ingest(tmp_path / 'fetched' / '2501.00042.json')
+    assert entry.pdf_path == pdf_path and entry.paper.metadata.title == title
+
+
+def test_throttled_and_truncated_downloads(tmp_path):
+    config = stub_config('', tmp_path, max_retries=3, retry_cap=0.5, show_progress=False)
+
+    with StubServer(faults=StubFaults(truncate_rate=1.0, seed=1)) as stub:
+        fetcher = ArxivPdfFetcher(config.model_copy(update={'arxiv_pdf_url': f'{stub.url}/arxiv/pdf',
+                                                            'retry_cap': 0.01}))
+        assert fetcher.fetch('2501.00001') is None
+        assert stub.stats['truncated'] == 4
+    # a broken download leaves nothing behind.
+    assert list((tmp_path / 'arxiv' / '2501').iterdir()) == []
+
+    # 5 requests per second: the burst is spent after 5 papers, later ones wait for Retry-After.
+    with StubServer(faults=StubFaults(rate_limit=5, retry_after=0.25)) as stub:
+        fetcher = ArxivPdfFetcher(config.model_copy(update={'arxiv_pdf_url': f'{stub.url}/arxiv/pdf'}))
+        assert all(fetcher.fetch(f'2501.{i:05d}') is not None for i in range(1, 9))
+        assert stub.stats['throttled'] >= 1
+    assert len(list((tmp_path / 'arxiv' / '2501').glob('*.pdf'))) == 8
+
+
+def test_load_test():
+    faults = StubFaults(latency_ms=5, jitter_ms=5, error_rate=0.1, truncate_rate=0.05, retry_after=0.01, seed=1)
+    report = run_load_test(20, 4, faults, retry_cap=0.05)
+
+    assert report.papers == 20 and report.throughput > 0
+    assert set(report.latency_ms) == {'p50', 'p90', 'p99', 'max'}
+    assert report.latency_ms['p50'] <= report.latency_ms['p99'] <= report.latency_ms['max']
+    assert report.server['throttled'] > 0 and report.server['arxiv_pdf'] >= 20
+    assert report.complete + max(report.failures.values(), default=0) <= 20
+    assert 'papers/s' in report.render()
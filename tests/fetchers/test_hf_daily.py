@@ -0,0 +1,98 @@
+# coding=utf-8
+import json
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from uuid import uuid4
+
+import pytest
+
+from pageleaf.commons.io.files import json_load
+from pageleaf.fetchers.hf_daily import HuggingFaceDailyFetcher, mark_candidates
+from pageleaf.schemas.paper import Content, ExternalIdentifiers, Metadata, Paper, PaperAnalysis, PaperEntry, Tier
+from pageleaf.storage.library import PaperLibrary
+
+FEEDS = {
+    '2025-01-01': [{'id': f'2501.{i:05d}', 'title': f'Paper {i}', 'upvotes': i} for i in range(150)],
+    '2025-01-02': [],
+    '2025-01-03': [{'id': '2501.00120', 'title': 'Paper 120', 'upvotes': 130, 'githubRepo': 'https://x/y'}],
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    requests = []
+    throttle = 1
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        StubHandler.requests.append(params)
+        if StubHandler.throttle:
+            StubHandler.throttle -= 1
+            self.send_response(429)
+            self.send_header('Retry-After', '0')
+            self.end_headers()
+            return
+        if url.path != '/api/daily_papers':
+            self.send_error(404)
+            return
+        limit, page = int(params['limit']), int(params['p'])
+        papers = FEEDS.get(params['date'], [])[page * limit:(page + 1) * limit]
+        body = json.dumps([{'paper': paper, 'title': paper['title']} for paper in papers]).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/api'
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_range(stub_url, tmp_path):
+    StubHandler.requests, StubHandler.throttle = [], 1
+    fetcher = HuggingFaceDailyFetcher(stub_url, tmp_path / 'hf', min_upvotes=100)
+    result = fetcher.fetch_range(date(2025, 1, 1), date(2025, 1, 3))
+
+    # 2 pages, 1 empty day, 1 small day, 1 throttled retry.
+    assert result.requests == len(StubHandler.requests) == 5
+    assert (result.days, result.papers) == (3, 151)
+    assert [c.arxiv_id for c in result.candidates[:2]] == ['2501.00149', '2501.00148']
+    assert len(result.candidates) == 50
+    assert next(c for c in result.candidates if c.arxiv_id == '2501.00120').upvotes == 130
+
+    cached = json_load(tmp_path / 'hf' / '2501' / '2501.00120.json')
+    assert cached['upvotes'] == 130 and cached['githubRepo'] == 'https://x/y' and cached['ai_summary'] is None
+    assert len(json_load(fetcher.candidates_path)) == 50
+
+    # settled days come from the cache.
+    assert fetcher.fetch_range(date(2025, 1, 1), date(2025, 1, 3)).requests == 0
+
+
+def test_mark_candidates(stub_url, tmp_path):
+    StubHandler.requests, StubHandler.throttle = [], 0
+    result = HuggingFaceDailyFetcher(stub_url, tmp_path / 'hf').fetch_range(date(2025, 1, 3))
+
+    library = PaperLibrary(tmp_path / 'library')
+    ids = ExternalIdentifiers(arxiv='2501.00120')
+    metadata = Metadata(title='Paper 120', abstract='', venue='arxiv', paper_type='preprint', source='arxiv',
+                        external_ids=ids)
+    entry = PaperEntry(paper=Paper(id=uuid4(), identifiers=ids, metadata=metadata,
+                                   content=Content(abstract=None, outline=None), analysis=PaperAnalysis()))
+    library.save(entry)
+
+    assert mark_candidates(library, result.candidates) == 1
+    engagement = library.get(entry.paper.id).engagement
+    assert engagement.tier == Tier.P1 and '130 upvotes' in engagement.entry_reason
+    assert mark_candidates(library, result.candidates) == 0
@@ -0,0 +1,94 @@
+# coding=utf-8
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from pageleaf.fetchers.base import RawPaperData
+from pageleaf.fetchers.manager import FetcherManager
+from pageleaf.fetchers.registry import BUILTIN_SPECS, FetcherRegistry, FetcherSpec, FetchPlan
+from pageleaf.fetchers.stub import StubServer, stub_config, stub_paper
+
+PLUGIN = '''
+from pageleaf.fetchers.base import BaseFetcher, RawPaperData
+
+
+class ReviewFetcher(BaseFetcher):
+    source = 'reviews'
+    priority = 50
+
+    def __init__(self, config):
+        self.config = config
+
+    def can_handle(self, identifier):
+        return True
+
+    def fetch(self, identifier):
+        return None
+
+    def fetch_with(self, identifier, inputs):
+        return RawPaperData(source=self.source, external_ids={'arxiv': identifier}, payload={'data': {'forum': inputs['title']}})
+'''
+
+SPECS = '''
+from pageleaf.fetchers.registry import ARXIV_PATTERN, FetcherSpec
+
+SPEC = FetcherSpec(source='reviews', target='review_plugin:ReviewFetcher', pattern=ARXIV_PATTERN, needs=['title'])
+'''
+
+
+def raw(source: str, title: str | None) -> RawPaperData:
+    return RawPaperData(source=source, payload={'data': {'title': title}})
+
+
+def test_routing_imports_nothing():
+    code = textwrap.dedent('''
+        import sys, tempfile
+        from pageleaf.fetchers.manager import FetcherManager
+        from pageleaf.fetchers.stub import stub_config
+        manager = FetcherManager(stub_config('http://localhost', tempfile.mkdtemp()))
+        manager.registry.route('2501.00042')
+        print(manager.sources, [m for m in ('arxiv', 'pageleaf.fetchers.arxiv_meta') if m in sys.modules])
+    ''')
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert out.strip().splitlines()[-1] == "['arxiv_api', 'huggingface', 'arxiv'] []"
+
+
+def test_fetch_plan():
+    plan = FetcherRegistry(BUILTIN_SPECS).route('https://arxiv.org/abs/2501.00042')
+    pdf = plan.specs[-1]
+    assert [spec.source for spec in plan.specs] == ['arxiv_api', 'huggingface', 'arxiv']
+    assert plan.depends_on(pdf) == {'arxiv_api', 'huggingface'}
+    assert FetcherRegistry(BUILTIN_SPECS).route('not a paper').specs == []
+
+    # the PDF waits for the metadata; the first title settles it, a missing one falls back to HF.
+    assert plan.inputs(pdf, {'huggingface': raw('huggingface', 'From HF')}) is None
+    assert plan.inputs(pdf, {'arxiv_api': raw('arxiv_api', 'From arXiv')}) == {'title': 'From arXiv'}
+    assert plan.inputs(pdf, {'arxiv_api': None}) is None
+    assert plan.inputs(pdf, {'arxiv_api': None, 'huggingface': raw('huggingface', 'From HF')}) == {'title': 'From HF'}
+    assert plan.inputs(pdf, {'arxiv_api': None, 'huggingface': None}) == {'title': None}
+
+    with pytest.raises(ValueError):
+        FetchPlan([FetcherSpec(source='a', target='m:A', pattern='', needs=['x'], provides=['y']),
+                   FetcherSpec(source='b', target='m:B', pattern='', needs=['y'], provides=['x'])])
+
+
+def test_entry_point_plugin(tmp_path, monkeypatch):
+    (tmp_path / 'review_plugin.py').write_text(PLUGIN)
+    (tmp_path / 'review_specs.py').write_text(SPECS)
+    dist_info = tmp_path / 'review_plugin-0.1.dist-info'
+    dist_info.mkdir()
+    (dist_info / 'METADATA').write_text('Metadata-Version: 2.1\nName: review-plugin\nVersion: 0.1\n')
+    (dist_info / 'entry_points.txt').write_text('[pageleaf.fetchers]\nreviews = review_specs:SPEC\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    registry = FetcherRegistry.default()
+    assert registry.sources() == ['arxiv_api', 'huggingface', 'reviews', 'arxiv']
+    assert 'review_plugin' not in sys.modules
+
+    with StubServer() as stub:
+        manager = FetcherManager(stub_config(stub.url, tmp_path / 'data', show_progress=False), registry)
+        results = manager.fetch('2501.00042')
+    assert list(results) == ['arxiv_api', 'huggingface', 'reviews', 'arxiv']
+    assert results['reviews'].payload['data']['forum'] == stub_paper('2501.00042')['title']
@@ -0,0 +1,142 @@
+# coding=utf-8
+import json
+import shutil
+from uuid import uuid4
+
+import fitz
+
+from pageleaf.commons.io.codecs import codec_of
+from pageleaf.ingest.local_ingesters import LocalPdfImporter, sniff_pdf
+from pageleaf.schemas.paper import Content, ExternalIdentifiers, Metadata, Paper, PaperAnalysis, PaperEntry
+from pageleaf.storage.documents import ParsedDocumentStore
+from pageleaf.storage.library import PaperLibrary
+
+
+def write_paper(path, title, arxiv_id=None):
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 80), title, fontsize=18)
+    if arxiv_id:
+        page.insert_text((72, 110), f'arXiv:{arxiv_id}v2 [cs.CL] 3 Jan 2025', fontsize=9)
+    page.insert_text((72, 150), 'Abstract', fontsize=12)
+    page.insert_text((72, 170), 'We study small things with large models.', fontsize=10)
+    page.insert_text((72, 210), '1 Introduction', fontsize=12)
+    page.insert_text((72, 230), 'Models are large and things are small.', fontsize=10)
+    doc.save(path)
+    return path
+
+
+def test_sniff_pdf(tmp_path):
+    info = sniff_pdf(str(write_paper(tmp_path / 'a.pdf', 'Small Things', '2501.01234')))
+    assert info.arxiv_id == '2501.01234'
+    assert info.title == 'Small Things'
+    assert len(info.pdf_hash) == 64
+
+
+def test_import_folder(tmp_path):
+    folder = tmp_path / 'pdfs'
+    (folder / 'sub').mkdir(parents=True)
+    write_paper(folder / 'a.pdf', 'Small Things', '2501.01234')
+    write_paper(folder / 'sub' / 'b.pdf', 'Large Models')
+    shutil.copy(folder / 'a.pdf', folder / 'a copy.pdf')
+    (folder / 'broken.pdf').write_bytes(b'not a pdf')
+
+    library = PaperLibrary(tmp_path / 'library')
+    importer = LocalPdfImporter(library, ParsedDocumentStore(tmp_path / 'parsed'), max_workers=0,
+                                journal_dir=tmp_path / 'journal')
+    report = importer.run(folder)
+    assert (report.imported, report.duplicates, report.failed, report.skipped) == (2, 1, 1, 0)
+
+    entry = library.find(arxiv='2501.01234')
+    assert entry.paper.metadata.source == 'local'
+    assert entry.paper.metadata.title == 'Small Things'
+    assert entry.pdf_hash and importer.documents.exists(entry.pdf_hash)
+
+    # a rerun skips the files done before and retries the failed one, a new file is picked up.
+    write_paper(folder / 'c.pdf', 'Small Things')
+    report = importer.run(folder)
+    assert (report.imported, report.duplicates, report.failed, report.skipped) == (0, 1, 1, 3)
+
+    records = importer.read_journal(importer.journal_path(folder.resolve()))
+    assert records[str(folder.resolve() / 'c.pdf')]['duplicate_of'] == 'title:small things'
+
+
+def test_import_in_worker_processes(tmp_path):
+    folder = tmp_path / 'pdfs'
+    folder.mkdir()
+    write_paper(folder / 'a.pdf', 'Small Things', '2501.01234')
+    write_paper(folder / 'b.pdf', 'Large Models')
+
+    # workers write with the importer's store settings, not the defaults.
+    documents = ParsedDocumentStore(tmp_path / 'parsed', reading_order=False, codec='none')
+    importer = LocalPdfImporter(PaperLibrary(tmp_path / 'library'), documents, max_workers=2,
+                                journal_dir=tmp_path / 'journal')
+    report = importer.run(folder)
+    assert (report.imported, report.failed) == (2, 0)
+    for entry in importer.library:
+        assert entry.paper.content.outline
+        assert codec_of(documents.document_path(entry.pdf_hash)) == 'none'
+
+
+ABSTRACT = ('We study sparse attention for long documents and show that a learned routing scheme reduces memory '
+            'while matching dense attention on long context benchmarks for summarization and question answering.')
+
+
+def test_near_duplicates(tmp_path):
+    library = PaperLibrary(tmp_path / 'library')
+    ids = ExternalIdentifiers(arxiv='2501.04321')
+    metadata = Metadata(title='Sparse Routing Attention for Long Documents', abstract=ABSTRACT, venue='arxiv',
+                        paper_type='preprint', source='arxiv', external_ids=ids)
+    preprint = PaperEntry(paper=Paper(id=uuid4(), identifiers=ids, metadata=metadata,
+                                      content=Content(abstract=ABSTRACT, outline=None), analysis=PaperAnalysis()))
+    library.save(preprint)
+
+    # the camera-ready version: new title casing, authors, a reworded abstract and no arXiv stamp.
+    folder = tmp_path / 'pdfs'
+    folder.mkdir()
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 80), 'Sparse Routing Attention for Long Documents (Camera Ready)', fontsize=16)
+    page.insert_text((72, 110), 'Jane Doe, John Roe - University of Somewhere', fontsize=10)
+    page.insert_textbox(fitz.Rect(72, 140, 540, 300), ABSTRACT.replace('benchmarks', 'tasks'), fontsize=10)
+    page.insert_text((72, 320), '1 Introduction', fontsize=12)
+    doc.save(folder / 'camera-ready.pdf')
+
+    importer = LocalPdfImporter(library, ParsedDocumentStore(tmp_path / 'parsed'), max_workers=0,
+                                journal_dir=tmp_path / 'journal')
+    report = importer.run(folder)
+    assert (report.imported, report.merged, report.duplicates) == (0, 1, 0)
+    merged = library.get(preprint.paper.id)
+    assert merged.pdf_path == str(folder / 'camera-ready.pdf') and importer.documents.exists(merged.pdf_hash)
+    assert len(library) == 1
+
+    # the paper has a PDF now, another copy that is only alike is imported and linked.
+    page.insert_text((72, 780), 'Preprint, under review.', fontsize=8)
+    doc.save(folder / 'renamed.pdf')
+    report = importer.run(folder)
+    assert (report.imported, report.merged, report.linked, report.duplicates) == (0, 0, 1, 0)
+    record = json.loads(importer.journal_path(folder.resolve()).read_text().splitlines()[-1])
+    assert record['near_duplicate_of'] == str(preprint.paper.id)
+    copy = library.get(record['paper_id'])
+    assert copy.paper_relations.duplicates == [preprint.paper.id]
+    assert library.get(preprint.paper.id).paper_relations.duplicates == [copy.paper.id]
+
+
+def test_template_papers_are_not_duplicates(tmp_path):
+    # one template, one abstract, six papers: the arXiv stamps tell them apart.
+    folder = tmp_path / 'pdfs'
+    folder.mkdir()
+    for i in range(6):
+        doc = fitz.open()
+        page = doc.new_page()
+        page.insert_text((72, 80), f'Sparse Routing Attention, Part {i}', fontsize=16)
+        page.insert_text((72, 110), f'arXiv:2501.0{i}001v1 [cs.CL] 3 Jan 2025', fontsize=9)
+        page.insert_textbox(fitz.Rect(72, 140, 540, 300), ABSTRACT, fontsize=10)
+        doc.save(folder / f'{i}.pdf')
+
+    library = PaperLibrary(tmp_path / 'library')
+    importer = LocalPdfImporter(library, ParsedDocumentStore(tmp_path / 'parsed'), max_workers=0,
+                                journal_dir=tmp_path / 'journal')
+    report = importer.run(folder)
+    assert (report.imported, report.linked, report.duplicates) == (6, 0, 0)
+    assert len(library) == 6
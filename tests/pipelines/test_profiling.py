@@ -0,0 +1,46 @@
+# coding=utf-8
+import fitz
+from pydantic import BaseModel
+
+from pageleaf.pipelines.profiling import profile_pdf, stage_profiler
+from pageleaf.schemas.io import pdf
+
+
+def write_pdf(path):
+    doc = fitz.open()
+    for i in range(3):
+        page = doc.new_page()
+        page.insert_text((72, 72), f'{i + 1} Section', fontsize=12, fontname='hebo')
+        page.insert_textbox(fitz.Rect(72, 90, 540, 400), 'Profiling a small paper. ' * 40, fontsize=10)
+        pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 32, 32), False)
+        pixmap.clear_with(128)
+        page.insert_image(fitz.Rect(72, 420, 200, 548), pixmap=pixmap)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def test_profile_pdf(tmp_path):
+    report = profile_pdf(write_pdf(tmp_path / 'paper.pdf'), top=5, pstats_file=tmp_path / 'parse.pstats')
+
+    assert report.pages == 3
+    stages = {s.stage: s for s in report.stages}
+    assert {'get_text', 'validate', 'images', 'text', 'layout', 'store', 'other'} <= set(stages)
+    assert stages['get_text'].calls == 3 and stages['images'].calls == 3
+    assert abs(sum(s.share for s in report.stages) - 1) < 1e-6
+    assert stages['validate'].peak_mb is not None
+    assert (tmp_path / 'parse.pstats').stat().st_size > 0
+    assert 'get_text' in report.render()
+    # folded stacks: `frame;frame count` lines.
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in report.folded.splitlines())
+
+
+def test_originals_restored():
+    def current():
+        return [fitz.Page.get_text, pdf.rename_keys, pdf.save_image_block, pdf.PdfLine.__dict__['text'],
+                BaseModel.__dict__['model_validate']]
+
+    originals = current()
+    with stage_profiler().active(memory=True):
+        assert all(patched is not original for patched, original in zip(current(), originals))
+    assert current() == originals
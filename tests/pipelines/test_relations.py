@@ -0,0 +1,55 @@
+# coding=utf-8
+from uuid import uuid4
+
+from pageleaf.engine.similarity import SimilarityIndex
+from pageleaf.pipelines.relations import update_duplicates, update_related
+from pageleaf.schemas.paper import (Content, ExternalIdentifiers, Metadata, Paper, PaperAnalysis, PaperEntry)
+from pageleaf.storage.library import PaperLibrary
+
+
+def make_entry(title, abstract='', arxiv=None, keywords=()):
+    ids = ExternalIdentifiers(arxiv=arxiv)
+    metadata = Metadata(title=title, abstract=abstract, venue='arxiv', paper_type='preprint', source='arxiv',
+                        hf_ai_keywords=list(keywords), external_ids=ids)
+    paper = Paper(id=uuid4(), identifiers=ids, metadata=metadata,
+                  content=Content(abstract=abstract, outline=None), analysis=PaperAnalysis())
+    return PaperEntry(paper=paper)
+
+
+def test_update_related(tmp_path):
+    library = PaperLibrary(tmp_path / 'library')
+    entries = [
+        make_entry('Sparse attention for long context', 'We make attention sparse.', '2501.00001', ['sparse attention']),
+        make_entry('Long context with sparse attention kernels', 'Fast kernels.', '2501.00002', ['sparse attention']),
+        make_entry('Latent diffusion for images', 'Image generation.', '2501.00003', ['diffusion']),
+    ]
+    for entry in entries:
+        library.save(entry)
+
+    index = SimilarityIndex(tmp_path / 'index', n_features=512)
+    assert update_related(library, index, k=1) == 2
+    first = library.get(entries[0].paper.id)
+    assert first.paper_relations.related == [entries[1].paper.id]
+    assert library.get(entries[2].paper.id).paper_relations is None
+
+    assert library.find(arxiv='2501.00003').paper.id == entries[2].paper.id
+    # nothing changed, nothing rewritten.
+    assert update_related(library, index, k=1) == 0
+
+
+def test_update_duplicates(tmp_path):
+    library = PaperLibrary(tmp_path / 'library')
+    abstract = 'We route tokens to a few experts and train a sparse model that matches a dense one at a third of the cost.'
+    entries = [
+        make_entry('Sparse mixture of experts at scale', abstract, '2501.00001'),
+        make_entry('Sparse Mixture-of-Experts at Scale', abstract.replace('third', 'quarter')),
+        make_entry('Latent diffusion for images', 'We generate images with diffusion in a latent space.'),
+    ]
+    for entry in entries:
+        library.save(entry)
+
+    assert update_duplicates(library) == 2
+    assert library.get(entries[0].paper.id).paper_relations.duplicates == [entries[1].paper.id]
+    assert library.get(entries[1].paper.id).paper_relations.duplicates == [entries[0].paper.id]
+    assert library.get(entries[2].paper.id).paper_relations is None
+    assert update_duplicates(library) == 0
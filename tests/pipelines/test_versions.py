@@ -0,0 +1,44 @@
+# coding=utf-8
+from pageleaf.fetchers.manager import FetcherManager
+from pageleaf.fetchers.stub import StubServer, stub_config
+from pageleaf.ingest.arxiv_ingesters import ArxivIngester
+from pageleaf.pipelines.versions import watch_versions
+from pageleaf.storage.documents import ParsedDocumentStore
+from pageleaf.storage.library import PaperLibrary
+
+IDS = ['2501.00011', '2501.00012', '2501.00013']
+
+
+def test_watch_versions(tmp_path):
+    library = PaperLibrary(tmp_path / 'library')
+    documents = ParsedDocumentStore(tmp_path / 'parsed')
+    with StubServer() as stub:
+        fetchers = FetcherManager(stub_config(stub.url, tmp_path / 'data', show_progress=False,
+                                              arxiv_delay_seconds=0))
+        ingester = ArxivIngester(library, documents)
+        for arxiv_id in IDS:
+            fetchers.fetch(arxiv_id)
+            ingester.ingest(fetchers.fetched_path(arxiv_id))
+        first = library.find(arxiv='2501.00012')
+        assert [(v.version, v.pdf_hash) for v in first.versions] == [(1, first.pdf_hash)]
+
+        stub.revise('2501.00012')
+        stub.stats.clear()
+        assert watch_versions(library, fetchers, documents, batch_size=2, dry_run=True).updated == ['2501.00012']
+        report = watch_versions(library, fetchers, documents, batch_size=2)
+        # two metadata requests for three papers, one PDF downloaded.
+        assert stub.stats['arxiv_api'] == 4 and stub.stats['arxiv_pdf'] == 1
+        assert report.requests == 2 and report.unchanged == 2 and report.updated == ['2501.00012']
+
+        entry = library.find(arxiv='2501.00012')
+        assert entry.paper.id == first.paper.id
+        assert [v.version for v in entry.versions] == [1, 2]
+        assert entry.versions[0].pdf_hash == first.pdf_hash != entry.pdf_hash == entry.versions[1].pdf_hash
+        assert entry.paper.metadata.update_date > first.paper.metadata.update_date
+        assert 'Revised version 2' in documents.get(entry.pdf_hash).pages[0].blocks[1].text
+        assert fetchers.fetcher('arxiv_api').cached('2501.00012')['short_id'] == '2501.00012v2'
+
+        # nothing new, nothing downloaded.
+        stub.stats.clear()
+        report = watch_versions(library, fetchers, documents, batch_size=2)
+        assert report.unchanged == 3 and not report.updated and stub.stats['arxiv_pdf'] == 0
@@ -0,0 +1,178 @@
+# coding=utf-8
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import fitz
+import pytest
+
+from pageleaf.engine.render import PageRenderer
+from pageleaf.server.client import DaemonError, PageleafClient
+from pageleaf.server.http import ApiServer
+from pageleaf.server.inbox import InboxWatcher
+from pageleaf.server.service import PageleafService
+from pageleaf.storage.documents import ParsedDocumentStore
+from pageleaf.storage.library import PaperLibrary
+from pageleaf.storage.render_cache import RenderCache
+
+
+def write_paper(path, title, arxiv_id):
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 80), title, fontsize=18)
+    page.insert_text((72, 110), f'arXiv:{arxiv_id}v1 [cs.CL] 3 Jan 2025', fontsize=9)
+    page.insert_text((72, 150), 'Models are large and things are small.', fontsize=10)
+    doc.save(path)
+    return path
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = PageleafService(PaperLibrary(tmp_path / 'library'), ParsedDocumentStore(tmp_path / 'parsed'),
+                              index_dir=tmp_path / 'index', import_workers=0,
+                              renderer=PageRenderer(RenderCache(tmp_path / 'render'), max_workers=0))
+    service.importer.journal_dir = tmp_path / 'journal'
+    yield service
+    service.close()
+
+
+@pytest.fixture
+def client(service, tmp_path):
+    server = ApiServer(service, port=0)
+    server.write_state(tmp_path / 'serve.json')
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield PageleafClient.discover(tmp_path / 'serve.json')
+    server.shutdown()
+    server.remove_state(tmp_path / 'serve.json')
+    server.server_close()
+
+
+def test_api(client, service, tmp_path):
+    assert client.health()['papers'] == 0
+    folder = tmp_path / 'pdfs'
+    folder.mkdir()
+    write_paper(folder / 'a.pdf', 'Small Things', '2501.01234')
+    write_paper(folder / 'b.pdf', 'Large Models', '2501.04321')
+    assert client.import_dir(folder)['imported'] == 2
+    # the first page of each new paper is rendered in the background.
+    assert wait_for(lambda: len(service.renderer.cache) == 2)
+
+    result = client.query(limit=10, facets=['year'])
+    assert result['total'] == 2
+    assert sorted(paper['title'] for paper in result['papers']) == ['Large Models', 'Small Things']
+
+    entry = client.find_arxiv('2501.01234')
+    paper_id = entry['paper']['id']
+    assert client.paper(paper_id)['paper']['metadata']['title'] == 'Small Things'
+    assert 'things are small' in client.page_text(paper_id, 1)
+    assert client.page_text(paper_id, 9) is None
+    assert client.find_arxiv('2501.99999') is None
+
+    with pytest.raises(DaemonError) as e:
+        client.query(colour='red')
+    assert e.value.status == 400
+    with pytest.raises(DaemonError) as e:
+        client.import_dir(folder, workers=-1)
+    assert e.value.status == 400
+    assert client.import_dir(folder, workers=1)['skipped'] == 2
+
+
+def test_api_refuses_foreign_requests(client, tmp_path):
+    assert os.stat(tmp_path / 'serve.json').st_mode & 0o777 == 0o600
+
+    def status(headers, data=None):
+        request = urllib.request.Request(client.url + '/health' if data is None else client.url + '/import',
+                                         data=data, headers=headers)
+        try:
+            with urllib.request.urlopen(request) as resp:
+                return resp.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    token = {'X-Pageleaf-Token': client.token}
+    assert status(token) == 200
+    assert status({}) == 401
+    assert status({'X-Pageleaf-Token': 'guess'}) == 401
+    # a DNS name rebound to 127.0.0.1 still sends its own Host.
+    assert status({**token, 'Host': 'evil.example:8765'}) == 403
+    # what a cross-site form can send.
+    body = b'path=/&pattern=*.pdf'
+    assert status({**token, 'Content-Type': 'application/x-www-form-urlencoded'}, body) == 415
+    assert status({**token, 'Content-Type': 'text/plain'}, b'{"path": "/"}') == 415
+
+
+def test_discover_without_daemon(tmp_path):
+    assert PageleafClient.discover(tmp_path / 'serve.json') is None
+    (tmp_path / 'serve.json').write_text(json.dumps({'url': 'http://127.0.0.1:9', 'pid': 0}))
+    assert PageleafClient.discover(tmp_path / 'serve.json') is None
+
+
+def test_inbox(service, tmp_path):
+    watcher = InboxWatcher(service, tmp_path / 'inbox', interval=0.01)
+    write_paper(tmp_path / 'inbox' / 'a.pdf', 'Small Things', '2501.01234')
+    (tmp_path / 'inbox' / 'broken.pdf').write_bytes(b'not a pdf')
+
+    # files must be unchanged over one poll.
+    assert watcher.poll() == 0
+    assert watcher.poll() == 2
+    assert (tmp_path / 'inbox' / 'done' / 'a.pdf').exists()
+    assert (tmp_path / 'inbox' / 'failed' / 'broken.pdf').exists()
+    entry = service.find('2501.01234')
+    assert Path(entry.pdf_path) == (tmp_path / 'inbox' / 'done' / 'a.pdf') and Path(entry.pdf_path).exists()
+    assert list((tmp_path / 'inbox' / 'batches').iterdir()) == [] and list((tmp_path / 'journal').iterdir()) == []
+    assert wait_for(lambda: len(service.renderer.cache) == 1)
+
+    (tmp_path / 'inbox' / 'ids.txt').write_text('# reading list\nhttps://arxiv.org/abs/2501.01234\nnot-an-id\n')
+    watcher.poll()
+    assert watcher.poll() == 1
+    result = json.loads((tmp_path / 'inbox' / 'done' / 'ids.result.json').read_text())
+    assert len(result['known']) == 1 and result['failed'] == ['not-an-id']
+
+
+def test_inbox_import_failure(service, tmp_path, monkeypatch):
+    watcher = InboxWatcher(service, tmp_path / 'inbox', interval=0.01)
+    write_paper(tmp_path / 'inbox' / 'a.pdf', 'Small Things', '2501.01234')
+
+    def broken(*args, **kwargs):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(service, 'import_dir', broken)
+    watcher.poll()
+    assert watcher.poll() == 1
+    assert (tmp_path / 'inbox' / 'failed' / 'a.pdf').exists()
+    assert list((tmp_path / 'inbox' / 'batches').iterdir()) == []
+
+
+def test_evicted_text_stays_open_while_read(tmp_path):
+    service = PageleafService(PaperLibrary(tmp_path / 'library'), ParsedDocumentStore(tmp_path / 'parsed'),
+                              index_dir=tmp_path / 'index', max_documents=1, import_workers=0,
+                              renderer=PageRenderer(RenderCache(tmp_path / 'render'), max_workers=0))
+    service.importer.journal_dir = tmp_path / 'journal'
+    folder = tmp_path / 'pdfs'
+    folder.mkdir()
+    write_paper(folder / 'a.pdf', 'Small Things', '2501.01234')
+    write_paper(folder / 'b.pdf', 'Large Models', '2501.04321')
+    service.import_dir(folder)
+    a, b = service.find('2501.01234'), service.find('2501.04321')
+
+    # a request still reading a's text while another one evicts it.
+    text = service._open_text(a.pdf_hash)
+    assert 'Large Models' in service.page_text(str(b.paper.id), 1)
+    assert 'Small Things' in text.page_text(1)
+    service._release_text(text)
+    with pytest.raises(ValueError):
+        text.page_text(1)
+    assert 'Small Things' in service.page_text(str(a.paper.id), 1)
+    service.close()
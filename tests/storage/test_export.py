@@ -0,0 +1,78 @@
+# coding=utf-8
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+from pageleaf.schemas.paper import (Content, ExternalIdentifiers, Metadata, Paper, PaperAnalysis, PaperEngagement,
+                                    PaperEntry, PaperRelations, Tier)
+from pageleaf.storage.export import (ColumnarReader, export_columnar, export_jsonl, export_library, import_library,
+                                     read_jsonl)
+from pageleaf.storage.library import PaperLibrary
+
+
+def make_entry(i):
+    ids = ExternalIdentifiers(arxiv=f'2501.{i:05d}')
+    metadata = Metadata(title=f'Paper «{i}»', abstract='line one\nline two', authors=['A. Author', 'B. Author'],
+                        publish_date=datetime(2025, 1, 1 + i % 28, 12, 30), venue='arxiv', paper_type='preprint',
+                        source='arxiv', categories=['cs.CL', 'cs.LG'], hf_upvotes=i, external_ids=ids)
+    paper = Paper(id=uuid4(), identifiers=ids, metadata=metadata,
+                  content=Content(abstract=None, outline='1 Intro', keywords=['k']), analysis=PaperAnalysis())
+    relations = PaperRelations(cites=[uuid4()]) if i % 2 else None
+    engagement = PaperEngagement(tier=Tier.P1, rating=4, labels=['x']) if i % 3 == 0 else None
+    return PaperEntry(paper=paper, paper_relations=relations, engagement=engagement, pdf_hash='ab' * 32)
+
+
+def test_round_trip(tmp_path):
+    library = PaperLibrary(tmp_path / 'library')
+    entries = sorted((make_entry(i) for i in range(7)), key=lambda e: str(e.paper.id))
+    for entry in entries:
+        library.save(entry)
+    expected = [entry.model_dump() for entry in entries]
+
+    assert export_library(library, tmp_path / 'library.jsonl', batch_size=3) == 7
+    assert [e.model_dump() for batch in read_jsonl(tmp_path / 'library.jsonl', 3) for e in batch] == expected
+
+    assert export_library(library, tmp_path / 'columnar', fmt='columnar', batch_size=3) == 7
+    with ColumnarReader(tmp_path / 'columnar') as reader:
+        assert reader.column('paper.metadata.title') == [e.paper.metadata.title for e in entries]
+        assert reader.column('paper.metadata.hf_upvotes', 2, 4) == [e.paper.metadata.hf_upvotes for e in entries[2:4]]
+        assert [e.model_dump() for batch in reader.iter_batches(4) for e in batch] == expected
+
+    for source in ['library.jsonl', 'columnar']:
+        restored = PaperLibrary(tmp_path / f'restored-{source}')
+        assert import_library(restored, tmp_path / source) == 7
+        assert [e.model_dump() for e in restored] == expected
+        # already there.
+        assert import_library(restored, tmp_path / source) == 0
+
+
+def test_empty_library(tmp_path):
+    library = PaperLibrary(tmp_path / 'library')
+    assert export_library(library, tmp_path / 'columnar', fmt='columnar') == 0
+    assert import_library(PaperLibrary(tmp_path / 'restored'), tmp_path / 'columnar') == 0
+
+
+def test_failed_export_keeps_the_previous_one(tmp_path):
+    entries = [make_entry(i) for i in range(5)]
+    assert export_columnar(entries, tmp_path / 'columnar', batch_size=2) == 5
+
+    def broken():
+        yield from entries[:3]
+        raise OSError('disk full')
+
+    with pytest.raises(OSError):
+        export_columnar(broken(), tmp_path / 'columnar', batch_size=2)
+    with pytest.raises(OSError):
+        export_jsonl(broken(), tmp_path / 'library.jsonl', batch_size=2)
+    with ColumnarReader(tmp_path / 'columnar') as reader:
+        assert reader.column('paper.metadata.title') == [e.paper.metadata.title for e in entries]
+    assert export_columnar(entries[:2], tmp_path / 'columnar') == 2
+    assert [path.name for path in tmp_path.iterdir()] == ['columnar']
+    assert not (tmp_path / 'library.jsonl').exists()
+
+    (tmp_path / 'notes').mkdir()
+    (tmp_path / 'notes' / 'todo.txt').write_text('keep me')
+    with pytest.raises(ValueError):
+        export_columnar(entries, tmp_path / 'notes')
+    assert (tmp_path / 'notes' / 'todo.txt').exists()
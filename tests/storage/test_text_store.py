@@ -0,0 +1,85 @@
+# coding=utf-8
+import fitz
+import pytest
+
+from pageleaf.storage.documents import ParsedDocumentStore
+from pageleaf.storage.text_store import PageText, write_page_text
+from pageleaf.schemas.io.pdf import PdfDocument
+
+
+def write_pdf(path, n_pages=3):
+    doc = fitz.open()
+    for i in range(n_pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f'Page {i + 1} starts here - ünïcode', fontsize=11)
+        page.insert_text((72, 300), f'Second block of page {i + 1}', fontsize=11)
+    doc.new_page()  # no text at all
+    doc.save(path)
+    return path
+
+
+def test_page_and_block_lookup(tmp_path):
+    doc = PdfDocument.load_file(str(write_pdf(tmp_path / 'paper.pdf')))
+    write_page_text(doc, tmp_path / 'store')
+
+    with PageText(tmp_path / 'store') as text:
+        assert text.n_pages == 3
+        assert text.page_text(2) == 'Page 2 starts here - ünïcode\n\nSecond block of page 2'
+        assert text.n_blocks(3) == 2
+        assert text.block_text(3, 1) == 'Second block of page 3'
+        view = text.page_bytes(1)
+        assert isinstance(view, memoryview) and view.readonly
+        del view
+        with pytest.raises(KeyError):
+            text.page_text(4)
+        with pytest.raises(IndexError):
+            text.block_text(1, 2)
+
+
+def test_written_with_parsed_document(tmp_path):
+    pdf_file = write_pdf(tmp_path / 'paper.pdf')
+    store = ParsedDocumentStore(tmp_path / 'parsed')
+    store.load(pdf_file)
+    pdf_hash = next(store.root.iterdir()).name
+
+    text = store.open_text(pdf_hash)
+    assert text.block_text(1, 0) == 'Page 1 starts here - ünïcode'
+    text.close()
+    assert store.open_text('missing') is None
+
+
+def test_compressed_text(tmp_path):
+    pdf = fitz.open()
+    for i in range(60):
+        page = pdf.new_page()
+        page.insert_textbox(fitz.Rect(72, 72, 540, 600), f'Page {i + 1}. ' + 'Sparse attention scales. ' * 90,
+                            fontsize=9)
+        page.insert_text((72, 700), f'Second block of page {i + 1}', fontsize=11)
+    pdf_file = tmp_path / 'paper.pdf'
+    pdf.save(pdf_file)
+    plain = ParsedDocumentStore(tmp_path / 'plain', codec='none')
+    doc = plain.load(pdf_file)
+    pdf_hash = next(plain.root.iterdir()).name
+    with plain.open_text(pdf_hash) as text:
+        expected = [text.page_text(n) for n in text.page_numbers]
+        assert not text.compressed
+
+    store = ParsedDocumentStore(tmp_path / 'parsed', codec='zlib')
+    store.put(pdf_hash, doc)
+    assert store.get(pdf_hash).model_dump() == doc.model_dump()
+    assert (store.doc_dir(pdf_hash) / 'text.utf8z').exists()
+    with store.open_text(pdf_hash) as text:
+        assert text.compressed
+        # pages across frame boundaries, in any order.
+        assert [text.page_text(n) for n in reversed(text.page_numbers)] == expected[::-1]
+        assert text.block_text(60, 1) == 'Second block of page 60'
+
+    # documents stored before compression are rewritten in place, and back.
+    assert plain.document_path(pdf_hash).stat().st_size > 4 * store.document_path(pdf_hash).stat().st_size
+    assert ParsedDocumentStore(plain.root, codec='zlib').compress(pdf_hash)
+    with plain.open_text(pdf_hash) as text:
+        assert text.compressed and text.page_text(7) == expected[6]
+    assert plain.get(pdf_hash).model_dump() == doc.model_dump()
+    assert plain.compress(pdf_hash) and not plain.compress(pdf_hash)
+    with plain.open_text(pdf_hash) as text:
+        assert not text.compressed and text.page_text(7) == expected[6]